@@ -1,13 +1,50 @@
 import os
+import argparse
+import statistics
 import subprocess
 import sys
+import time
 
-def create_exe():
+NAME = "WebScraperMinimal"
+FAST_NAME = "WebScraperMinimalFast"
+
+# Packages main_minimal never imports; PyInstaller would otherwise bundle
+# whatever it finds installed alongside it
+EXCLUDED_MODULES = [
+    "selenium", "webdriver_manager", "pandas", "numpy", "pyarrow",
+    "tkinter", "matplotlib", "IPython", "pytest",
+]
+
+
+def executable_path(dist_dir, fast_start):
+    """Path of the built executable inside dist_dir"""
+    suffix = ".exe" if sys.platform == "win32" else ""
+    if fast_start:
+        return os.path.join(dist_dir, FAST_NAME, FAST_NAME + suffix)
+    return os.path.join(dist_dir, NAME + suffix)
+
+
+def measure_cold_start(executable, runs=5):
+    """Median wall time in seconds of `executable --help` over several launches"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([executable, "--help"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def create_exe(fast_start=False):
     """
     Convert main_minimal.py into an executable using PyInstaller
+    
+    The default build is a single --onefile executable, which unpacks
+    itself to a temporary directory on every launch. With fast_start the
+    executable is built --onedir (the files stay unpacked next to it) and
+    packages main_minimal never uses are left out, so it starts quicker.
     """
     # Change to the web_scraper directory
-    scraper_dir = os.path.join(os.path.dirname(__file__), "web_scraper")
+    scraper_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_scraper")
     if not os.path.exists(scraper_dir):
         print(f"Error: web_scraper directory not found at {scraper_dir}")
         return False
@@ -35,19 +72,28 @@ def create_exe():
     try:
         # Run PyInstaller to create executable
         print("Creating executable...")
-        result = subprocess.run([
+        command = [
             sys.executable, "-m", "PyInstaller",
-            "--onefile",  # Create a single executable file
-            "--name", "WebScraperMinimal",  # Name of the executable
+            "--noconfirm",
             "--distpath", os.path.join(os.pardir, "dist"),  # Output to parent 'dist' directory
-            "main_minimal.py"
-        ])
+        ]
+        if fast_start:
+            command += ["--onedir", "--name", FAST_NAME]  # No unpacking on every launch
+            for module in EXCLUDED_MODULES:
+                command += ["--exclude-module", module]
+        else:
+            command += ["--onefile", "--name", NAME]  # Create a single executable file
+        result = subprocess.run(command + ["main_minimal.py"])
         
         if result.returncode == 0:
+            executable = os.path.relpath(executable_path(os.path.join(os.pardir, "dist"), fast_start),
+                                         os.pardir)
             print("Executable created successfully in the 'dist' folder!")
-            print("You can find your executable at: ../dist/WebScraperMinimal")
+            print(f"You can find your executable at: {executable}")
+            if fast_start:
+                print(f"Ship the whole dist/{FAST_NAME} folder; the executable needs the files next to it.")
             print("\nNote: This is a minimal version of the web scraper that includes core functionality.")
-            print("Usage: ./dist/WebScraperMinimal <URL> --output <output_file>")
+            print(f"Usage: {executable} <URL> --output <output_file>")
             return True
         else:
             print("Error creating executable.")
@@ -56,5 +102,34 @@ def create_exe():
         # Change back to original directory
         os.chdir(original_dir)
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the minimal web scraper executable with PyInstaller")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="Build a one-folder executable without unused packages, then compare "
+                             "its cold-start time with the one-file build")
+    parser.add_argument("--runs", type=int, default=5, help="Launches to time for the cold-start comparison")
+    args = parser.parse_args()
+
+    if not args.fast_start:
+        create_exe()
+        return
+
+    dist_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dist")
+    baseline = executable_path(dist_dir, fast_start=False)
+    if not os.path.exists(baseline):
+        print("Building the one-file executable first to measure against...")
+        if not create_exe():
+            return
+    if not create_exe(fast_start=True):
+        return
+
+    before = measure_cold_start(baseline, args.runs)
+    after = measure_cold_start(executable_path(dist_dir, fast_start=True), args.runs)
+    print(f"\nCold start (median of {args.runs} launches of --help):")
+    print(f"  one-file:   {before * 1000:7.0f} ms")
+    print(f"  fast-start: {after * 1000:7.0f} ms ({(after - before) / before:+.0%})")
+
+
 if __name__ == "__main__":
-    create_exe()
\ No newline at end of file
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Benchmark fetch, parse and save throughput against a local fixture server
+
+The fixture pages in data/pages (plus a scaled-up large page) are served
+from a local HTTP server with configurable latency and error injection, so
+runs are reproducible and work offline. Each scenario runs in a fresh
+process and reports pages/sec, per-page latency percentiles, CPU time per
+page and peak RSS. Results are written as JSON; pass --compare with an
+earlier file to see the change per metric.
+"""
+
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(BASE_DIR, 'data', 'pages')
+
+SCENARIOS = ['scrape_page', 'scrape_multiple', 'scrape_url', 'save_results']
+
+
+def load_corpus(large_scale=20):
+    """Fixture pages by name, plus 'large': the article repeated large_scale times"""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus[os.path.splitext(os.path.basename(path))[0]] = f.read().encode('utf-8')
+    article = corpus['article'].decode('utf-8')
+    corpus['large'] = article.replace('</body>', article * (large_scale - 1) + '</body>', 1).encode('utf-8')
+    return corpus
+
+
+class LocalServer:
+    """Threaded HTTP server on a free 127.0.0.1 port.
+
+    Subclasses implement respond(handler), returning (status, headers,
+    body) for a GET or HEAD request. The test suite's LocalSite fixture is
+    built on this class too.
+    """
+
+    def __init__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one segment: with separate writes on a
+            # keep-alive connection, Nagle's algorithm waits for the client's
+            # delayed ACK and every request stalls for ~40 ms
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, headers, body = server.respond(self)
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def respond(self, handler):
+        raise NotImplementedError
+
+    def url(self, path='/', host='127.0.0.1'):
+        """Absolute URL for a path; pass host='localhost' to get a second host"""
+        return f"http://{host}:{self.port}{path}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class FixtureServer(LocalServer):
+    """Serve the corpus at /<n>/<page name> with injected latency and errors.
+
+    Every response waits latency seconds plus up to jitter seconds.
+    error_rate of the page requests get a 503 instead of the page. The
+    random choices come from `seed`, so runs are repeatable.
+    """
+
+    def __init__(self, corpus, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        super().__init__()
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, handler):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.random() * self.jitter
+            fail = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        name = handler.path.rsplit('/', 1)[-1]
+        if name not in self.corpus:
+            status, body = 404, b'Not Found'
+        elif fail:
+            status, body = 503, b'Injected error'
+        else:
+            status, body = 200, self.corpus[name]
+        return status, {'Content-Type': 'text/html; charset=utf-8'}, body
+
+    def urls(self, count):
+        """count distinct URLs cycling through the corpus pages"""
+        names = sorted(self.corpus)
+        return [self.url(f"/{i}/{names[i % len(names)]}") for i in range(count)]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered), max(1, math.ceil(fraction * len(ordered))))
+    return ordered[index - 1]
+
+
+def _timed(function, latencies):
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def _benchmark_config(options):
+    from utils.helpers import load_config
+    config = load_config(os.path.join(BASE_DIR, 'config', 'config.json'))
+    config['scraper_settings'].update({
+        'use_selenium': False,
+        'delay_between_requests': 0,
+        'concurrency': options['concurrency'],
+        'max_retries': options['retries'],
+        'parser': options['parser'] or config['scraper_settings'].get('parser', 'html.parser'),
+    })
+    config['cache_settings']['enabled'] = False
+    config.setdefault('robots_settings', {})['enabled'] = False
+    path = os.path.join(options['workdir'], 'config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return path
+
+
+def run_scenario(name, urls, options):
+    """Run one scenario in this process and return its raw measurements"""
+    latencies = []
+    errors = 0
+
+    if name == 'scrape_url':
+        from main_minimal import scrape_url
+        from scraper.parsers import DEFAULT_PARSER
+        from scraper.transport import create_session
+        session = create_session({'max_retries': options['retries']})
+        scrape = _timed(scrape_url, latencies)
+        start_cpu, start = time.process_time(), time.perf_counter()
+        for url in urls:
+            result = scrape(url, 10, options['parser'] or DEFAULT_PARSER, session)
+            errors += 'error' in result
+        elapsed = time.perf_counter() - start
+        pages = len(urls)
+        session.close()
+    else:
+        from main import WebScraper
+        scraper = WebScraper(use_selenium=False, config_path=_benchmark_config(options))
+        try:
+            if name == 'save_results':
+                results = [scraper.scrape_page(url) for url in urls]
+                save = _timed(scraper.save_results, latencies)
+                start_cpu, start = time.process_time(), time.perf_counter()
+                for i in range(options['repeat']):
+                    save(results, os.path.join(options['workdir'], f'results_{i}.json'))
+                elapsed = time.perf_counter() - start
+                pages = len(results) * options['repeat']
+            else:
+                scraper.scrape_page = _timed(scraper.scrape_page, latencies)
+                start_cpu, start = time.process_time(), time.perf_counter()
+                if name == 'scrape_page':
+                    results = [scraper.scrape_page(url) for url in urls]
+                else:
+                    results = scraper.scrape_multiple(urls, concurrency=options['concurrency'])
+                elapsed = time.perf_counter() - start
+                pages = len(results)
+                errors = sum('error' in result for result in results)
+        finally:
+            scraper.close()
+
+    cpu = time.process_time() - start_cpu
+    return {
+        'pages': pages,
+        'errors': errors,
+        'seconds': elapsed,
+        'pages_per_sec': pages / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+        },
+        'cpu_ms_per_page': cpu / pages * 1000 if pages else 0.0,
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where the
+    resource module is unavailable (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _scenario_process(name, urls, options, queue):
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(BASE_DIR)
+    import logging
+    logging.disable(logging.INFO)
+    try:
+        result = run_scenario(name, urls, options)
+        result['peak_rss_mb'] = peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(name, urls, options):
+    """Run a scenario in a fresh process so peak RSS is its own"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_scenario_process, args=(name, urls, options, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_mb(value):
+    return f"{value:6.1f} MB" if value is not None else "   n/a   "
+
+
+def compare(report, baseline):
+    """Print each metric next to the baseline value and the relative change"""
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        print(f"\n{name} (vs {baseline.get('commit') or 'baseline'})")
+        rows = [('pages_per_sec', current['pages_per_sec'], previous['pages_per_sec'])]
+        rows += [(f'latency {key} ms', current['latency_ms'][key], previous['latency_ms'][key])
+                 for key in ('p50', 'p95', 'p99')]
+        rows += [(key, current[key], previous[key]) for key in ('cpu_ms_per_page', 'peak_rss_mb')]
+        for label, now, before in rows:
+            if now is None or before is None:
+                continue
+            change = (now - before) / before * 100 if before else 0.0
+            print(f"  {label:16s} {before:10.2f} -> {now:10.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape throughput benchmark against a local fixture server")
+    parser.add_argument("--pages", "-n", type=int, default=200, help="Pages per scenario")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", "-c", type=int, default=10,
+                        help="Requests in flight for scrape_multiple")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency per response in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses that are 503s")
+    parser.add_argument("--retries", type=int, default=0, help="max_retries for the scraper's transport")
+    parser.add_argument("--large-scale", type=int, default=20, help="Size of the large page, in article copies")
+    parser.add_argument("--parser", "-p", default=None, help="Parser backend (default: config)")
+    parser.add_argument("--repeat", type=int, default=5, help="save_results calls over the scraped pages")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency jitter and error injection")
+    parser.add_argument("--output", "-o", default=None,
+                        help="JSON report path (default: benchmark_<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'scenarios': {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            FixtureServer(load_corpus(args.large_scale), args.latency / 1000, args.jitter / 1000,
+                          args.error_rate, args.seed) as server:
+        options = {
+            'concurrency': args.concurrency,
+            'retries': args.retries,
+            'parser': args.parser,
+            'repeat': args.repeat,
+            'workdir': workdir,
+        }
+        for name in args.scenario or SCENARIOS:
+            result = run_isolated(name, server.urls(args.pages), options)
+            report['scenarios'][name] = result
+            if 'error' in result:
+                print(f"{name:16s} failed: {result['error']}")
+                continue
+            print(f"{name:16s} {result['pages_per_sec']:9.1f} pages/sec  "
+                  f"p50 {result['latency_ms']['p50']:7.1f} ms  p95 {result['latency_ms']['p95']:7.1f} ms  "
+                  f"p99 {result['latency_ms']['p99']:7.1f} ms  cpu {result['cpu_ms_per_page']:6.2f} ms/page  "
+                  f"rss {format_mb(result['peak_rss_mb'])}  errors {result['errors']}")
+
+    output = args.output or f"benchmark_{commit or int(time.time())}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark the HTML parser backends on the fixture pages in data/pages
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from scraper.parsers import available_parsers, extract_page
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'pages')
+
+
+def benchmark(parser, pages, repeat):
+    """Return pages/sec for one backend over the given HTML strings"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract_page(html, 'https://example.com/', parser)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser backend benchmark")
+    parser.add_argument("--repeat", "-n", type=int, default=200, help="Passes over the fixture pages")
+    parser.add_argument("--scale", "-s", type=int, default=1,
+                        help="Repeat each page body this many times to simulate larger pages")
+    args = parser.parse_args()
+    
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        if args.scale > 1:
+            html = html.replace('</body>', html * (args.scale - 1) + '</body>', 1)
+        pages.append(html)
+    
+    print(f"{len(pages)} pages x {args.repeat} passes, {sum(map(len, pages)) // len(pages)} bytes avg")
+    for name in available_parsers():
+        print(f"{name:12s} {benchmark(name, pages, args.repeat):10.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures for the web scraper tests
+"""
+
+import time
+
+import pytest
+
+from benchmark import LocalServer
+
+
+class LocalSite(LocalServer):
+    """A local HTTP server that serves canned responses for tests.
+
+    routes maps a path to either a body string, a (status, headers, body)
+    tuple, or a callable taking the request handler and returning such a
+    tuple. Every request is recorded in `requests` as (path, start_time).
+    """
+
+    def __init__(self, latency=0):
+        super().__init__()
+        self.routes = {}
+        self.latency = latency
+        self.requests = []
+
+    def respond(self, handler):
+        self.requests.append((handler.path, time.monotonic()))
+        if self.latency:
+            time.sleep(self.latency)
+        route = self.routes.get(handler.path, (404, {}, 'Not Found'))
+        if callable(route):
+            route = route(handler)
+        if isinstance(route, (str, bytes)):
+            route = (200, {'Content-Type': 'text/html; charset=utf-8'}, route)
+        return route
+
+
+@pytest.fixture
+def local_site():
+    site = LocalSite().start()
+    try:
+        yield site
+    finally:
+        site.stop()
@@ -3,7 +3,7 @@
 Example usage of the Web Scraper
 """
 
-from main import WebScraper
+from main import WebScraper, setup_logging
 import json
 
 def example_search_and_scrape():
@@ -73,6 +73,7 @@ def example_direct_scraping():
         scraper.close()
 
 if __name__ == "__main__":
+    setup_logging()
     example_search_and_scrape()
     example_direct_scraping()
     print("\nExamples completed!")
\ No newline at end of file
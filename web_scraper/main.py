@@ -5,39 +5,117 @@ This tool allows you to extract and scrape web content using Google search resul
 """
 
 import os
-import sys
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import re
+import asyncio
+import functools
+import threading
 import time
 import json
-import pandas as pd
-from urllib.parse import urljoin, urlparse
+import argparse
+from urllib.parse import urlparse
 import logging
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/scraper.log'),
-        logging.StreamHandler()
-    ]
-)
+from scraper.cache import HttpCache
+from scraper.changes import ChangeStore
+from scraper.drivers import DriverPool, create_chrome_driver
+from scraper.entities import extract_batch, get_extractor
+from scraper.extract import build_result, decode_body, error_result, extract_result
+from scraper.crawl import CrawlScope, crawl
+from scraper.dedup import NearDuplicateIndex, duplicate_result
+from scraper.distributed import open_queue, run_coordinator, run_worker
+from scraper.fetch import HostThrottle, fetch_all
+from scraper.frontier import Frontier
+from scraper.incremental import FingerprintStore, fingerprint, unchanged_result
+from scraper.metrics import METRICS
+from scraper.parsers import DEFAULT_PARSER, resolve_parser
+from scraper.pipeline import scrape_pipeline
+from scraper.render import RenderPolicy, js_render_reason
+from scraper.robots import RobotsCache
+from scraper.search import SearchIndex, read_results
+from scraper.sinks import ParquetSink, ResultSink, summarize, summary_writer
+from scraper.streaming import extract_chunks
+from scraper.transport import DEFAULT_USER_AGENT, body_encoding, create_session, iter_body, read_body
+from scraper.watch import WatchSchedule, watch
+from utils.helpers import load_config
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'config.json')
+
+
+def setup_logging(log_directory='logs/'):
+    """Log to the console and to scraper.log in log_directory.
+    
+    Called by main() rather than at import, so importing WebScraper opens
+    no files and leaves logging to the embedding application.
+    """
+    os.makedirs(log_directory, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(log_directory, 'scraper.log')),
+            logging.StreamHandler()
+        ]
+    )
+
+
+def open_index(config, path=None):
+    """Open the full-text search index configured in index_settings"""
+    index_settings = config.get('index_settings', {})
+    return SearchIndex(path or index_settings.get('path', 'data/search_index.sqlite3'),
+                       commit_every=index_settings.get('commit_every', 100))
+
 
 class WebScraper:
-    def __init__(self, use_selenium=False):  # Changed default to False for basic functionality
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.use_selenium = use_selenium
-        self.driver = None
+    def __init__(self, use_selenium=False, config_path=CONFIG_PATH):  # Changed default to False for basic functionality
+        """use_selenium may be True, False or 'auto'. In auto mode pages are
+        fetched with requests first and only sent to a browser when they
+        look like they need JavaScript to render."""
+        self.config = load_config(config_path)
+        self.settings = self.config.get('scraper_settings', {})
+        self.delay = self.settings.get('delay_between_requests', 1)
+        self.concurrency = self.settings.get('concurrency', 1)
+        self.parser = resolve_parser(self.settings.get('parser', DEFAULT_PARSER))
+        self.max_body_bytes = int(self.settings.get('max_body_mb', 10) * 1024 * 1024)
+        self.fingerprints = None
+        metrics_settings = self.config.get('metrics_settings', {})
+        self.metrics = METRICS
+        self.metrics.enabled = metrics_settings.get('enabled', True)
+        self.metrics.max_hosts = metrics_settings.get('max_hosts', 1000)
+        self.metrics_server = None
+        entity_settings = self.config.get('entity_settings', {})
+        self.entity_names = tuple(entity_settings.get('extractors', []))
+        self.entity_workers = entity_settings.get('workers')
+        self.entities = get_extractor(self.entity_names) if self.entity_names else None
+        self.dedup = None
+        self.dedup_action = 'flag'
+        dedup_settings = self.config.get('dedup_settings', {})
+        if dedup_settings.get('enabled'):
+            self.enable_dedup(dedup_settings.get('action', 'flag'))
+        self.changes = None
+        if self.config.get('change_settings', {}).get('enabled'):
+            self.enable_changes()
+        self.index = None
+        if self.config.get('index_settings', {}).get('enabled'):
+            self.enable_index()
+        self.cache = None
+        if self.config.get('cache_settings', {}).get('enabled'):
+            self.enable_cache()
+        self.session = create_session(self.settings)
+        self.robots = None
+        robots_settings = self.config.get('robots_settings', {})
+        if robots_settings.get('enabled', True):
+            self.robots = RobotsCache(
+                self.session,
+                user_agent=self.settings.get('user_agent', DEFAULT_USER_AGENT),
+                ttl=robots_settings.get('ttl_hours', 24) * 3600,
+                max_hosts=robots_settings.get('max_hosts', 10000),
+                max_crawl_delay=robots_settings.get('max_crawl_delay', 60)
+            )
+        self.auto_render = use_selenium == 'auto'
+        self.use_selenium = bool(use_selenium) and not self.auto_render
+        self.render_policy = RenderPolicy() if self.auto_render else None
+        self.driver_pool = None
+        self._driver_pool_lock = threading.Lock()
         
         if self.use_selenium:
             try:
@@ -45,42 +123,32 @@ class WebScraper:
             except Exception as e:
                 logging.warning(f"Selenium setup failed: {e}. Falling back to requests-based scraping.")
                 self.use_selenium = False
+                self.driver_pool = None
     
     def setup_selenium(self):
-        """Setup Selenium WebDriver with Chrome"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # Run in background
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(
-            service=webdriver.chrome.service.Service(ChromeDriverManager().install()),
-            options=chrome_options
+        """Setup a pool of Selenium WebDrivers with Chrome"""
+        self.driver_pool = DriverPool(
+            create_chrome_driver,
+            size=self.settings.get('selenium_pool_size', 1),
+            max_pages=self.settings.get('driver_max_pages', 100),
+            max_memory_mb=self.settings.get('driver_max_memory_mb')
         )
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # Start one browser now so a broken setup falls back to requests
+        self.driver_pool.start(1)
     
     def google_search(self, query, num_results=10):
         """Perform Google search and return URLs"""
         search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}&num={num_results}"
         
         if self.use_selenium:
-            self.driver.get(search_url)
-            time.sleep(2)  # Wait for page to load
-            
-            # Extract search result links
-            search_results = self.driver.find_elements(By.CSS_SELECTOR, "div.g a")
-            urls = []
-            for result in search_results[:num_results]:
-                href = result.get_attribute('href')
-                if href and 'http' in href:
-                    urls.append(href)
-            return urls
-        else:
-            # Fallback to requests-based approach (may be blocked)
+            with self.metrics.stage('search'):
+                return self._google_search_browser(search_url, num_results)
+        
+        # Fallback to requests-based approach (may be blocked)
+        from bs4 import BeautifulSoup
+        with self.metrics.stage('search'):
             response = self.session.get(search_url)
+        with self.metrics.stage('search_parse'):
             soup = BeautifulSoup(response.text, 'html.parser')
             links = soup.find_all('div', class_='g')
             urls = []
@@ -88,85 +156,342 @@ class WebScraper:
                 anchor = link.find('a')
                 if anchor and anchor.get('href'):
                     urls.append(anchor.get('href'))
-            return urls
+        
+        if not urls and self.auto_render and self._browser_available():
+            logging.info("No search results without a browser, retrying with Selenium")
+            with self.metrics.stage('search'):
+                return self._google_search_browser(search_url, num_results)
+        return urls
     
-    def scrape_page(self, url):
-        """Scrape content from a single URL"""
-        try:
-            if self.use_selenium:
-                self.driver.get(url)
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                html = self.driver.page_source
-            else:
-                response = self.session.get(url)
-                html = response.text
-            
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Extract content
-            title = soup.find('title')
-            title = title.text.strip() if title else "No Title"
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract text content
-            text_content = soup.get_text()
-            # Clean up text
-            lines = (line.strip() for line in text_content.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text_content = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Extract links
-            links = []
-            for link in soup.find_all('a', href=True):
-                full_url = urljoin(url, link['href'])
-                links.append({
-                    'text': link.text.strip(),
-                    'url': full_url
-                })
-            
-            # Extract images
-            images = []
-            for img in soup.find_all('img', src=True):
-                full_url = urljoin(url, img['src'])
-                images.append({
-                    'alt': img.get('alt', ''),
-                    'src': full_url
-                })
+    def _google_search_browser(self, search_url, num_results):
+        from selenium.webdriver.common.by import By
+        with self.driver_pool.lease() as driver:
+            driver.get(search_url)
+            time.sleep(2)  # Wait for page to load
             
-            return {
-                'url': url,
-                'title': title,
-                'content': text_content,
-                'links': links,
-                'images': images,
-                'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
+            # Extract search result links
+            search_results = driver.find_elements(By.CSS_SELECTOR, "div.g a")
+            urls = []
+            for result in search_results[:num_results]:
+                href = result.get_attribute('href')
+                if href and 'http' in href:
+                    urls.append(href)
+        return urls
+    
+    def fetch_raw(self, url):
+        """Fetch a URL and return its raw body and text encoding"""
+        if self.use_selenium:
+            return self._fetch_browser(url)
+        if self.auto_render:
+            return self._fetch_auto(url)
+        return self._fetch_requests(url)
+    
+    def _fetch_browser(self, url):
+        # Selenium is only imported once a page actually needs a browser
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        with self.driver_pool.lease() as driver:
+            driver.get(url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+            return driver.page_source.encode('utf-8'), 'utf-8'
+    
+    def _fetch_requests(self, url):
+        if self.cache:
+            body, encoding, _ = self.cache.fetch(self.session, url,
+                                                 max_body_bytes=self.max_body_bytes)
+            return body, encoding
+        
+        # Stream so oversized or non-text responses are dropped early
+        with self.session.get(url, stream=True) as response:
+            body = read_body(response, self.max_body_bytes)
+            return body, body_encoding(response, body)
+    
+    def _browser_available(self):
+        """Start the driver pool on first use in auto mode"""
+        with self._driver_pool_lock:
+            if self.driver_pool is None:
+                try:
+                    self.setup_selenium()
+                except Exception as e:
+                    logging.warning(f"Selenium setup failed: {e}. Pages will not be rendered.")
+                    self.auto_render = False
+                    self.driver_pool = None
+            return self.driver_pool is not None
+    
+    def _fetch_auto(self, url):
+        """Fetch with requests, escalating to the browser when the page (or
+        an earlier page from its domain) needs JavaScript"""
+        host = urlparse(url).netloc
+        needs_browser = self.render_policy.decision(host)
+        if needs_browser and self._browser_available():
+            self.render_policy.count_escalation()
+            return self._fetch_browser(url)
+        
+        body, encoding = self._fetch_requests(url)
+        if needs_browser is not None:
+            return body, encoding
+        
+        reason = js_render_reason(decode_body(body, encoding))
+        self.render_policy.record(host, reason is not None)
+        if reason and self._browser_available():
+            logging.info(f"Rendering {url} in browser: {reason}")
+            self.render_policy.count_escalation()
+            return self._fetch_browser(url)
+        return body, encoding
+    
+    def enable_incremental(self, path=None):
+        """Only emit full records for pages whose content changed since the
+        fingerprints stored at path were taken"""
+        if path is None:
+            path = self.config.get('output_settings', {}).get('fingerprint_file', 'data/fingerprints.json')
+        self.fingerprints = FingerprintStore(path)
+        return self.fingerprints
+    
+    def enable_dedup(self, action='flag', path=None):
+        """Check every scraped page against the persistent near-duplicate
+        index. action 'flag' adds a duplicate_of field to near-duplicates,
+        'drop' replaces them with a small marker record."""
+        if action not in ('flag', 'drop'):
+            raise ValueError(f"Unknown dedup action '{action}'. Choose from: flag, drop")
+        dedup_settings = self.config.get('dedup_settings', {})
+        if self.dedup is None:
+            self.dedup = NearDuplicateIndex(
+                path or dedup_settings.get('path', 'data/near_duplicates.sqlite3'),
+                max_distance=dedup_settings.get('max_distance', 3),
+                min_words=dedup_settings.get('min_words', 30)
+            )
+        self.dedup_action = action
+        return self.dedup
+    
+    def _check_duplicate(self, result):
+        if self.dedup is None or 'error' in result or not result.get('content'):
+            return result
+        with self.metrics.stage('dedup'):
+            duplicate_of = self.dedup.check(result['url'], result['content'])
+        if duplicate_of is None:
+            return result
+        if self.dedup_action == 'drop':
+            return duplicate_result(result['url'], duplicate_of)
+        result['duplicate_of'] = duplicate_of
+        return result
+    
+    def enable_changes(self, path=None):
+        """Report pages scraped before as change records against their
+        previous version, kept in the change store at path"""
+        change_settings = self.config.get('change_settings', {})
+        if self.changes is None:
+            self.changes = ChangeStore(
+                path or change_settings.get('path', 'data/changes.sqlite3'),
+                max_deltas=change_settings.get('max_deltas', 10)
+            )
+        return self.changes
+    
+    def enable_cache(self, path=None):
+        """Revalidate pages through the on-disk HTTP cache at path"""
+        cache_settings = self.config.get('cache_settings', {})
+        if self.cache is None:
+            self.cache = HttpCache(
+                path or cache_settings.get('path', 'data/http_cache.sqlite3'),
+                max_bytes=cache_settings.get('max_size_mb', 500) * 1024 * 1024,
+                max_age=cache_settings.get('max_age_hours', 168) * 3600
+            )
+        return self.cache
+    
+    def enable_index(self, path=None):
+        """Add every scraped page to the full-text search index at path"""
+        if self.index is None:
+            self.index = open_index(self.config, path)
+        return self.index
+    
+    def _index_result(self, result):
+        if self.index is not None:
+            with self.metrics.stage('index'):
+                self.index.add(result)
+    
+    def _track_changes(self, result):
+        """Full result for a URL's first version, a change record with only
+        what differs for later ones, and a marker when nothing changed"""
+        if self.changes is None or 'error' in result or 'content' not in result:
+            return result
+        with self.metrics.stage('diff'):
+            status, change = self.changes.record(result)
+        if status == 'unchanged':
+            return unchanged_result(result['url'])
+        if status == 'changed':
+            return change
+        result['status'] = status
+        return result
+    
+    def scrape_page(self, url, markers=True):
+        """Scrape content from a single URL
+        
+        With markers False, pages found unchanged by incremental mode or
+        change tracking are returned in full, so the caller can use their
+        links or content before swapping in the marker with _apply_markers.
+        """
+        start = time.perf_counter()
+        result = self._scrape_page(url, markers)
+        if self.entities is not None:
+            with self.metrics.stage('entities'):
+                self.entities.apply(result)
+        result = self._check_duplicate(result)
+        self._index_result(result)
+        if markers:
+            result = self._track_changes(result)
+        outcome = 'error' if 'error' in result else 'ok'
+        self.metrics.observe('page_seconds', time.perf_counter() - start,
+                             host=self.metrics.host(urlparse(url).hostname or ''), outcome=outcome)
+        self.metrics.inc('pages_total', outcome=outcome)
+        return result
+    
+    def _apply_markers(self, result):
+        """Turn a full result from scrape_page(url, markers=False) into what
+        scrape_page would have returned"""
+        if self.fingerprints is not None and result.get('status') == 'unchanged' and 'content' in result:
+            return unchanged_result(result['url'])
+        return self._track_changes(result)
+    
+    def _scrape_page(self, url, markers=True):
+        try:
+            if self.robots is not None:
+                with self.metrics.stage('robots'):
+                    self.robots.check(url)
+            if self.fingerprints is not None:
+                return self._scrape_incremental(url, markers)
+            requests_only = not (self.use_selenium or self.auto_render)
+            if self.cache and requests_only:
+                return self._scrape_cached(url)
+            if self.parser == 'stream' and requests_only:
+                # Parse while the body downloads instead of buffering it
+                with self.session.get(url, stream=True) as response:
+                    page = extract_chunks(iter_body(response, self.max_body_bytes),
+                                          response.encoding, url)
+                return build_result(url, page)
+            body, encoding = self.fetch_raw(url)
         except Exception as e:
             logging.error(f"Error scraping {url}: {str(e)}")
-            return {
-                'url': url,
-                'error': str(e),
-                'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
+            return error_result(url, e)
+        return extract_result(body, encoding, url, self.parser)
     
-    def scrape_multiple(self, urls):
-        """Scrape multiple URLs"""
-        results = []
-        for i, url in enumerate(urls):
-            logging.info(f"Scraping ({i+1}/{len(urls)}): {url}")
-            result = self.scrape_page(url)
-            results.append(result)
-            
-            # Be respectful - add delay between requests
-            time.sleep(1)
-        return results
+    def _scrape_incremental(self, url, markers=True):
+        """Skip extraction when the raw body is unchanged and mark pages whose
+        cleaned content is unchanged instead of returning them in full.
+        Without markers unchanged pages are still extracted and returned in
+        full with status 'unchanged'."""
+        body, encoding = self.fetch_raw(url)
+        body_hash = fingerprint(body)
+        if self.fingerprints.body_unchanged(url, body_hash):
+            if markers:
+                return unchanged_result(url)
+            result = extract_result(body, encoding, url, self.parser)
+            status = 'unchanged'
+        else:
+            result = extract_result(body, encoding, url, self.parser)
+            if 'error' in result:
+                return result
+            status = self.fingerprints.update(url, body_hash, fingerprint(result['content']))
+        if status == 'unchanged' and markers:
+            return unchanged_result(url)
+        if 'error' not in result:
+            result['status'] = status
+        return result
     
-    def search_and_scrape(self, query, num_results=5):
+    def _scrape_cached(self, url):
+        """Scrape through the HTTP cache, reusing the extracted fields of
+        pages the server reports as unchanged"""
+        body, encoding, page = self.cache.fetch(self.session, url, self.parser,
+                                                self.max_body_bytes)
+        if page is not None:
+            return build_result(url, page)
+        
+        result = extract_result(body, encoding, url, self.parser)
+        if 'error' not in result:
+            self.cache.store_page(url, self.parser, {
+                key: result[key] for key in ('title', 'content', 'links', 'images')
+            })
+        return result
+    
+    def scrape_multiple(self, urls, concurrency=None, sink=None):
+        """Scrape multiple URLs concurrently.
+        
+        In Selenium mode concurrency is capped at the driver pool size. With
+        a sink (see scraper.sinks.ResultSink) each result is written as soon
+        as it completes instead of being collected, and an empty list is
+        returned.
+        """
+        if concurrency is None:
+            concurrency = self.concurrency
+        if self.use_selenium:
+            concurrency = min(concurrency, self.driver_pool.size)
+        return asyncio.run(self.scrape_multiple_async(urls, concurrency, sink))
+    
+    async def scrape_multiple_async(self, urls, concurrency=10, sink=None):
+        """Scrape multiple URLs with up to `concurrency` requests in flight.
+        
+        The configured delay_between_requests is applied per host, and
+        results come back in the same order as urls (or go to sink in
+        completion order).
+        """
+        if sink is not None:
+            await fetch_all(urls, self.scrape_page, concurrency, self.delay, sink.write,
+                            self.throttle())
+            return []
+        return await fetch_all(urls, self.scrape_page, concurrency, self.delay,
+                               throttle=self.throttle())
+    
+    def scrape_pipeline(self, urls, workers=None, concurrency=None, max_pending=None):
+        """Scrape multiple URLs with extraction moved to a process pool.
+        
+        Fetching stays on threads in this process while BeautifulSoup runs
+        in `workers` extraction processes, so parsing no longer holds the
+        GIL against downloads. Returns the same dicts as scrape_multiple.
+        Pages go through robots.txt, render mode, the HTTP cache, incremental
+        mode, dedup, the index and change tracking as in scrape_page, with
+        three differences: cached extracted fields are not reused, the
+        'stream' parser runs once the body is downloaded, and only
+        pages_total is recorded, not page_seconds.
+        """
+        if concurrency is None:
+            concurrency = self.driver_pool.size if self.use_selenium else self.concurrency
+        body_hashes = {}
+        
+        def fetch(url):
+            if self.robots is not None:
+                self.robots.check(url)
+            body, encoding = self.fetch_raw(url)
+            if self.fingerprints is not None:
+                body_hashes[url] = fingerprint(body)
+            return body, encoding
+        
+        results = scrape_pipeline(urls, fetch, workers, concurrency, self.delay, max_pending,
+                                  self.parser, self.throttle(), self.entity_names)
+        finished = []
+        for result in results:
+            if self.fingerprints is not None and 'error' not in result:
+                url = result['url']
+                status = self.fingerprints.update(url, body_hashes[url], fingerprint(result['content']))
+                if status == 'unchanged':
+                    result = unchanged_result(url)
+                else:
+                    result['status'] = status
+            result = self._check_duplicate(result)
+            self._index_result(result)
+            result = self._track_changes(result)
+            self.metrics.inc('pages_total', outcome='error' if 'error' in result else 'ok')
+            finished.append(result)
+        return finished
+    
+    def extract_entities(self, results, names=None, workers=None):
+        """Add entity fields to already scraped results on a process pool
+        (default: the configured extractors and entity_settings.workers)"""
+        if names is None:
+            names = self.entity_names
+        return extract_batch(results, names, workers or self.entity_workers)
+    
+    def search_and_scrape(self, query, num_results=5, sink=None):
         """Search Google and scrape results"""
         logging.info(f"Searching Google for: {query}")
         urls = self.google_search(query, num_results)
@@ -176,9 +501,163 @@ class WebScraper:
             return []
         
         logging.info(f"Found {len(urls)} URLs, starting to scrape...")
-        results = self.scrape_multiple(urls)
+        results = self.scrape_multiple(urls, sink=sink)
+        return results
+    
+    def scrape_frontier(self, frontier, sink, batch_size=None):
+        """Scrape the pending URLs of a persistent frontier until none remain.
+        
+        URLs are claimed in batches and each outcome is written to sink and
+        recorded in the frontier as it completes, so an interrupted run
+        loses at most the pages that were in flight.
+        """
+        concurrency = self._concurrency()
+        batch_size = batch_size or max(concurrency * 4, 1)
+        
+        def record(result):
+            sink.write(result)
+            if 'error' in result:
+                frontier.fail(result['url'], result['error'])
+            else:
+                frontier.complete(result['url'])
+        
+        async def run():
+            # One throttle for all batches so per-host spacing carries over
+            throttle = self.throttle()
+            while True:
+                urls = frontier.claim(batch_size)
+                if not urls:
+                    break
+                await fetch_all(urls, self.scrape_page, concurrency, self.delay, record, throttle)
+        
+        asyncio.run(run())
+    
+    def crawl(self, seeds, max_depth=2, max_pages=100, same_domain=True, include=None,
+              exclude=None, frontier=None, sink=None):
+        """Scrape seeds and follow their links breadth-first.
+        
+        Links are canonicalized and followed up to max_depth hops while they
+        match the scope (same hosts as the seeds unless same_domain is
+        False, include/exclude regular expressions). Hosts take turns so
+        one large site cannot starve the others. Pass a job frontier (see
+        open_job) to make the crawl resumable; otherwise an in-memory one
+        is used. Returns the results, or [] when they go to sink.
+        """
+        own_frontier = frontier is None
+        if own_frontier:
+            frontier = Frontier(':memory:')
+        scope = CrawlScope(seeds, same_domain, include, exclude)
+        results = []
+        write = sink.write if sink is not None else results.append
+        
+        def on_result(result):
+            # Markers are applied here rather than in scrape_page so
+            # unchanged and changed pages keep the links the crawl follows
+            write(self._apply_markers(result))
+        
+        try:
+            asyncio.run(crawl(seeds, functools.partial(self.scrape_page, markers=False), frontier,
+                              scope, max_depth, max_pages, self._concurrency(), self.delay, on_result,
+                              self.throttle()))
+        finally:
+            if own_frontier:
+                frontier.close()
+        return results
+    
+    def open_queue(self, url):
+        """Open a shared work queue with the configured lease settings"""
+        settings = self.config.get('distributed_settings', {})
+        return open_queue(url, lease_seconds=settings.get('lease_seconds', 60),
+                          max_attempts=settings.get('max_attempts', 3))
+    
+    def coordinate(self, queue, urls, sink=None):
+        """Distribute urls to workers through a shared queue and gather
+        their results; per-host delays, including robots.txt Crawl-delays,
+        apply across the whole cluster"""
+        results = []
+        poll_interval = self.config.get('distributed_settings', {}).get('poll_interval', 1.0)
+        run_coordinator(queue, urls, sink.write if sink is not None else results.append,
+                        self.delay, poll_interval, self.robots.crawl_delay if self.robots else None)
         return results
     
+    def work(self, queue, worker_id=None, stop=None):
+        """Scrape URLs leased from a shared queue until it is finished"""
+        poll_interval = self.config.get('distributed_settings', {}).get('poll_interval', 1.0)
+        return run_worker(queue, self.scrape_page, worker_id, self._concurrency(),
+                          poll_interval, stop)
+    
+    def open_watch(self, path=None):
+        """Open the persistent watch schedule with the configured intervals"""
+        settings = self.config.get('watch_settings', {})
+        return WatchSchedule(
+            path or settings.get('path', 'data/watch.sqlite3'),
+            min_interval=settings.get('min_interval_minutes', 5) * 60,
+            max_interval=settings.get('max_interval_hours', 24) * 3600,
+            initial_interval=settings.get('initial_interval_minutes', 60) * 60,
+            catch_up_window=settings.get('catch_up_minutes', 5) * 60
+        )
+    
+    def watch(self, schedule, urls=(), on_change=None, stop=None):
+        """Add urls to a watch schedule and re-scrape its URLs as they fall
+        due until stop is set, passing new and changed pages to on_change.
+        With the change store enabled, changed pages are passed as change
+        records."""
+        added = schedule.add(urls)
+        if added:
+            logging.info(f"Watching {added} new URLs")
+        poll_interval = self.config.get('watch_settings', {}).get('poll_interval', 1.0)
+        
+        def report(result):
+            if self.changes is not None:
+                # The schedule has already seen the content change
+                result = self._track_changes(result)
+                if result.get('status') == 'unchanged':
+                    return
+            if on_change is not None:
+                on_change(result)
+        
+        async def run():
+            # One throttle for the whole run so per-host spacing carries over
+            await watch(schedule, functools.partial(self.scrape_page, markers=False),
+                        self._concurrency(), self.delay, report, self.throttle(), stop, poll_interval)
+        
+        asyncio.run(run())
+    
+    def throttle(self):
+        """Per-host throttle using delay_between_requests, or the host's
+        robots.txt Crawl-delay when that is longer"""
+        return HostThrottle(self.delay, self.robots.crawl_delay if self.robots else None)
+    
+    def _concurrency(self):
+        if self.use_selenium:
+            return min(self.concurrency, self.driver_pool.size)
+        return self.concurrency
+    
+    def job_path(self, name):
+        """Path prefix of a named job's frontier and results files"""
+        if not re.fullmatch(r'[\w.-]+', name):
+            raise ValueError(f"Invalid job name '{name}': use letters, digits, '.', '_' and '-'")
+        jobs_directory = self.config.get('output_settings', {}).get('jobs_directory', 'data/jobs/')
+        return os.path.join(jobs_directory, name)
+    
+    def open_job(self, name, create=True):
+        """Open the frontier of a named, resumable job"""
+        path = self.job_path(name) + '.sqlite3'
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"No job named '{name}' in {os.path.dirname(path)}")
+        return Frontier(path)
+    
+    def run_job(self, frontier, sink, query=None, num_results=5):
+        """Seed a job's frontier from a Google search (once per job) and
+        scrape whatever is still pending"""
+        if query is not None and frontier.get_meta('seeded') is None:
+            logging.info(f"Searching Google for: {query}")
+            urls = self.google_search(query, num_results)
+            added = frontier.add(urls)
+            frontier.set_meta('seeded', '1')
+            logging.info(f"Found {len(urls)} URLs, {added} new to this job")
+        self.scrape_frontier(frontier, sink)
+    
     def save_results(self, results, filename=None):
         """Save scraping results to file"""
         if not filename:
@@ -187,85 +666,364 @@ class WebScraper:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        with self.metrics.stage('save_json'), open(filename, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
         
         # Also save as CSV if possible
         csv_filename = filename.replace('.json', '.csv')
         try:
-            # Flatten the results for CSV
-            flattened = []
-            for result in results:
-                flat_result = {
-                    'url': result.get('url', ''),
-                    'title': result.get('title', ''),
-                    'content_preview': result.get('content', '')[:200] + '...' if result.get('content') else '',
-                    'scraped_at': result.get('scraped_at', ''),
-                    'error': result.get('error', ''),
-                    'links_count': len(result.get('links', [])),
-                    'images_count': len(result.get('images', []))
-                }
-                flattened.append(flat_result)
-            
-            df = pd.DataFrame(flattened)
-            df.to_csv(csv_filename, index=False)
+            with self.metrics.stage('save_csv'), open(csv_filename, 'w', encoding='utf-8', newline='') as f:
+                writer = summary_writer(f)
+                writer.writeheader()
+                for result in results:
+                    writer.writerow(summarize(result))
         except Exception as e:
             logging.error(f"Error saving CSV: {str(e)}")
         
         logging.info(f"Results saved to {filename} and {csv_filename}")
         return filename
     
+    def serve_metrics(self, port=None):
+        """Expose metrics in Prometheus text format at /metrics on port
+        (default: metrics_settings.port)"""
+        metrics_settings = self.config.get('metrics_settings', {})
+        if port is None:
+            port = metrics_settings.get('port')
+        self.metrics_server = self.metrics.serve(port, metrics_settings.get('host', '127.0.0.1'))
+        return self.metrics_server
+    
+    def write_metrics(self, results_path):
+        """Write the run's metrics summary next to a results file"""
+        base = re.sub(r'\.(json|jsonl|parquet)(\.gz|\.zst)?$', '', results_path)
+        return self.metrics.write_summary(base + '.metrics.json')
+    
     def close(self):
         """Close the scraper and clean up resources"""
-        if self.driver:
-            self.driver.quit()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+        if self.driver_pool:
+            self.driver_pool.close()
+        if self.cache:
+            self.cache.close()
+        if self.dedup:
+            self.dedup.close()
+        if self.changes:
+            self.changes.close()
+        if self.index:
+            self.index.close()
 
 
 def main():
     """Main function to run the scraper"""
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <search_query> [num_results]")
-        print("Example: python main.py 'python web scraping' 5")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Web Scraper and Extractor powered by Google Search",
+        epilog="Example: python main.py 'python web scraping' 5"
+    )
+    parser.add_argument("query", nargs="?", help="Google search query")
+    parser.add_argument("num_results", nargs="?", type=int, default=5,
+                        help="Number of search results to scrape (default: 5)")
+    parser.add_argument("--render", choices=["requests", "selenium", "auto"], default=None,
+                        help="requests: never use a browser; selenium: render every page; auto: render "
+                             "only pages that need JavaScript (default: scraper_settings.use_selenium)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only output pages whose content changed since the last incremental run")
+    parser.add_argument("--format", choices=["json", "jsonl", "parquet"], default=None,
+                        help="json: one document written at the end; jsonl: stream each result to disk "
+                             "as it completes; parquet: columnar file written in row groups "
+                             "(default: output_settings.format)")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], default=None,
+                        help="Compress streamed jsonl/csv output, or set the parquet codec")
+    parser.add_argument("--job", metavar="NAME",
+                        help="Track progress under this job name so the run can be resumed; "
+                             "results are streamed to data/jobs/NAME.jsonl")
+    parser.add_argument("--resume", metavar="NAME",
+                        help="Continue an interrupted job with its original query and options")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Follow links from the search results (or --seed URLs) breadth-first")
+    parser.add_argument("--seed", action="append", metavar="URL",
+                        help="Start the crawl (or --watch) from this URL instead of a Google search "
+                             "(repeatable)")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="Links to follow away from a seed (default: crawl_settings.max_depth)")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="Stop the crawl after this many pages (default: crawl_settings.max_pages)")
+    parser.add_argument("--include", action="append", metavar="REGEX",
+                        help="Only follow links matching this pattern (repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="REGEX",
+                        help="Never follow links matching this pattern (repeatable)")
+    parser.add_argument("--any-domain", action="store_true",
+                        help="Follow links to other sites, not just the seeds' hosts")
+    parser.add_argument("--coordinator", metavar="QUEUE",
+                        help="Hand the search results to workers through a shared queue "
+                             "(redis://host:6379/0 or sqlite:///path) and collect their results")
+    parser.add_argument("--worker", metavar="QUEUE",
+                        help="Scrape URLs from a shared queue until the coordinator's job is done")
+    parser.add_argument("--dedup", choices=["flag", "drop"], default=None,
+                        help="Detect near-duplicate pages across runs: flag them with duplicate_of, "
+                             "or drop their content (default: dedup_settings)")
+    parser.add_argument("--changes", action="store_true",
+                        help="Write pages scraped in an earlier run as change records: added and removed "
+                             "text blocks, links and images, and the old title (default: change_settings)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port while running "
+                             "(default: metrics_settings.port)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep re-scraping the search results (or --seed URLs) and every URL watched "
+                             "before, polling each as often as its content changes; new and changed pages "
+                             "are appended to watch_settings.output")
+    parser.add_argument("--cache", action="store_true",
+                        help="Revalidate pages through the on-disk HTTP cache (default: cache_settings)")
+    parser.add_argument("--index", action="store_true",
+                        help="Add the scraped pages to the full-text search index (default: index_settings)")
+    parser.add_argument("--index-file", action="append", metavar="FILE",
+                        help="Add the pages of an earlier results file (.json or .jsonl) to the search "
+                             "index instead of scraping (repeatable)")
+    parser.add_argument("--search", metavar="TEXT",
+                        help="Search the indexed pages instead of scraping")
+    parser.add_argument("--limit", type=int, default=10,
+                        help="Number of --search results to show (default: 10)")
+    args = parser.parse_args()
+    offline = args.search or args.index_file
+    if args.query is None and not (args.resume or args.worker or args.watch or offline
+                                   or (args.crawl and args.seed)):
+        parser.error("a query is required unless --resume, --worker, --watch, --search, --index-file "
+                     "or --crawl --seed is given")
+    if args.watch and (args.job or args.resume or args.crawl or args.coordinator or args.incremental):
+        parser.error("--watch cannot be combined with --job, --resume, --crawl, --coordinator or --incremental")
+    if args.coordinator and (args.job or args.resume or args.crawl):
+        parser.error("--coordinator cannot be combined with --job, --resume or --crawl")
+    if (args.job or args.resume) and args.format == 'parquet':
+        parser.error("jobs stream JSONL output; --format parquet cannot be resumed")
     
-    query = sys.argv[1]
-    num_results = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    query = args.query
+    num_results = args.num_results
     
     # Create directories if they don't exist
+    config = load_config(CONFIG_PATH)
     os.makedirs('data', exist_ok=True)
-    os.makedirs('logs', exist_ok=True)
+    setup_logging(config.get('output_settings', {}).get('log_directory', 'logs/'))
+    
+    if offline:
+        index = open_index(config)
+        try:
+            for path in args.index_file or []:
+                print(f"Indexed {index.add_many(read_results(path))} pages from {path}")
+            if args.search:
+                start = time.perf_counter()
+                hits = index.search(args.search, args.limit)
+                elapsed = time.perf_counter() - start
+                print(f"{len(hits)} results for '{args.search}' among {len(index)} pages "
+                      f"({elapsed * 1000:.1f} ms)")
+                for i, hit in enumerate(hits):
+                    print(f"\n{i+1}. {hit['title'][:100]}\n   {hit['url']}\n   {hit['snippet']}")
+        finally:
+            index.close()
+        return
     
     # Initialize scraper
-    scraper = WebScraper(use_selenium=True)
+    if args.render:
+        use_selenium = {'requests': False, 'selenium': True, 'auto': 'auto'}[args.render]
+    else:
+        use_selenium = config.get('scraper_settings', {}).get('use_selenium', 'auto')
+    scraper = WebScraper(use_selenium=use_selenium)
+    if args.incremental:
+        scraper.enable_incremental()
+    if args.dedup:
+        scraper.enable_dedup(args.dedup)
+    if args.changes:
+        scraper.enable_changes()
+    if args.cache:
+        scraper.enable_cache()
+    if args.index:
+        scraper.enable_index()
+    if args.metrics_port is not None or scraper.config.get('metrics_settings', {}).get('port'):
+        scraper.serve_metrics(args.metrics_port)
+    
+    if args.worker:
+        queue = scraper.open_queue(args.worker)
+        try:
+            count = scraper.work(queue)
+            print(f"\nWorker finished: {count} pages scraped")
+        except KeyboardInterrupt:
+            print("\nWorker interrupted; its leases will be re-queued when they expire")
+        finally:
+            queue.close()
+            scraper.close()
+        return
+    
+    if args.watch:
+        schedule = scraper.open_watch()
+        output = scraper.config.get('watch_settings', {}).get('output', 'data/watch_changes.jsonl')
+        try:
+            urls = args.seed or (scraper.google_search(query, num_results) if query else [])
+            schedule.add(urls)
+            if not len(schedule):
+                print("Nothing to watch: give a query or --seed URLs")
+                return
+            # Changes are rare and may be hours apart, so flush each one
+            with ResultSink(output, flush_every=1) as sink:
+                print(f"Watching {len(schedule)} URLs; changes go to {sink.path} (Ctrl+C to stop)")
+                scraper.watch(schedule, on_change=sink.write)
+        except KeyboardInterrupt:
+            stats = schedule.stats()
+            print(f"\nWatch stopped: {stats['urls']} URLs, {stats['checks']} checks, "
+                  f"{stats['changes']} changes; the schedule is kept for the next run")
+        finally:
+            schedule.close()
+            scraper.close()
+        return
+    
+    output_format = args.format or scraper.config.get('output_settings', {}).get('format', 'json')
+    job = args.resume or args.job
+    frontier = None
     
     try:
-        # Search and scrape
-        results = scraper.search_and_scrape(query, num_results)
+        crawl_options = None
+        if args.crawl:
+            crawl_settings = scraper.config.get('crawl_settings', {})
+            crawl_options = {
+                'max_depth': args.max_depth if args.max_depth is not None else crawl_settings.get('max_depth', 2),
+                'max_pages': args.max_pages if args.max_pages is not None else crawl_settings.get('max_pages', 100),
+                'same_domain': crawl_settings.get('same_domain', True) and not args.any_domain,
+                'include': args.include or [],
+                'exclude': args.exclude or [],
+            }
+            if not args.resume:
+                crawl_options['seeds'] = args.seed or scraper.google_search(query, num_results)
+        
+        if job:
+            frontier = scraper.open_job(job, create=not args.resume)
+            if frontier.get_meta('query') is None:
+                frontier.set_meta('query', query or '')
+                frontier.set_meta('num_results', str(num_results))
+                frontier.set_meta('compression', args.compress or '')
+                if crawl_options is not None:
+                    frontier.set_meta('crawl', json.dumps(crawl_options))
+            elif args.resume:
+                query = frontier.get_meta('query')
+                num_results = int(frontier.get_meta('num_results'))
+                if frontier.get_meta('crawl'):
+                    crawl_options = json.loads(frontier.get_meta('crawl'))
+                print(f"Resuming job '{job}'" + (f" for query: {query}" if query else ""))
+            else:
+                raise ValueError(f"Job '{job}' already exists; use --resume {job}")
+            sink = ResultSink(scraper.job_path(job) + '.jsonl',
+                              compression=frontier.get_meta('compression') or None)
+        elif output_format == 'jsonl':
+            # Stream results to disk as they complete
+            sink = ResultSink(f"data/scraping_results_{int(time.time())}.jsonl", compression=args.compress)
+        elif output_format == 'parquet':
+            sink = ParquetSink(f"data/scraping_results_{int(time.time())}.parquet",
+                               compression=args.compress or 'zstd')
+        else:
+            sink = None
         
-        # Save results
-        filename = scraper.save_results(results)
+        # Search (or crawl) and scrape
+        def run(sink=None):
+            if args.coordinator:
+                queue = scraper.open_queue(args.coordinator)
+                try:
+                    return scraper.coordinate(queue, scraper.google_search(query, num_results), sink)
+                finally:
+                    queue.close()
+            if crawl_options is not None:
+                return scraper.crawl(frontier=frontier, sink=sink, **crawl_options)
+            if frontier is not None:
+                scraper.run_job(frontier, sink, query, num_results)
+                return []
+            return scraper.search_and_scrape(query, num_results, sink=sink)
+        
+        if sink is not None:
+            with sink:
+                results = run(sink)
+            filename = sink.path
+            total, successful = sink.count, sink.count - sink.errors
+        else:
+            results = run()
+            
+            # Save results
+            filename = scraper.save_results(results)
+            total = len(results)
+            successful = sum(1 for r in results if 'error' not in r)
+        if scraper.fingerprints is not None:
+            scraper.fingerprints.save()
+        metrics_file = None
+        if scraper.metrics.enabled and scraper.config.get('metrics_settings', {}).get('summary', True):
+            metrics_file = scraper.write_metrics(filename)
         
         # Print summary
         print(f"\nScraping completed!")
-        print(f"Total URLs processed: {len(results)}")
-        successful = sum(1 for r in results if 'error' not in r)
+        print(f"Total URLs processed: {total}")
         print(f"Successful scrapes: {successful}")
         print(f"Results saved to: {filename}")
+        if scraper.cache:
+            stats = scraper.cache.stats()
+            print(f"HTTP cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['bytes_saved'] / 1024:.1f} KB saved")
+        stats = scraper.session.stats()
+        print(f"Connections: {stats['new_connections']} opened for {stats['requests']} requests "
+              f"({stats['reuse_rate']:.0%} reused), avg TTFB {stats['ttfb_avg_ms']:.0f} ms")
+        if scraper.robots:
+            stats = scraper.robots.stats()
+            print(f"robots.txt: {stats['fetches']} fetched for {stats['hosts']} hosts, "
+                  f"{stats['blocked']} pages disallowed")
+        if scraper.render_policy:
+            stats = scraper.render_policy.stats()
+            print(f"Rendering: {stats['probed']} domains probed, "
+                  f"{stats['escalated']} pages rendered in a browser")
+        if scraper.fingerprints is not None:
+            counts = scraper.fingerprints.counts
+            print(f"Incremental: {counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged")
+        if scraper.dedup is not None:
+            counts = scraper.dedup.counts
+            print(f"Near-duplicates: {counts['duplicates']} of {counts['checked']} pages "
+                  f"({'dropped' if scraper.dedup_action == 'drop' else 'flagged'})")
+        if scraper.changes is not None:
+            counts = scraper.changes.counts
+            print(f"Changes: {counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged")
+        if scraper.index is not None:
+            scraper.index.flush()
+            print(f"Search index: {len(scraper.index)} pages in {scraper.index.path} "
+                  f"(query with --search)")
+        if frontier is not None:
+            counts = frontier.counts()
+            print(f"Job '{job}': {counts['done']} done, {counts['failed']} failed, "
+                  f"{counts['pending']} pending")
+        if metrics_file:
+            stages = scraper.metrics.summary()['stages']
+            slowest = sorted(stages, key=lambda name: stages[name]['total_s'], reverse=True)[:3]
+            print("Time by stage: " + ", ".join(f"{name} {stages[name]['total_s']:.2f}s" for name in slowest)
+                  + f" (details in {metrics_file})")
         
         # Show first few results
-        print("\nFirst few results:")
+        if results:
+            print("\nFirst few results:")
         for i, result in enumerate(results[:3]):
-            if 'error' not in result:
+            if result.get('status') == 'unchanged':
+                print(f"{i+1}. Unchanged: {result['url']}")
+            elif result.get('status') == 'duplicate':
+                print(f"{i+1}. Duplicate of {result['duplicate_of']}: {result['url']}")
+            elif result.get('status') == 'changed' and 'version' in result:
+                print(f"{i+1}. Changed: {result['title'][:80]} (+{len(result.get('added_blocks', []))} "
+                      f"-{len(result.get('removed_blocks', []))} blocks)")
+            elif 'error' not in result:
                 print(f"{i+1}. {result['title'][:100]}...")
             else:
                 print(f"{i+1}. Error: {result['error']}")
     
     except KeyboardInterrupt:
         print("\nScraping interrupted by user")
+        if frontier is not None:
+            print(f"Progress saved. Continue with: python main.py --resume {job}")
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}")
         print(f"An error occurred: {str(e)}")
     finally:
+        if frontier is not None:
+            frontier.close()
         scraper.close()
 
 
@@ -2,61 +2,50 @@
 Minimal web scraper for executable creation
 """
 import sys
-import os
-import requests
-from bs4 import BeautifulSoup
 import json
 import time
-import re
-from urllib.parse import urljoin, urlparse
+import itertools
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def scrape_url(url, timeout=10):
+from scraper.parsers import DEFAULT_PARSER, PARSERS, extract_page, resolve_parser
+from scraper.streaming import extract_chunks
+from scraper.transport import DEFAULT_MAX_BODY_BYTES, create_session, get_session, iter_body, read_body
+
+MAX_TEXT_LENGTH = 5000
+DEFAULT_WORKERS = 8
+
+def scrape_url(url, timeout=10, parser=DEFAULT_PARSER, session=None,
+               max_body_bytes=DEFAULT_MAX_BODY_BYTES, stop_early=False):
     """
     Scrape a single URL and extract content
+
+    The body is streamed and rejected if it is not text or exceeds
+    max_body_bytes. With stop_early the download is abandoned as soon as
+    MAX_TEXT_LENGTH characters of text are collected, so links and images
+    only cover the start of the page. The stream parser always parses the
+    body as it downloads, decoding it with the response charset.
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Extract title
-        title = soup.title.string.strip() if soup.title else "No Title"
-        
-        # Extract text content
-        text_content = soup.get_text()
-        # Clean up text
-        lines = (line.strip() for line in text_content.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text_content = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Extract links
-        links = []
-        for link in soup.find_all('a', href=True):
-            full_url = urljoin(url, link['href'])
-            link_text = link.get_text().strip()
-            if link_text:
-                links.append({"url": full_url, "text": link_text})
+        # Reuse pooled keep-alive connections across calls
+        session = session or get_session()
+        with session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            if stop_early or parser == 'stream':
+                page = extract_chunks(iter_body(response, max_body_bytes), response.encoding, url,
+                                      max_chars=MAX_TEXT_LENGTH if stop_early else None)
+            else:
+                page = extract_page(read_body(response, max_body_bytes), url, parser)
         
-        # Extract images
-        images = []
-        for img in soup.find_all('img', src=True):
-            full_url = urljoin(url, img['src'])
-            alt_text = img.get('alt', '')
-            images.append({"url": full_url, "alt": alt_text})
+        # Keep only links that have visible text
+        links = [{"url": link['url'], "text": link['text']}
+                 for link in page['links'] if link['text']]
+        images = [{"url": img['src'], "alt": img['alt']} for img in page['images']]
         
         return {
             "url": url,
-            "title": title,
-            "text_content": text_content[:5000],  # Limit content length
+            "title": page['title'],
+            "text_content": page['content'][:MAX_TEXT_LENGTH],  # Limit content length
             "links": links,
             "images": images,
             "status_code": response.status_code
@@ -68,15 +57,104 @@ def scrape_url(url, timeout=10):
             "status_code": None
         }
 
+def read_urls(source):
+    """Yield URLs from a file, or from stdin when source is '-', one per
+    line, skipping blank lines and # comments"""
+    f = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def scrape_batch(urls, workers=DEFAULT_WORKERS, timeout=10, parser=DEFAULT_PARSER,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES, stop_early=False, session=None):
+    """
+    Scrape an iterable of URLs on `workers` threads, yielding each
+    scrape_url result as soon as it completes
+
+    All workers share one session whose pool keeps a keep-alive connection
+    per worker and host. URLs are pulled from the iterable as workers free
+    up, so an input of any length is processed in bounded memory.
+    """
+    session = session or create_session({'pool_maxsize': workers, 'timeout': timeout})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for url in urls:
+            pending.add(pool.submit(scrape_url, url, timeout, parser, session,
+                                    max_body_bytes, stop_early))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def run_batch(urls, output, **options):
+    """Stream scrape_batch results as JSONL to output ('-' for stdout),
+    flushing every line, and return (total, errors)"""
+    out = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8')
+    total = errors = 0
+    try:
+        for result in scrape_batch(urls, **options):
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+            total += 1
+            errors += 'error' in result
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return total, errors
+
 def main():
-    parser = argparse.ArgumentParser(description="Web Scraper Tool")
-    parser.add_argument("url", help="URL to scrape")
-    parser.add_argument("--output", "-o", default="output.json", help="Output file path")
+    parser = argparse.ArgumentParser(
+        description="Web Scraper Tool",
+        epilog="One URL is saved as a JSON document. Several URLs, or a list given with "
+               "--input, are scraped in parallel and streamed as JSON Lines."
+    )
+    parser.add_argument("url", nargs="*", help="URL(s) to scrape")
+    parser.add_argument("--input", "-i", metavar="FILE",
+                        help="Read URLs from FILE, one per line ('-' for stdin)")
+    parser.add_argument("--output", "-o", default=None,
+                        help="Output file path (default: output.json for one URL, "
+                             "stdout ('-') for a batch)")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS,
+                        help="URLs scraped in parallel in batch mode")
+    parser.add_argument("--parser", "-p", default=DEFAULT_PARSER, choices=list(PARSERS),
+                        help="HTML parser backend")
+    parser.add_argument("--max-body-mb", type=float, default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                        help="Skip pages whose body is larger than this")
+    parser.add_argument("--stop-early", action="store_true",
+                        help=f"Stop downloading once {MAX_TEXT_LENGTH} characters of text are collected")
     
     args = parser.parse_args()
+    if not args.url and not args.input:
+        parser.error("give a URL or --input FILE")
+    
+    max_body_bytes = int(args.max_body_mb * 1024 * 1024)
+    if args.input or len(args.url) > 1:
+        urls = list(args.url)
+        if args.input:
+            urls = itertools.chain(urls, read_urls(args.input))
+        output = args.output or '-'
+        start = time.time()
+        # Progress goes to stderr so stdout carries only JSON Lines
+        total, errors = run_batch(urls, output, workers=args.workers,
+                                  parser=resolve_parser(args.parser),
+                                  max_body_bytes=max_body_bytes, stop_early=args.stop_early)
+        print(f"Scraped {total} URLs ({errors} errors) in {time.time() - start:.1f}s"
+              + (f", results saved to {output}" if output != '-' else ""), file=sys.stderr)
+        return
     
-    print(f"Scraping {args.url}...")
-    result = scrape_url(args.url)
+    args.output = args.output or "output.json"
+    print(f"Scraping {args.url[0]}...")
+    result = scrape_url(args.url[0], parser=resolve_parser(args.parser),
+                        max_body_bytes=max_body_bytes, stop_early=args.stop_early)
     
     # Save to file
     with open(args.output, 'w', encoding='utf-8') as f:
@@ -0,0 +1,3 @@
+"""
+Scraper modules used by the WebScraper application
+"""
@@ -0,0 +1,184 @@
+"""
+On-disk HTTP response cache with conditional revalidation
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from scraper.transport import DEFAULT_MAX_BODY_BYTES, body_encoding, read_body
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    parser TEXT,
+    page TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+class HttpCache:
+    """SQLite-backed cache of response bodies keyed by URL.
+
+    Cached entries are revalidated with If-None-Match / If-Modified-Since and
+    a 304 answer is served from the cache. The extracted page fields can be
+    stored next to the body so an unchanged page is not parsed again.
+    Entries not downloaded or revalidated for max_age seconds are dropped, and the least recently
+    used entries are evicted once the stored bodies exceed max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=500 * 1024 * 1024, max_age=7 * 24 * 3600):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, encoding, body, parser, page, stored_at"
+                " FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row and time.time() - row[6] > self.max_age:
+                self._delete(url)
+                self._db.commit()
+                return None
+            return row
+
+    def _delete(self, url):
+        row = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._size -= row[0]
+
+    def fetch(self, session, url, parser=None, max_body_bytes=DEFAULT_MAX_BODY_BYTES, **kwargs):
+        """GET a URL through the cache.
+
+        Returns (body, encoding, page). page holds the previously extracted
+        fields when the server answered 304 and they were produced by the
+        same parser; otherwise it is None and the caller should extract
+        the body and hand the fields to store_page(). Bodies are streamed
+        and rejected once they exceed max_body_bytes.
+        """
+        entry = self._lookup(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            etag, last_modified = entry[0], entry[1]
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        with session.get(url, headers=headers, stream=True, **kwargs) as response:
+            return self._handle(url, parser, entry, response, max_body_bytes)
+
+    def _handle(self, url, parser, entry, response, max_body_bytes):
+        if entry and response.status_code == 304:
+            etag, last_modified, encoding, body, cached_parser, page, _ = entry
+            # A revalidated entry is as fresh as a new download; the server
+            # may also send updated validators with the 304
+            etag = response.headers.get('ETag') or etag
+            last_modified = response.headers.get('Last-Modified') or last_modified
+            now = time.time()
+            with self._lock:
+                self.hits += 1
+                self.bytes_saved += len(body)
+                self._db.execute("UPDATE responses SET etag = ?, last_modified = ?, stored_at = ?,"
+                                 " accessed_at = ? WHERE url = ?",
+                                 (etag, last_modified, now, now, url))
+                self._db.commit()
+            if page is not None and cached_parser == parser:
+                return body, encoding, json.loads(page)
+            return body, encoding, None
+
+        with self._lock:
+            self.misses += 1
+        body = read_body(response, max_body_bytes)
+        encoding = body_encoding(response, body)
+        if response.status_code == 200:
+            self._store(url, response.headers, body, encoding)
+        elif entry:
+            with self._lock:
+                self._delete(url)
+                self._db.commit()
+        return body, encoding, None
+
+    def _store(self, url, headers, body, encoding):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in headers.get('Cache-Control', ''):
+            return
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._delete(url)
+            self._db.execute(
+                "INSERT INTO responses (url, etag, last_modified, encoding, body, size,"
+                " stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, body, len(body), now, now)
+            )
+            self._size += len(body)
+            self._evict()
+            self._db.commit()
+
+    def store_page(self, url, parser, page):
+        """Attach extracted page fields to a cached response"""
+        with self._lock:
+            self._db.execute("UPDATE responses SET parser = ?, page = ? WHERE url = ?",
+                             (parser, json.dumps(page, ensure_ascii=False), url))
+            self._db.commit()
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        expired = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE stored_at < ?", (cutoff,)
+        ).fetchone()[0]
+        if expired:
+            self._db.execute("DELETE FROM responses WHERE stored_at < ?", (cutoff,))
+            self._size -= expired
+
+        while self._size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT url, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+
+    def stats(self):
+        """Counters for the end-of-run summary"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def close(self):
+        try:
+            self._db.close()
+        except sqlite3.Error as e:
+            logging.warning(f"Error closing HTTP cache: {e}")
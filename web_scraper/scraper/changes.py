@@ -0,0 +1,280 @@
+"""
+Structured diffs between successive scrapes of the same URL
+
+A page is reduced to its title, its content split into text blocks, and
+its link and image sets. Each URL's latest version is stored as a
+compressed base snapshot followed by the deltas of the changes since, and
+a new scrape is reported as a compact change record: the blocks, links
+and images added and removed, and the old title when it changed.
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import difflib
+import threading
+
+from scraper.incremental import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    snapshot BLOB NOT NULL,
+    delta_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS deltas (
+    url TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    delta BLOB NOT NULL,
+    PRIMARY KEY (url, version)
+) WITHOUT ROWID;
+"""
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Sentences longer than this are cut further (navigation bars, tables and
+# other text without punctuation)
+MAX_BLOCK_WORDS = 50
+
+
+def _cut(words):
+    # Content-defined cut points: a block ends after a word whose hash has
+    # its low 4 bits clear, so an insertion only shifts the block it lands in
+    blocks, start = [], 0
+    for i, word in enumerate(words):
+        if zlib.crc32(word.encode('utf-8')) & 15 == 0 and i + 1 - start >= 4:
+            blocks.append(' '.join(words[start:i + 1]))
+            start = i + 1
+    if start < len(words):
+        blocks.append(' '.join(words[start:]))
+    return blocks
+
+
+def split_blocks(text):
+    """Split cleaned page text into sentence-sized blocks"""
+    blocks = []
+    for sentence in _SENTENCE_END.split(text or ''):
+        words = sentence.split()
+        if len(words) > MAX_BLOCK_WORDS:
+            blocks.extend(_cut(words))
+        elif words:
+            blocks.append(' '.join(words))
+    return blocks
+
+
+def page_state(result):
+    """The parts of a scrape result that are compared between versions"""
+    # Keyed by URL in page order; the first occurrence's text wins
+    links, images = {}, {}
+    for link in result.get('links') or []:
+        links.setdefault(link['url'], link.get('text', ''))
+    for image in result.get('images') or []:
+        images.setdefault(image['src'], image.get('alt', ''))
+    return {
+        'title': result.get('title', ''),
+        'blocks': split_blocks(result.get('content', '')),
+        'links': list(links.items()),
+        'images': list(images.items()),
+    }
+
+
+def state_digest(state):
+    return fingerprint(json.dumps(state, ensure_ascii=False, separators=(',', ':')))
+
+
+def _set_delta(old, new):
+    old_keys = {key for key, _ in old}
+    new_keys = {key for key, _ in new}
+    return ([pair for pair in new if pair[0] not in old_keys],
+            [key for key, _ in old if key not in new_keys])
+
+
+def diff_states(old, new):
+    """Delta that turns state old into state new.
+
+    Blocks are diffed as a sequence and stored as an edit script: a
+    positive int keeps that many blocks, a negative one drops them and a
+    list inserts its blocks. Links and images are diffed as sets keyed by
+    URL. Only the parts that changed are present.
+    """
+    delta = {}
+    if old['title'] != new['title']:
+        delta['title'] = new['title']
+    if old['blocks'] != new['blocks']:
+        script = []
+        matcher = difflib.SequenceMatcher(None, old['blocks'], new['blocks'], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                script.append(i2 - i1)
+                continue
+            if i2 > i1:
+                script.append(i1 - i2)
+            if j2 > j1:
+                script.append(new['blocks'][j1:j2])
+        delta['blocks'] = script
+    for field in ('links', 'images'):
+        added, removed = _set_delta(old[field], new[field])
+        if added:
+            delta[field + '_added'] = added
+        if removed:
+            delta[field + '_removed'] = removed
+    return delta
+
+
+def apply_delta(state, delta):
+    """Inverse of diff_states: the state a delta leads to"""
+    blocks = state['blocks']
+    if 'blocks' in delta:
+        blocks, position = [], 0
+        for step in delta['blocks']:
+            if isinstance(step, list):
+                blocks.extend(step)
+            elif step > 0:
+                blocks.extend(state['blocks'][position:position + step])
+                position += step
+            else:
+                position -= step
+    new = {'title': delta.get('title', state['title']), 'blocks': blocks}
+    for field in ('links', 'images'):
+        removed = set(delta.get(field + '_removed', ()))
+        new[field] = [pair for pair in state[field] if pair[0] not in removed]
+        new[field].extend(tuple(pair) for pair in delta.get(field + '_added', ()))
+    return new
+
+
+def change_record(url, old, delta, version):
+    """Compact result record describing what a delta changed"""
+    record = {'url': url, 'status': 'changed', 'version': version,
+              'title': delta.get('title', old['title'])}
+    if 'title' in delta:
+        record['previous_title'] = old['title']
+    if 'blocks' in delta:
+        added, removed, position = [], [], 0
+        for step in delta['blocks']:
+            if isinstance(step, list):
+                added.extend(step)
+            elif step > 0:
+                position += step
+            else:
+                removed.extend(old['blocks'][position:position - step])
+                position -= step
+        record['added_blocks'] = added
+        record['removed_blocks'] = removed
+    old_pairs = {'links': dict(old['links']), 'images': dict(old['images'])}
+    for field, key, label in (('links', 'url', 'text'), ('images', 'src', 'alt')):
+        added = delta.get(field + '_added', [])
+        removed = delta.get(field + '_removed', [])
+        if added:
+            record['added_' + field] = [{label: value, key: item} for item, value in added]
+        if removed:
+            record['removed_' + field] = [{label: old_pairs[field][item], key: item} for item in removed]
+    record['scraped_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    return record
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def _load_state(blob):
+    state = _unpack(blob)
+    state['links'] = [tuple(pair) for pair in state['links']]
+    state['images'] = [tuple(pair) for pair in state['images']]
+    return state
+
+
+class ChangeStore:
+    """SQLite store of each URL's latest version as a snapshot plus deltas.
+
+    record() compares a new scrape with the stored version. An identical
+    page is detected from a digest without reading the snapshot. A changed
+    page appends one compressed delta, so storage grows with the size of
+    the change rather than the page. Once a URL has max_deltas deltas, or
+    they outweigh the snapshot, its current version becomes the new
+    snapshot and the deltas are dropped, which bounds the work of
+    rebuilding a version.
+    """
+
+    def __init__(self, path, max_deltas=10):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_deltas = max_deltas
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _current(self, url, snapshot):
+        state = _load_state(snapshot)
+        for (delta,) in self._db.execute("SELECT delta FROM deltas WHERE url = ? ORDER BY version",
+                                         (url,)):
+            state = apply_delta(state, _unpack(delta))
+        return state
+
+    def current(self, url):
+        """Latest stored state of a URL, or None if it was never recorded"""
+        with self._lock:
+            row = self._db.execute("SELECT snapshot FROM pages WHERE url = ?", (url,)).fetchone()
+            return self._current(url, row[0]) if row else None
+
+    def record(self, result):
+        """Store a scrape result and return (status, change).
+
+        status is 'new', 'changed' or 'unchanged'; change is the change
+        record of a changed page and None otherwise.
+        """
+        url = result['url']
+        state = page_state(result)
+        digest = state_digest(state)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version, digest, snapshot, delta_bytes FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self._db.execute("INSERT INTO pages (url, version, digest, snapshot) VALUES (?, 1, ?, ?)",
+                                 (url, digest, _pack(state)))
+                self._db.commit()
+                self.counts['new'] += 1
+                return 'new', None
+            version, stored_digest, snapshot, delta_bytes = row
+            if digest == stored_digest:
+                self.counts['unchanged'] += 1
+                return 'unchanged', None
+
+            old = self._current(url, snapshot)
+            delta = diff_states(old, state)
+            packed = _pack(delta)
+            version += 1
+            chain = self._db.execute("SELECT COUNT(*) FROM deltas WHERE url = ?", (url,)).fetchone()[0]
+            if chain >= self.max_deltas or delta_bytes + len(packed) > len(snapshot):
+                self._db.execute("DELETE FROM deltas WHERE url = ?", (url,))
+                self._db.execute("UPDATE pages SET version = ?, digest = ?, snapshot = ?, delta_bytes = 0"
+                                 " WHERE url = ?", (version, digest, _pack(state), url))
+            else:
+                self._db.execute("INSERT INTO deltas (url, version, delta) VALUES (?, ?, ?)",
+                                 (url, version, packed))
+                self._db.execute("UPDATE pages SET version = ?, digest = ?, delta_bytes = ? WHERE url = ?",
+                                 (version, digest, delta_bytes + len(packed), url))
+            self._db.commit()
+            self.counts['changed'] += 1
+        return 'changed', change_record(url, old, delta, version)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
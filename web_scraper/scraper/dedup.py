@@ -0,0 +1,163 @@
+"""
+Near-duplicate page detection with SimHash and a persistent LSH index
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    simhash INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    key INTEGER NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (key, doc)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+HASH_BITS = 64
+
+_WORDS = re.compile(r'\w+')
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of the word shingles of a text.
+
+    Texts that share most of their shingles get hashes that differ in only
+    a few bits, so near-duplicates can be found by Hamming distance.
+    """
+    words = _WORDS.findall(text.lower())
+    if len(words) >= shingle_size:
+        shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    else:
+        shingles = {' '.join(words)}
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    digests = format(int.from_bytes(digests, 'big'), 'b').zfill(len(digests) * 8)
+    # Count the 1s in each bit position; a bit is set when most shingles set it
+    threshold = len(shingles) / 2
+    bits = ''.join('1' if digests[i::HASH_BITS].count('1') > threshold else '0' for i in range(HASH_BITS))
+    return int(bits, 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def duplicate_result(url, duplicate_of):
+    """Marker record for a page dropped as a near-duplicate of another"""
+    return {
+        'url': url,
+        'status': 'duplicate',
+        'duplicate_of': duplicate_of,
+        'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+class NearDuplicateIndex:
+    """SQLite-backed SimHash index of the pages seen so far, across runs.
+
+    Pages whose hashes differ in at most max_distance bits are treated as
+    near-duplicates. The 64 hash bits are split into max_distance + 1
+    bands; two such hashes must agree exactly on at least one band, so a
+    lookup only compares against pages sharing a band value, found through
+    the (key, doc) primary key. Each page costs one 8-byte hash plus one
+    index row per band on disk, and nothing stays in memory. Texts with
+    fewer than min_words words are not checked, since short boilerplate
+    pages ("Not Found", login walls) would all match each other.
+    """
+
+    def __init__(self, path, max_distance=3, min_words=30):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BITS - 1}, not {max_distance}")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.min_words = min_words
+        self.counts = {'checked': 0, 'duplicates': 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # The banding is baked into the stored keys, so it is fixed per index file
+        stored = self._db.execute("SELECT value FROM meta WHERE key = 'max_distance'").fetchone()
+        if stored is None:
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('max_distance', ?)",
+                             (str(max_distance),))
+        elif int(stored[0]) != max_distance:
+            raise ValueError(f"{path} was built with max_distance={stored[0]}, not {max_distance}")
+        self._db.commit()
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._band_bits = HASH_BITS // self.bands
+
+    def _band_keys(self, value):
+        # With a single band (max_distance=0) the key is the whole hash
+        mask = (1 << self._band_bits) - 1
+        return [_signed((band << self._band_bits) | ((value >> (band * self._band_bits)) & mask))
+                for band in range(self.bands)]
+
+    def _nearest(self, value, keys, url):
+        placeholders = ','.join('?' * len(keys))
+        best = None
+        for doc_url, stored in self._db.execute(
+                f"SELECT DISTINCT d.url, d.simhash FROM bands b JOIN docs d ON d.id = b.doc"
+                f" WHERE b.key IN ({placeholders})", keys):
+            distance = hamming(value, stored % (1 << HASH_BITS))
+            if doc_url != url and distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (doc_url, distance)
+        return best[0] if best else None
+
+    def check(self, url, text):
+        """Return the URL of an indexed near-duplicate of text, or None.
+
+        A page that is not a duplicate is added to the index (replacing any
+        earlier hash for the same URL), so the first copy seen is the one
+        kept and later copies point to it.
+        """
+        if len(_WORDS.findall(text)) < self.min_words:
+            return None
+        value = simhash(text)
+        keys = self._band_keys(value)
+        with self._lock:
+            self.counts['checked'] += 1
+            duplicate_of = self._nearest(value, keys, url)
+            if duplicate_of is not None:
+                self.counts['duplicates'] += 1
+                return duplicate_of
+            row = self._db.execute("SELECT id FROM docs WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                doc = self._db.execute("INSERT INTO docs (url, simhash) VALUES (?, ?)",
+                                       (url, _signed(value))).lastrowid
+            else:
+                doc = row[0]
+                self._db.execute("UPDATE docs SET simhash = ? WHERE id = ?", (_signed(value), doc))
+                self._db.execute("DELETE FROM bands WHERE doc = ?", (doc,))
+            self._db.executemany("INSERT OR IGNORE INTO bands (key, doc) VALUES (?, ?)",
+                                 [(key, doc) for key in keys])
+            self._db.commit()
+            return None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,607 @@
+"""
+Shared work queues and the coordinator/worker loops for multi-node scraping
+
+A coordinator submits URLs to a queue that any number of workers, on any
+number of machines, lease URLs from. Politeness is enforced by the queue:
+every lease reserves the next start slot for the URL's host, so requests
+to one host are spaced by the cluster-wide delay however many workers are
+running, or by the host's robots.txt Crawl-delay when that is longer.
+Workers heartbeat their leases; leases of a worker that stops
+heartbeating expire and the URLs are handed out again. Slots are wall
+clock times, so worker clocks should be kept in sync (NTP).
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from scraper.extract import error_result
+from scraper.frontier import normalize_url
+
+# Leased URLs whose start slot is further away than this are left for later
+LEASE_HORIZON = 5.0
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    not_before REAL,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_state_host ON tasks (state, host);
+CREATE INDEX IF NOT EXISTS tasks_worker ON tasks (worker);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    next_slot REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS host_delays (
+    host TEXT PRIMARY KEY,
+    delay REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _host(url):
+    return urlsplit(url).netloc
+
+
+def _expired_result(url, attempts):
+    return error_result(url, f"Lease expired after {attempts} attempts")
+
+
+class SqliteWorkQueue:
+    """Work queue in a SQLite file shared by processes on one machine.
+
+    Meant for tests and single-box runs; use RedisWorkQueue across
+    machines. Every operation runs in its own IMMEDIATE transaction, so
+    concurrent processes see a consistent queue.
+    """
+
+    def __init__(self, path, lease_seconds=60, max_attempts=3):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SQLITE_SCHEMA)
+
+    def _transaction(self, work):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                value = work(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return value
+
+    def configure(self, delay):
+        """Set the cluster-wide delay between requests to the same host"""
+        self.set_meta('delay', str(delay))
+
+    def set_host_delay(self, host, delay):
+        """Space one host's requests by `delay` seconds when that is longer
+        than the cluster-wide delay (robots.txt Crawl-delay)"""
+        self._transaction(lambda db: db.execute(
+            "INSERT OR REPLACE INTO host_delays (host, delay) VALUES (?, ?)", (host, delay)))
+
+    def reset(self):
+        """Forget the URLs, results, host delays and closed flag of an
+        earlier job so the queue can run a new one. Hosts' reserved slots
+        are kept, so politeness holds across jobs."""
+        def work(db):
+            db.execute("DELETE FROM tasks")
+            db.execute("DELETE FROM results")
+            db.execute("DELETE FROM host_delays")
+            db.execute("DELETE FROM meta WHERE key = 'closed'")
+
+        self._transaction(work)
+
+    def submit(self, urls):
+        """Queue URLs not submitted before; returns how many were new"""
+        rows = [(url, _host(url)) for url in map(normalize_url, urls)]
+
+        def work(db):
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO tasks (url, host, state) VALUES (?, ?, 'pending')",
+                           rows)
+            return db.total_changes - before
+
+        return self._transaction(work)
+
+    def lease(self, worker, limit=10):
+        """Lease up to `limit` URLs as (url, not_before) pairs.
+
+        not_before is the wall-clock time the request may start: the host's
+        next free slot, which moves on by the configured delay (or the
+        host's own, if longer) with every URL leased. Hosts take turns, and
+        a host only gives out URLs whose slot is within LEASE_HORIZON
+        seconds.
+        """
+        def work(db):
+            # Read the clock once the write lock is held, so a lease that
+            # waited for another process does not hand out a past slot
+            now = time.time()
+            row = db.execute("SELECT value FROM meta WHERE key = 'delay'").fetchone()
+            delay = float(row[0]) if row else 0.0
+            slots, steps = {}, {}
+            for host, slot, host_delay in db.execute(
+                    "SELECT t.host, COALESCE(h.next_slot, 0) AS slot, COALESCE(d.delay, 0)"
+                    " FROM (SELECT DISTINCT host FROM tasks WHERE state = 'pending') t"
+                    " LEFT JOIN hosts h ON h.host = t.host"
+                    " LEFT JOIN host_delays d ON d.host = t.host"
+                    " WHERE COALESCE(h.next_slot, 0) <= ? ORDER BY slot LIMIT ?",
+                    (now + LEASE_HORIZON, limit)):
+                slots[host] = max(now, slot)
+                steps[host] = max(delay, host_delay)
+            leased = []
+            active = list(slots)
+            while active and len(leased) < limit:
+                for host in list(active):
+                    if len(leased) >= limit:
+                        break
+                    row = db.execute("SELECT url FROM tasks WHERE state = 'pending' AND host = ?"
+                                     " ORDER BY rowid LIMIT 1", (host,)).fetchone()
+                    if row is None or slots[host] > now + LEASE_HORIZON:
+                        active.remove(host)
+                        continue
+                    db.execute("UPDATE tasks SET state = 'leased', worker = ?, not_before = ?,"
+                               " lease_expires = ?, attempts = attempts + 1 WHERE url = ?",
+                               (worker, slots[host], slots[host] + self.lease_seconds, row[0]))
+                    leased.append((row[0], slots[host]))
+                    slots[host] += steps[host]
+            db.executemany("INSERT OR REPLACE INTO hosts (host, next_slot) VALUES (?, ?)",
+                           slots.items())
+            db.execute("INSERT OR REPLACE INTO workers (worker, last_seen) VALUES (?, ?)",
+                       (worker, now))
+            return leased
+
+        return self._transaction(work)
+
+    def heartbeat(self, worker):
+        """Extend the leases held by a worker and record that it is alive"""
+        now = time.time()
+
+        def work(db):
+            db.execute("UPDATE tasks SET lease_expires = MAX(lease_expires, ?)"
+                       " WHERE worker = ? AND state = 'leased'", (now + self.lease_seconds, worker))
+            db.execute("INSERT OR REPLACE INTO workers (worker, last_seen) VALUES (?, ?)",
+                       (worker, now))
+
+        self._transaction(work)
+
+    def complete(self, worker, url, result):
+        """Record a result; ignored (returns False) if the lease was lost"""
+        state = 'failed' if 'error' in result else 'done'
+        payload = json.dumps(result, ensure_ascii=False)
+
+        def work(db):
+            updated = db.execute("UPDATE tasks SET state = ?, worker = NULL WHERE url = ?"
+                                 " AND worker = ? AND state = 'leased'", (state, url, worker)).rowcount
+            if updated:
+                db.execute("INSERT INTO results (result) VALUES (?)", (payload,))
+            return bool(updated)
+
+        return self._transaction(work)
+
+    def requeue_expired(self):
+        """Hand expired leases out again, failing URLs out of attempts"""
+        now = time.time()
+
+        def work(db):
+            expired = db.execute("SELECT url, attempts FROM tasks WHERE state = 'leased'"
+                                 " AND lease_expires < ?", (now,)).fetchall()
+            for url, attempts in expired:
+                if attempts >= self.max_attempts:
+                    db.execute("UPDATE tasks SET state = 'failed', worker = NULL WHERE url = ?", (url,))
+                    db.execute("INSERT INTO results (result) VALUES (?)",
+                               (json.dumps(_expired_result(url, attempts)),))
+                else:
+                    db.execute("UPDATE tasks SET state = 'pending', worker = NULL WHERE url = ?", (url,))
+            return len(expired)
+
+        return self._transaction(work)
+
+    def pop_results(self, limit=1000):
+        """Remove and return up to `limit` results in completion order"""
+        def work(db):
+            rows = db.execute("SELECT id, result FROM results ORDER BY id LIMIT ?", (limit,)).fetchall()
+            if rows:
+                db.execute("DELETE FROM results WHERE id <= ?", (rows[-1][0],))
+            return [json.loads(result) for _, result in rows]
+
+        return self._transaction(work)
+
+    def counts(self):
+        """Number of URLs pending, leased, done and failed"""
+        with self._lock:
+            counts = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+            counts.update(self._db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state"))
+            return counts
+
+    def workers(self):
+        """{worker id: seconds since its last lease or heartbeat}"""
+        now = time.time()
+        with self._lock:
+            return {worker: now - seen for worker, seen in self._db.execute(
+                "SELECT worker, last_seen FROM workers")}
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close_submissions(self):
+        """Tell workers that no more URLs will be submitted"""
+        self.set_meta('closed', '1')
+
+    def finished(self):
+        """True once submissions are closed and every URL is done or failed"""
+        counts = self.counts()
+        return self.get_meta('closed') == '1' and not counts['pending'] and not counts['leased']
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Lua scripts keep each Redis operation atomic. Keys are derived from the
+# prefix in ARGV[1], so the queue needs a single (non-cluster) Redis.
+_REDIS_SUBMIT = """
+local p = ARGV[1]
+local added = 0
+for i = 2, #ARGV, 2 do
+    local url, host = ARGV[i], ARGV[i + 1]
+    if redis.call('SADD', p .. ':seen', url) == 1 then
+        redis.call('RPUSH', p .. ':pending:' .. host, url)
+        redis.call('HSET', p .. ':host', url, host)
+        local slot = redis.call('HGET', p .. ':next_slot', host) or 0
+        redis.call('ZADD', p .. ':hosts', 'NX', slot, host)
+        added = added + 1
+    end
+end
+redis.call('HINCRBY', p .. ':counts', 'pending', added)
+return added
+"""
+
+_REDIS_LEASE = """
+local p, worker = ARGV[1], ARGV[2]
+local limit, now, lease = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local horizon = now + tonumber(ARGV[6])
+local delay = tonumber(redis.call('HGET', p .. ':meta', 'delay') or 0)
+local hosts = redis.call('ZRANGEBYSCORE', p .. ':hosts', '-inf', horizon,
+                         'LIMIT', 0, limit, 'WITHSCORES')
+local slots = {}
+for i = 1, #hosts, 2 do
+    local host_delay = tonumber(redis.call('HGET', p .. ':host_delay', hosts[i]) or 0)
+    table.insert(slots, {host = hosts[i], slot = math.max(now, tonumber(hosts[i + 1])),
+                         step = math.max(delay, host_delay)})
+end
+local leased = {}
+local count, progress = 0, true
+while progress and count < limit do
+    progress = false
+    for _, entry in ipairs(slots) do
+        if count < limit and not entry.empty and entry.slot <= horizon then
+            local url = redis.call('LPOP', p .. ':pending:' .. entry.host)
+            if url then
+                redis.call('ZADD', p .. ':leases', entry.slot + lease, url)
+                redis.call('HSET', p .. ':owner', url, worker)
+                redis.call('SADD', p .. ':worker:' .. worker, url)
+                redis.call('HINCRBY', p .. ':attempts', url, 1)
+                redis.call('HINCRBY', p .. ':counts', 'pending', -1)
+                redis.call('HINCRBY', p .. ':counts', 'leased', 1)
+                table.insert(leased, url)
+                table.insert(leased, tostring(entry.slot))
+                entry.slot = entry.slot + entry.step
+                count = count + 1
+                progress = true
+            else
+                entry.empty = true
+            end
+        end
+    end
+end
+for _, entry in ipairs(slots) do
+    redis.call('HSET', p .. ':next_slot', entry.host, entry.slot)
+    if redis.call('LLEN', p .. ':pending:' .. entry.host) > 0 then
+        redis.call('ZADD', p .. ':hosts', entry.slot, entry.host)
+    else
+        redis.call('ZREM', p .. ':hosts', entry.host)
+    end
+end
+redis.call('HSET', p .. ':workers', worker, now)
+return leased
+"""
+
+_REDIS_HEARTBEAT = """
+local p, worker = ARGV[1], ARGV[2]
+local now, lease = tonumber(ARGV[3]), tonumber(ARGV[4])
+for _, url in ipairs(redis.call('SMEMBERS', p .. ':worker:' .. worker)) do
+    local expires = tonumber(redis.call('ZSCORE', p .. ':leases', url) or 0)
+    if expires < now + lease then
+        redis.call('ZADD', p .. ':leases', 'XX', now + lease, url)
+    end
+end
+redis.call('HSET', p .. ':workers', worker, now)
+"""
+
+_REDIS_COMPLETE = """
+local p, worker, url = ARGV[1], ARGV[2], ARGV[3]
+if redis.call('HGET', p .. ':owner', url) ~= worker then
+    return 0
+end
+redis.call('ZREM', p .. ':leases', url)
+redis.call('HDEL', p .. ':owner', url)
+redis.call('SREM', p .. ':worker:' .. worker, url)
+redis.call('HINCRBY', p .. ':counts', 'leased', -1)
+redis.call('HINCRBY', p .. ':counts', ARGV[5], 1)
+redis.call('RPUSH', p .. ':results', ARGV[4])
+return 1
+"""
+
+_REDIS_REQUEUE = """
+local p, now, max_attempts = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local expired = redis.call('ZRANGEBYSCORE', p .. ':leases', '-inf', now)
+for _, url in ipairs(expired) do
+    local worker = redis.call('HGET', p .. ':owner', url)
+    redis.call('ZREM', p .. ':leases', url)
+    redis.call('HDEL', p .. ':owner', url)
+    if worker then
+        redis.call('SREM', p .. ':worker:' .. worker, url)
+    end
+    redis.call('HINCRBY', p .. ':counts', 'leased', -1)
+    local attempts = tonumber(redis.call('HGET', p .. ':attempts', url) or 0)
+    if attempts >= max_attempts then
+        redis.call('HINCRBY', p .. ':counts', 'failed', 1)
+        redis.call('RPUSH', p .. ':expired', url)
+    else
+        local host = redis.call('HGET', p .. ':host', url)
+        redis.call('LPUSH', p .. ':pending:' .. host, url)
+        local slot = redis.call('HGET', p .. ':next_slot', host) or 0
+        redis.call('ZADD', p .. ':hosts', 'NX', slot, host)
+        redis.call('HINCRBY', p .. ':counts', 'pending', 1)
+    end
+end
+return #expired
+"""
+
+
+# Per-job keys, removed by reset() along with the pending:<host> lists and
+# worker:<id> sets; next_slot and workers outlive jobs
+_REDIS_JOB_KEYS = ('seen', 'host', 'hosts', 'leases', 'owner', 'attempts', 'counts',
+                   'results', 'expired', 'meta', 'host_delay')
+
+
+class RedisWorkQueue:
+    """Work queue in Redis, shared by workers on any number of machines.
+
+    Same interface as SqliteWorkQueue. All keys start with `prefix`, so
+    several jobs can share one Redis database. Requires the redis package.
+    """
+
+    def __init__(self, url, prefix='web_scraper', lease_seconds=60, max_attempts=3):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Redis work queues require the 'redis' package")
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._submit = self._redis.register_script(_REDIS_SUBMIT)
+        self._lease = self._redis.register_script(_REDIS_LEASE)
+        self._heartbeat = self._redis.register_script(_REDIS_HEARTBEAT)
+        self._complete = self._redis.register_script(_REDIS_COMPLETE)
+        self._requeue = self._redis.register_script(_REDIS_REQUEUE)
+
+    def _key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def configure(self, delay):
+        self.set_meta('delay', str(delay))
+
+    def set_host_delay(self, host, delay):
+        self._redis.hset(self._key('host_delay'), host, delay)
+
+    def reset(self):
+        keys = [self._key(name) for name in _REDIS_JOB_KEYS]
+        for pattern in ('pending:*', 'worker:*'):
+            keys += self._redis.scan_iter(match=self._key(pattern))
+        self._redis.delete(*keys)
+
+    def submit(self, urls):
+        args = [self.prefix]
+        for url in map(normalize_url, urls):
+            args += [url, _host(url)]
+        return self._submit(args=args)
+
+    def lease(self, worker, limit=10):
+        reply = self._lease(args=[self.prefix, worker, limit, time.time(),
+                                  self.lease_seconds, LEASE_HORIZON])
+        return [(reply[i], float(reply[i + 1])) for i in range(0, len(reply), 2)]
+
+    def heartbeat(self, worker):
+        self._heartbeat(args=[self.prefix, worker, time.time(), self.lease_seconds])
+
+    def complete(self, worker, url, result):
+        state = 'failed' if 'error' in result else 'done'
+        payload = json.dumps(result, ensure_ascii=False)
+        return bool(self._complete(args=[self.prefix, worker, url, payload, state]))
+
+    def requeue_expired(self):
+        count = self._requeue(args=[self.prefix, time.time(), self.max_attempts])
+        while True:
+            url = self._redis.lpop(self._key('expired'))
+            if url is None:
+                break
+            attempts = int(self._redis.hget(self._key('attempts'), url) or 0)
+            self._redis.rpush(self._key('results'), json.dumps(_expired_result(url, attempts)))
+        return count
+
+    def pop_results(self, limit=1000):
+        with self._redis.pipeline() as pipe:
+            pipe.lrange(self._key('results'), 0, limit - 1)
+            pipe.ltrim(self._key('results'), limit, -1)
+            rows, _ = pipe.execute()
+        return [json.loads(row) for row in rows]
+
+    def counts(self):
+        counts = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+        counts.update({state: int(n) for state, n in self._redis.hgetall(self._key('counts')).items()})
+        return counts
+
+    def workers(self):
+        now = time.time()
+        return {worker: now - float(seen)
+                for worker, seen in self._redis.hgetall(self._key('workers')).items()}
+
+    def get_meta(self, key, default=None):
+        value = self._redis.hget(self._key('meta'), key)
+        return default if value is None else value
+
+    def set_meta(self, key, value):
+        self._redis.hset(self._key('meta'), key, value)
+
+    def close_submissions(self):
+        self.set_meta('closed', '1')
+
+    def finished(self):
+        counts = self.counts()
+        return self.get_meta('closed') == '1' and not counts['pending'] and not counts['leased']
+
+    def close(self):
+        self._redis.close()
+
+
+def open_queue(url, **options):
+    """Open a work queue from a redis://, rediss:// or sqlite:/// URL"""
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisWorkQueue(url, **options)
+    if url.startswith('sqlite:///'):
+        return SqliteWorkQueue(url[len('sqlite:///'):], **options)
+    raise ValueError(f"Unsupported work queue URL '{url}': use redis://... or sqlite:///path")
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue, scrape, worker_id=None, concurrency=10, poll_interval=1.0, stop=None):
+    """Lease URLs from queue and scrape them until the queue is finished.
+
+    scrape(url) returns a result dict (WebScraper.scrape_page). Each URL
+    starts no earlier than the slot the queue reserved for it. Up to
+    `concurrency` URLs are held at once, and a new one is leased as soon as
+    any finishes, so one slow page does not hold up the others. Leases are
+    heartbeated from a background thread every third of the lease time.
+    Returns how many results this worker reported.
+    """
+    worker_id = worker_id or default_worker_id()
+    concurrency = max(1, int(concurrency))
+    stop = stop or threading.Event()
+    done = threading.Event()
+    reported = 0
+
+    def heartbeat():
+        while not done.wait(queue.lease_seconds / 3):
+            try:
+                queue.heartbeat(worker_id)
+            except Exception as e:
+                logging.warning(f"Heartbeat failed: {e}")
+
+    def process(item):
+        url, not_before = item
+        delay = not_before - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        result = scrape(url)
+        return queue.complete(worker_id, url, result)
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            while not stop.is_set():
+                if len(pending) < concurrency:
+                    for item in queue.lease(worker_id, concurrency - len(pending)):
+                        pending.add(executor.submit(process, item))
+                if not pending:
+                    if queue.finished():
+                        break
+                    stop.wait(poll_interval)
+                    continue
+                completed, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                reported += sum(future.result() for future in completed)
+            # Leases already taken are finished before stopping
+            reported += sum(future.result() for future in pending)
+    finally:
+        done.set()
+        heartbeat_thread.join()
+    logging.info(f"Worker {worker_id} finished after {reported} pages")
+    return reported
+
+
+def run_coordinator(queue, urls, on_result, delay=1, poll_interval=1.0, crawl_delay=None):
+    """Submit urls, then collect results until workers have finished them.
+
+    The queue is reset first, so URLs of an earlier job on the same queue
+    are scraped again; start workers after the coordinator when reusing a
+    queue. crawl_delay(url), when given, returns the robots.txt Crawl-delay
+    of the URL's host (or None) and is looked up once per host. Results
+    are passed to on_result as they arrive. Expired leases are re-queued on
+    every poll.
+    """
+    urls = list(urls)
+    queue.reset()
+    queue.configure(delay)
+    if crawl_delay is not None:
+        for host, url in {_host(normalize_url(url)): url for url in reversed(urls)}.items():
+            host_delay = crawl_delay(url)
+            if host_delay and host_delay > delay:
+                queue.set_host_delay(host, host_delay)
+    added = queue.submit(urls)
+    queue.close_submissions()
+    logging.info(f"Submitted {added} URLs to the work queue")
+    while True:
+        requeued = queue.requeue_expired()
+        if requeued:
+            logging.warning(f"Re-queued {requeued} URLs whose lease expired")
+        for result in queue.pop_results():
+            on_result(result)
+        if queue.finished():
+            for result in queue.pop_results():
+                on_result(result)
+            break
+        time.sleep(poll_interval)
@@ -0,0 +1,211 @@
+"""
+Selenium WebDriver setup and a pool of drivers for parallel rendering
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+
+def create_chrome_driver(headless=True, extra_arguments=()):
+    """Create a Chrome WebDriver with the scraper's standard options.
+
+    This is the only place Chrome is configured; WebScraper and
+    utils.helpers.setup_chrome_driver both go through it.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')  # Run in background
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    for argument in extra_arguments:
+        chrome_options.add_argument(argument)
+
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()),
+        options=chrome_options
+    )
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+
+def _process_tree_mb(driver):
+    """Resident memory of chromedriver and every process under it (the
+    browser, renderers, GPU process) in MB, or None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def driver_memory_mb(driver):
+    """Memory used by the browser behind a driver in MB, or None if unknown.
+
+    This is the resident memory of the whole Chrome process tree when
+    psutil is installed. Without it, only the current page's JS heap
+    (performance.memory) can be read, which misses DOM, image and
+    renderer memory.
+    """
+    memory = _process_tree_mb(driver)
+    if memory is not None:
+        return memory
+    try:
+        used = driver.execute_script(
+            "return window.performance && performance.memory && performance.memory.usedJSHeapSize"
+        )
+    except Exception:
+        return None
+    return used / (1024 * 1024) if used else None
+
+
+def driver_is_healthy(driver):
+    """Check that the browser behind a driver still answers commands"""
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """A bounded pool of WebDrivers leased to concurrent callers.
+
+    Drivers are created lazily by `factory` up to `size`. A driver is
+    quit and later replaced once it has rendered `max_pages` pages or its
+    browser's memory (see driver_memory_mb) exceeds `max_memory_mb`. Idle drivers are health-checked
+    before each lease, and a driver that fails a lease is checked too;
+    crashed ones are discarded so the next lease starts a fresh browser.
+    """
+
+    def __init__(self, factory, size=1, max_pages=100, max_memory_mb=None):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.recycled = 0
+        self.replaced = 0
+        self._idle = []
+        self._pages = {}
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def start(self, count=1):
+        """Create `count` drivers up front so setup errors surface immediately"""
+        drivers = [self._acquire(None) for _ in range(min(count, self.size))]
+        for driver in drivers:
+            self._return(driver)
+
+    def _acquire(self, timeout):
+        while True:
+            with self._cond:
+                while not self._idle and self._live >= self.size:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if not self._cond.wait(timeout):
+                        raise TimeoutError("Timed out waiting for a WebDriver")
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    self._live += 1
+
+            if driver is None:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._cond:
+                        self._live -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._pages[driver] = 0
+                return driver
+
+            if driver_is_healthy(driver):
+                return driver
+            logging.warning("WebDriver failed its health check, replacing it")
+            self.replaced += 1
+            self._discard(driver)
+
+    def _return(self, driver):
+        with self._cond:
+            if not self._closed:
+                self._idle.append(driver)
+                self._cond.notify()
+                return
+        self._discard(driver)
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"Error quitting WebDriver: {e}")
+        with self._cond:
+            self._pages.pop(driver, None)
+            self._live -= 1
+            self._cond.notify()
+
+    def _release(self, driver, failed):
+        if failed and not driver_is_healthy(driver):
+            logging.warning("WebDriver crashed, replacing it")
+            self.replaced += 1
+            self._discard(driver)
+            return
+
+        with self._cond:
+            self._pages[driver] = pages = self._pages.get(driver, 0) + 1
+        if pages >= self.max_pages:
+            self.recycled += 1
+            self._discard(driver)
+            return
+        if self.max_memory_mb is not None:
+            memory = driver_memory_mb(driver)
+            if memory is not None and memory > self.max_memory_mb:
+                logging.info(f"Recycling WebDriver using {memory:.0f} MB")
+                self.recycled += 1
+                self._discard(driver)
+                return
+        self._return(driver)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a driver for the duration of a with-block"""
+        driver = self._acquire(timeout)
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(driver, failed)
+
+    def close(self):
+        """Quit every idle driver; leased drivers are quit when returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
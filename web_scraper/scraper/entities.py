@@ -0,0 +1,101 @@
+"""
+Entity extraction (emails, phone numbers) over cleaned page text
+
+Each enabled extractor contributes a named group to one combined regular
+expression, compiled once per set of extractors, so a page's content is
+scanned in a single pass however many extractors are on. Matches are
+normalized and deduplicated in order of first appearance.
+"""
+
+import os
+import re
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+EMAIL_PATTERN = r'(?<![\w.%+-])[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}\b'
+PHONE_PATTERN = r'(?<![\w+])(?:\+\d{1,3}[-.\s]?)?(?:\(\d{3}\)|\d{3})[-.\s]?\d{3}[-.\s]?\d{4}(?!\w)'
+
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+PHONE_RE = re.compile(PHONE_PATTERN)
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_email(email):
+    return email.lower()
+
+
+def normalize_phone(phone):
+    """Digits only, keeping a leading + for international numbers"""
+    digits = _NON_DIGITS.sub('', phone)
+    return '+' + digits if phone.startswith('+') else digits
+
+
+# Result field -> (pattern, normalizer)
+EXTRACTORS = {
+    'emails': (EMAIL_PATTERN, normalize_email),
+    'phones': (PHONE_PATTERN, normalize_phone),
+}
+
+
+class EntityExtractor:
+    """Find the named entity types in text with one precompiled pattern"""
+
+    def __init__(self, names):
+        unknown = [name for name in names if name not in EXTRACTORS]
+        if unknown:
+            raise ValueError(f"Unknown extractor '{unknown[0]}'. Choose from: {', '.join(EXTRACTORS)}")
+        self.names = tuple(dict.fromkeys(names))
+        self.pattern = re.compile('|'.join(f'(?P<{name}>{EXTRACTORS[name][0]})' for name in self.names))
+        self._normalizers = {name: EXTRACTORS[name][1] for name in self.names}
+
+    def extract(self, text):
+        """Return {name: [normalized matches]} for every enabled extractor"""
+        found = {name: {} for name in self.names}
+        if text and self.names:
+            for match in self.pattern.finditer(text):
+                name = match.lastgroup
+                found[name].setdefault(self._normalizers[name](match.group()), None)
+        return {name: list(values) for name, values in found.items()}
+
+    def apply(self, result):
+        """Add the entity fields to a scrape result that has content"""
+        if 'error' not in result and result.get('content') is not None:
+            result.update(self.extract(result['content']))
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def get_extractor(names):
+    """Shared extractor for a tuple of names, compiled once per process"""
+    return EntityExtractor(names)
+
+
+def _extract_texts(names, texts):
+    extractor = get_extractor(names)
+    return [extractor.extract(text) for text in texts]
+
+
+def extract_batch(results, names, workers=None, chunk_size=64):
+    """Add entity fields to a list of scrape results, in place.
+
+    Only page contents are sent to a pool of `workers` processes, in chunks
+    of chunk_size pages. With a single worker, or a single chunk of work,
+    everything runs in this process. Returns results.
+    """
+    names = tuple(names)
+    indexes = [i for i, result in enumerate(results)
+               if 'error' not in result and result.get('content') is not None]
+    texts = [results[i]['content'] for i in indexes]
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+    if workers <= 1:
+        found = [_extract_texts(names, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            found = list(pool.map(_extract_texts, [names] * len(chunks), chunks))
+
+    for i, entities in zip(indexes, (entities for chunk in found for entities in chunk)):
+        results[i].update(entities)
+    return results
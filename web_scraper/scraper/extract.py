@@ -0,0 +1,49 @@
+"""
+Content extraction from fetched HTML
+"""
+
+import time
+import logging
+
+from scraper.parsers import DEFAULT_PARSER, extract_page
+
+
+def decode_body(body, encoding):
+    """Decode a raw response body the same way requests' Response.text does"""
+    if isinstance(body, str):
+        return body
+    try:
+        return str(body, encoding or 'utf-8', errors='replace')
+    except (LookupError, TypeError):
+        return str(body, errors='replace')
+
+
+def error_result(url, error):
+    """Build the result dict for a page that could not be scraped"""
+    return {
+        'url': url,
+        'error': str(error),
+        'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def build_result(url, page):
+    """Build the scrape result dict from extracted page fields"""
+    return {
+        'url': url,
+        **page,
+        'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def extract_result(body, encoding, url, parser=DEFAULT_PARSER):
+    """Decode a raw body and build the full scrape result dict for a URL.
+    
+    This is a module-level function so it can run in a process pool.
+    """
+    try:
+        page = extract_page(decode_body(body, encoding), url, parser)
+    except Exception as e:
+        logging.error(f"Error scraping {url}: {str(e)}")
+        return error_result(url, e)
+    return build_result(url, page)
@@ -0,0 +1,101 @@
+"""
+Concurrent fetch engine with per-host politeness
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+class HostThrottle:
+    """Space out request start times to the same host.
+
+    The spacing is `delay`, or a longer per-host delay returned by
+    host_delay(url) (such as a robots.txt Crawl-delay). host_delay is
+    called once per host, on a worker thread, so it may block.
+    """
+
+    def __init__(self, delay, host_delay=None):
+        self.delay = delay
+        self.host_delay = host_delay
+        self._delays = {}
+        self._next_slot = {}
+        self._locks = {}
+
+    def lock(self, host):
+        """Return the lock that serializes scheduling for a host"""
+        if host not in self._locks:
+            self._locks[host] = asyncio.Lock()
+        return self._locks[host]
+
+    async def wait(self, host, url=None):
+        """Sleep until the host may be requested again (call with lock(host) held)"""
+        loop = asyncio.get_running_loop()
+        if self.host_delay is not None and url is not None and host not in self._delays:
+            host_delay = await loop.run_in_executor(None, self.host_delay, url)
+            self._delays[host] = max(self.delay, host_delay or 0)
+        ready = self._next_slot.get(host, 0)
+        now = loop.time()
+        if ready > now:
+            await asyncio.sleep(ready - now)
+
+    def mark(self, host):
+        """Record that a request to the host is starting now"""
+        self._next_slot[host] = asyncio.get_running_loop().time() + self._delays.get(host, self.delay)
+
+
+async def fetch_all(urls, fetch, concurrency=10, delay=1, on_result=None, throttle=None,
+                    max_tasks=1000):
+    """
+    Call fetch(url) for every URL with at most `concurrency` calls in flight.
+
+    fetch is a blocking callable and runs on a thread pool. Requests to the
+    same host start at least `delay` seconds apart, while different hosts
+    proceed independently. Results are returned in input order, unless
+    on_result is given: then each result is passed to it as soon as it
+    completes and is not kept. urls may be any iterable; it is read as
+    tasks finish, with at most `max_tasks` URLs scheduled (waiting for
+    their host or in flight) at once, so with on_result memory does not
+    grow with the number of URLs. Pass a shared throttle to keep spacing
+    requests across several calls made from the same event loop.
+    """
+    concurrency = max(1, int(concurrency))
+    max_tasks = max(concurrency, int(max_tasks))
+    throttle = throttle or HostThrottle(delay)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    total = f"/{len(urls)}" if hasattr(urls, '__len__') else ""
+    results = [] if on_result is None else None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run(index, url):
+            host = urlparse(url).netloc
+            # Hold the host lock until a global slot is free so that the
+            # delay is measured from the real start of the previous request.
+            async with throttle.lock(host):
+                await throttle.wait(host, url)
+                await semaphore.acquire()
+                throttle.mark(host)
+            try:
+                logging.info(f"Scraping ({index+1}{total}): {url}")
+                result = await loop.run_in_executor(executor, fetch, url)
+            finally:
+                semaphore.release()
+            if on_result is None:
+                results[index] = result
+            else:
+                on_result(result)
+
+        pending = set()
+        for index, url in enumerate(urls):
+            if len(pending) >= max_tasks:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            if results is not None:
+                results.append(None)
+            pending.add(asyncio.ensure_future(run(index, url)))
+        if pending:
+            await asyncio.gather(*pending)
+        return results
@@ -0,0 +1,209 @@
+"""
+Persistent crawl frontier with URL deduplication for resumable jobs
+"""
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    depth INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_state ON urls (state);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+STATES = ('pending', 'in_flight', 'done', 'failed')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form of a URL used for deduplication.
+
+    Lowercases the scheme and host, drops default ports and the fragment,
+    gives an empty path a '/' and sorts the query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and DEFAULT_PORTS.get(scheme) == port:
+        netloc = netloc[:netloc.rfind(':')]
+    path = parts.path or ('/' if netloc else '')
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives and give false positives
+    at roughly error_rate once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class Frontier:
+    """SQLite-backed set of job URLs and their states.
+
+    Every URL is stored once, in normalized form, as pending, in_flight,
+    done or failed. A Bloom filter in front of the table answers most
+    "seen before?" checks without touching the database. URLs that were
+    in flight when a previous run stopped go back to pending on open, so a
+    job picks up where it left off. Job-level values such as the search
+    query live in a small key/value meta table.
+    """
+
+    def __init__(self, path, bloom_capacity=100000, error_rate=0.001):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(urls)")]
+        if 'depth' not in columns:
+            # Job files created before link following was added
+            self._db.execute("ALTER TABLE urls ADD COLUMN depth INTEGER NOT NULL DEFAULT 0")
+        self.requeued = self._db.execute(
+            "UPDATE urls SET state = 'pending' WHERE state = 'in_flight'").rowcount
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        self._rebuild_bloom(max(bloom_capacity, self._count * 2))
+
+    def _rebuild_bloom(self, capacity):
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for (url,) in self._db.execute("SELECT url FROM urls"):
+            self._bloom.add(url)
+
+    def _seen(self, url):
+        if url not in self._bloom:
+            return False
+        return self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def seen(self, url):
+        """True if the normalized URL is already in the frontier"""
+        with self._lock:
+            return self._seen(normalize_url(url))
+
+    def add_new(self, urls, depth=0):
+        """Queue URLs that have not been seen before and return them normalized"""
+        added = []
+        now = time.time()
+        with self._lock:
+            for url in urls:
+                url = normalize_url(url)
+                if self._seen(url):
+                    continue
+                self._db.execute("INSERT INTO urls (url, state, depth, updated_at)"
+                                 " VALUES (?, 'pending', ?, ?)", (url, depth, now))
+                self._bloom.add(url)
+                self._count += 1
+                added.append(url)
+            if self._count > self._bloom.capacity:
+                self._rebuild_bloom(self._count * 2)
+            self._db.commit()
+        return added
+
+    def add(self, urls, depth=0):
+        """Queue URLs that have not been seen before; returns how many were new"""
+        return len(self.add_new(urls, depth))
+
+    def _start(self, urls):
+        self._db.executemany(
+            "UPDATE urls SET state = 'in_flight', attempts = attempts + 1, updated_at = ?"
+            " WHERE url = ?", [(time.time(), url) for url in urls])
+        self._db.commit()
+
+    def claim(self, limit=1):
+        """Move up to `limit` pending URLs to in_flight and return them"""
+        with self._lock:
+            urls = [row[0] for row in self._db.execute(
+                "SELECT url FROM urls WHERE state = 'pending' ORDER BY rowid LIMIT ?", (limit,))]
+            self._start(urls)
+        return urls
+
+    def start(self, urls):
+        """Mark URLs chosen by an external scheduler as in_flight"""
+        with self._lock:
+            self._start(urls)
+
+    def pending(self):
+        """(url, depth) of every pending URL, in the order they were added"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT url, depth FROM urls WHERE state = 'pending' ORDER BY rowid").fetchall()
+
+    def _finish(self, url, state, error=None):
+        with self._lock:
+            self._db.execute("UPDATE urls SET state = ?, error = ?, updated_at = ? WHERE url = ?",
+                             (state, error, time.time(), normalize_url(url)))
+            self._db.commit()
+
+    def complete(self, url):
+        self._finish(url, 'done')
+
+    def fail(self, url, error):
+        self._finish(url, 'failed', str(error))
+
+    def counts(self):
+        """Number of URLs in each state"""
+        with self._lock:
+            counts = dict.fromkeys(STATES, 0)
+            counts.update(self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"))
+            return counts
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
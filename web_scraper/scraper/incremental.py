@@ -0,0 +1,81 @@
+"""
+Content fingerprints for incremental re-scraping
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+def fingerprint(data):
+    """Short stable hash of a str or bytes value"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def unchanged_result(url):
+    """Marker record for a page whose content has not changed"""
+    return {
+        'url': url,
+        'status': 'unchanged',
+        'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+class FingerprintStore:
+    """Per-URL hashes of the raw body and cleaned content from earlier runs.
+
+    A page whose raw body hash matches is skipped before extraction. If the
+    body changed but the cleaned content did not (rotating ads, CSRF tokens
+    and the like), the page is still reported as unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+
+    def body_unchanged(self, url, body_hash):
+        """Check the raw body hash, counting the page as unchanged on a match"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry and entry['body'] == body_hash:
+                self.counts['unchanged'] += 1
+                return True
+            return False
+
+    def update(self, url, body_hash, content_hash):
+        """Record new hashes for a URL and return 'new', 'changed' or 'unchanged'"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                status = 'new'
+            elif entry['content'] == content_hash:
+                status = 'unchanged'
+            else:
+                status = 'changed'
+            self._entries[url] = {
+                'body': body_hash,
+                'content': content_hash,
+                'checked_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self.counts[status] += 1
+            return status
+
+    def save(self):
+        """Write the store atomically so an interrupted save keeps the old file"""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
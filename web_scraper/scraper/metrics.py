@@ -0,0 +1,262 @@
+"""
+Per-stage timers, counters and histograms with Prometheus and JSON export
+
+Instrumented code records into the module-level METRICS registry, the same
+way it logs through the root logger, so the transport, the parsers and
+WebScraper all feed one set of numbers without passing a handle around.
+Histograms use fixed buckets: recording a value is a bisect and a couple
+of additions under one lock, cheap enough to leave on for every page.
+Extraction done in pipeline worker processes is recorded in those
+processes and does not show up here.
+"""
+
+import json
+import bisect
+import logging
+import threading
+import time
+
+# Upper bounds in seconds, from sub-millisecond parsing to slow downloads
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label used for hosts beyond max_hosts, so a crawl cannot grow the series without bound
+OTHER_HOST = 'other'
+
+
+class Histogram:
+    """Bucketed distribution of durations in seconds"""
+
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating within its bucket"""
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def stats(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.sum, 6),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.50) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe('stage_seconds', time.perf_counter() - self.start, stage=self.name)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and duration histograms.
+
+    stage(name) times a block into the stage_seconds histogram. host()
+    maps a hostname to its label, folding hosts past max_hosts into
+    OTHER_HOST. With enabled False every call is a no-op.
+    """
+
+    def __init__(self, enabled=True, max_hosts=1000):
+        self.enabled = enabled
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop everything recorded so far"""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._hosts = set()
+            self.started = time.time()
+
+    def host(self, host):
+        if host in self._hosts:
+            return host
+        with self._lock:
+            if len(self._hosts) < self.max_hosts:
+                self._hosts.add(host)
+                return host
+        return OTHER_HOST
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def stage(self, name):
+        """Context manager that records how long its block takes as stage `name`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def _snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {}
+            for key, histogram in self._histograms.items():
+                copy = histograms[key] = Histogram()
+                copy.merge(histogram)
+        return counters, histograms
+
+    def prometheus(self, prefix='web_scraper'):
+        """Everything recorded, in the Prometheus text exposition format"""
+        counters, histograms = self._snapshot()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (key, labels), value in sorted(counters.items()):
+                if key == name:
+                    lines.append(f"{prefix}_{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for (key, labels), histogram in sorted(histograms.items()):
+                if key != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{prefix}_{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{prefix}_{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{prefix}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _group(histograms, name, label):
+        """Merge the series of one histogram by the value of a single label"""
+        groups = {}
+        for (key, labels), histogram in histograms.items():
+            value = dict(labels).get(label)
+            if key == name and value is not None:
+                groups.setdefault(value, Histogram()).merge(histogram)
+        return {value: groups[value].stats() for value in sorted(groups)}
+
+    def summary(self):
+        """Per-stage, per-host and per-status statistics as a JSON-ready dict"""
+        counters, histograms = self._snapshot()
+        totals = {}
+        for (name, labels), value in sorted(counters.items()):
+            label = ','.join(f"{key}={value}" for key, value in labels)
+            totals.setdefault(name, {})[label or 'total'] = value
+        return {
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'duration_s': round(time.time() - self.started, 3),
+            'stages': self._group(histograms, 'stage_seconds', 'stage'),
+            'hosts': self._group(histograms, 'page_seconds', 'host'),
+            'status_codes': self._group(histograms, 'ttfb_seconds', 'status'),
+            'counters': totals,
+        }
+
+    def write_summary(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the Prometheus text format at /metrics from a daemon thread.
+
+        Returns the HTTP server; call shutdown() on it to stop serving.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+METRICS = Metrics()
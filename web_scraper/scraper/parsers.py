@@ -0,0 +1,160 @@
+"""
+Pluggable HTML parser backends for content extraction
+
+Every backend returns the same title/content/links/images structure so the
+parser can be switched from config without changing the scraped output.
+"""
+
+import logging
+import importlib.util
+from urllib.parse import urljoin
+
+from scraper.metrics import METRICS
+from scraper.streaming import extract_stream
+
+DEFAULT_PARSER = 'html.parser'
+
+
+def clean_text(text):
+    """Collapse extracted page text into single-spaced phrases"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def _extract_soup(html, url, features):
+    # Imported on first use so the stream and selectolax backends never load bs4
+    from bs4 import BeautifulSoup
+    
+    with METRICS.stage('parse'):
+        soup = BeautifulSoup(html, features)
+    
+    with METRICS.stage('clean'):
+        # Extract content
+        title = soup.find('title')
+        title = title.text.strip() if title else "No Title"
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        # Extract text content
+        text_content = clean_text(soup.get_text())
+    
+    with METRICS.stage('links'):
+        # Extract links
+        links = []
+        for link in soup.find_all('a', href=True):
+            full_url = urljoin(url, link['href'])
+            links.append({
+                'text': link.text.strip(),
+                'url': full_url
+            })
+        
+        # Extract images
+        images = []
+        for img in soup.find_all('img', src=True):
+            full_url = urljoin(url, img['src'])
+            images.append({
+                'alt': img.get('alt', ''),
+                'src': full_url
+            })
+    
+    return {
+        'title': title,
+        'content': text_content,
+        'links': links,
+        'images': images
+    }
+
+
+def extract_html_parser(html, url):
+    """Extract with BeautifulSoup on the pure-Python html.parser"""
+    return _extract_soup(html, url, 'html.parser')
+
+
+def extract_lxml(html, url):
+    """Extract with BeautifulSoup on the lxml (libxml2) tree builder"""
+    return _extract_soup(html, url, 'lxml')
+
+
+def extract_selectolax(html, url):
+    """Extract with selectolax's C-based Lexbor tree, bypassing BeautifulSoup"""
+    from selectolax.lexbor import LexborHTMLParser
+    
+    with METRICS.stage('parse'):
+        tree = LexborHTMLParser(html)
+    
+    with METRICS.stage('clean'):
+        title = tree.css_first('title')
+        title = title.text().strip() if title else "No Title"
+        
+        tree.strip_tags(["script", "style"])
+        text_content = clean_text(tree.root.text()) if tree.root else ''
+    
+    with METRICS.stage('links'):
+        # Valueless attributes come back as None, BeautifulSoup gives ''
+        links = []
+        for link in tree.css('a[href]'):
+            links.append({
+                'text': link.text().strip(),
+                'url': urljoin(url, link.attributes['href'] or '')
+            })
+        
+        images = []
+        for img in tree.css('img[src]'):
+            images.append({
+                'alt': img.attributes.get('alt') or '',
+                'src': urljoin(url, img.attributes['src'] or '')
+            })
+    
+    return {
+        'title': title,
+        'content': text_content,
+        'links': links,
+        'images': images
+    }
+
+
+PARSERS = {
+    'html.parser': extract_html_parser,
+    'lxml': extract_lxml,
+    'selectolax': extract_selectolax,
+    'stream': extract_stream,
+}
+
+# Backends that need a package beyond beautifulsoup4
+_REQUIRES = {
+    'lxml': 'lxml',
+    'selectolax': 'selectolax',
+}
+
+
+def parser_available(name):
+    """Check whether a parser backend and its dependency are installed"""
+    if name not in PARSERS:
+        return False
+    module = _REQUIRES.get(name)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_parsers():
+    """Names of the parser backends usable in this environment"""
+    return [name for name in PARSERS if parser_available(name)]
+
+
+def resolve_parser(name):
+    """Validate a configured parser name, falling back to html.parser if its
+    dependency is not installed"""
+    name = name or DEFAULT_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser '{name}'. Choose from: {', '.join(PARSERS)}")
+    if not parser_available(name):
+        logging.warning(f"Parser '{name}' is not installed. Falling back to {DEFAULT_PARSER}.")
+        return DEFAULT_PARSER
+    return name
+
+
+def extract_page(html, url, parser=DEFAULT_PARSER):
+    """Extract title, cleaned text, links and images with the named backend"""
+    return PARSERS[parser](html, url)
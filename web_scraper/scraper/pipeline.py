@@ -0,0 +1,71 @@
+"""
+Two-stage scrape pipeline: threaded fetching, process-pool extraction
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from scraper.entities import get_extractor
+from scraper.extract import error_result, extract_result
+from scraper.fetch import fetch_all
+from scraper.parsers import DEFAULT_PARSER
+
+
+def _extract(body, encoding, url, parser, entities):
+    result = extract_result(body, encoding, url, parser)
+    if entities:
+        get_extractor(entities).apply(result)
+    return result
+
+
+def scrape_pipeline(urls, fetch, workers=None, concurrency=10, delay=1, max_pending=None,
+                    parser=DEFAULT_PARSER, throttle=None, entities=()):
+    """
+    Fetch URLs on a thread pool and extract them on a process pool.
+    
+    fetch(url) must return a (body, encoding) tuple of the raw response.
+    At most `max_pending` fetched bodies wait for or sit in extraction at
+    any time; fetchers block once that bound is reached, so memory stays
+    flat however many URLs are queued. Returns the same result dicts as
+    WebScraper.scrape_page, in input order; urls may be any iterable.
+    throttle is passed on to fetch_all. entities names the
+    scraper.entities extractors to run in the extraction processes.
+    """
+    urls = list(urls)
+    workers = workers or os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * workers
+    slots = threading.BoundedSemaphore(max_pending)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def fetch_stage(url):
+            try:
+                body, encoding = fetch(url)
+            except Exception as e:
+                logging.error(f"Error scraping {url}: {str(e)}")
+                return error_result(url, e)
+            
+            slots.acquire()
+            try:
+                future = pool.submit(_extract, body, encoding, url, parser, tuple(entities))
+            except Exception:
+                slots.release()
+                raise
+            future.add_done_callback(lambda f: slots.release())
+            return future
+        
+        staged = asyncio.run(fetch_all(urls, fetch_stage, concurrency, delay, throttle=throttle))
+        
+        results = []
+        for url, item in zip(urls, staged):
+            if isinstance(item, Future):
+                try:
+                    item = item.result()
+                except Exception as e:
+                    logging.error(f"Error scraping {url}: {str(e)}")
+                    item = error_result(url, e)
+            results.append(item)
+        return results
@@ -0,0 +1,80 @@
+"""
+Heuristics for deciding when a page needs a browser to render
+"""
+
+import re
+import threading
+
+# Minimum visible text for a page that loads scripts to count as rendered
+MIN_TEXT_LENGTH = 200
+
+_HIDDEN_BLOCKS = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_BODY = re.compile(r'<body\b[^>]*>(.*)', re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r'<[^>]+>')
+_SCRIPT = re.compile(r'<script\b', re.IGNORECASE)
+_NOSCRIPT_JS = re.compile(
+    r'<noscript\b[^>]*>(?:(?!</noscript).){0,500}?\b(enable|requires?|need|turn on)\b'
+    r'(?:(?!</noscript).){0,60}?javascript',
+    re.IGNORECASE | re.DOTALL
+)
+_SPA_ROOT = re.compile(
+    r'<div\b[^>]*\bid=["\'](root|app|__next|__nuxt|___gatsby|svelte)["\'][^>]*>\s*</div>',
+    re.IGNORECASE
+)
+
+
+def visible_text_length(html):
+    """Rough length of the text a reader would see in the page body"""
+    match = _BODY.search(html)
+    body = match.group(1) if match else html
+    text = _TAGS.sub(' ', _HIDDEN_BLOCKS.sub(' ', body))
+    return len(''.join(text.split()))
+
+
+def js_render_reason(html):
+    """Return why a page fetched without a browser looks incomplete, or None"""
+    if _SPA_ROOT.search(html):
+        return "empty SPA root element"
+    if _NOSCRIPT_JS.search(html):
+        return "noscript asks for JavaScript"
+    if _SCRIPT.search(html) and visible_text_length(html) < MIN_TEXT_LENGTH:
+        return "little body text on a scripted page"
+    return None
+
+
+class RenderPolicy:
+    """Per-domain memory of whether pages need browser rendering.
+
+    The first page from a domain is probed with a plain request; the
+    decision is then reused so later pages from the domain go straight to
+    the right fetcher.
+    """
+
+    def __init__(self):
+        self.probed = 0
+        self.escalated = 0
+        self._domains = {}
+        self._lock = threading.Lock()
+
+    def decision(self, host):
+        """True if the domain needs a browser, False if not, None if unknown"""
+        with self._lock:
+            return self._domains.get(host)
+
+    def record(self, host, needs_browser):
+        with self._lock:
+            self.probed += 1
+            self._domains.setdefault(host, needs_browser)
+
+    def count_escalation(self):
+        with self._lock:
+            self.escalated += 1
+
+    def stats(self):
+        """Counters for the end-of-run summary"""
+        with self._lock:
+            return {
+                'probed': self.probed,
+                'escalated': self.escalated,
+                'browser_domains': sum(1 for v in self._domains.values() if v),
+            }
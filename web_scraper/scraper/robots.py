@@ -0,0 +1,230 @@
+"""
+robots.txt rules with a per-host cache and Crawl-delay lookup
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+
+from scraper.transport import BodyTooLarge, UnsupportedContentType, read_body
+
+# Bytes of robots.txt that are parsed; the rest is ignored (RFC 9309)
+MAX_ROBOTS_BYTES = 500 * 1024
+
+# How long a failed robots.txt fetch blocks a host before it is retried
+RETRY_TTL = 600
+
+
+class RobotsDisallowed(Exception):
+    """Raised when robots.txt forbids fetching a URL"""
+
+
+def _matcher(pattern):
+    if '*' not in pattern and not pattern.endswith('$'):
+        return lambda path: path.startswith(pattern)
+    regex = re.escape(pattern).replace(r'\*', '.*')
+    if regex.endswith(r'\$'):
+        regex = regex[:-2] + '$'
+    return re.compile(regex).match
+
+
+class RobotsRules:
+    """Allow/Disallow rules and Crawl-delay of one robots.txt group.
+
+    The longest matching pattern decides, and Allow wins a tie, as in
+    RFC 9309. Patterns may use '*' wildcards and a trailing '$'. `reason`
+    says why a host is blocked outright, e.g. an unreachable robots.txt.
+    """
+
+    def __init__(self, rules=(), crawl_delay=None, disallow_all=False, reason=None):
+        # Longest pattern first so the first match is the most specific
+        ordered = sorted(rules, key=lambda rule: (len(rule[0]), rule[1]), reverse=True)
+        self.rules = [(pattern, allow, _matcher(pattern)) for pattern, allow in ordered]
+        self.crawl_delay = crawl_delay
+        self.disallow_all = disallow_all
+        self.reason = reason
+
+    def allowed(self, path):
+        if self.disallow_all:
+            return False
+        if path == '/robots.txt':
+            return True
+        for _, allow, match in self.rules:
+            if match(path):
+                return allow
+        return True
+
+
+ALLOW_ALL = RobotsRules()
+
+
+def parse_robots(text, user_agent='*'):
+    """Rules of the group that applies to user_agent.
+
+    Like urllib.robotparser, a group applies when its User-agent token
+    occurs in the product name of user_agent (the part before '/'); the
+    '*' group is the fallback. Lines of all matching groups are merged.
+    """
+    agent = user_agent.split('/')[0].lower()
+    groups = []
+    current = None
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = line.split(':', 1)
+        field, value = field.strip().lower(), value.strip()
+        if field == 'user-agent':
+            # Consecutive User-agent lines share one group
+            if current is None or current['rules'] or current['delay'] is not None:
+                current = {'agents': [], 'rules': [], 'delay': None}
+                groups.append(current)
+            current['agents'].append(value.lower())
+        elif current is None:
+            continue
+        elif field in ('allow', 'disallow'):
+            if value:
+                current['rules'].append((value, field == 'allow'))
+        elif field == 'crawl-delay':
+            try:
+                current['delay'] = float(value)
+            except ValueError:
+                pass
+
+    specific = [g for g in groups if any(a != '*' and a in agent for a in g['agents'])]
+    selected = specific or [g for g in groups if '*' in g['agents']]
+    if not selected:
+        return ALLOW_ALL
+    rules = [rule for group in selected for rule in group['rules']]
+    delays = [group['delay'] for group in selected if group['delay'] is not None]
+    return RobotsRules(rules, max(delays) if delays else None)
+
+
+def _unreachable(origin, error):
+    reason = f"robots.txt unreachable: {error}"
+    logging.warning(f"{reason} ({origin})")
+    return RobotsRules(disallow_all=True, reason=reason), RETRY_TTL
+
+
+def _origin_and_path(url):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+class RobotsCache:
+    """Parsed robots.txt rules per host, fetched once and kept for `ttl`.
+
+    At most `max_hosts` hosts are kept; the least recently used is dropped
+    first. Concurrent lookups for an uncached host wait for a single fetch.
+    Following RFC 9309, a missing robots.txt (4xx) allows everything and an
+    unreachable one (5xx, network error) disallows the host until it is
+    retried after RETRY_TTL seconds, and check() names the fetch error. Crawl-delay is capped at
+    max_crawl_delay.
+    """
+
+    def __init__(self, session, user_agent='*', ttl=24 * 3600, max_hosts=10000,
+                 max_crawl_delay=60):
+        self.session = session
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self.max_crawl_delay = max_crawl_delay
+        self.fetches = 0
+        self.hits = 0
+        self.blocked = 0
+        self._entries = OrderedDict()
+        self._fetch_locks = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, origin):
+        entry = self._entries.get(origin)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(origin)
+            self.hits += 1
+            return entry[0]
+        return None
+
+    def _rules(self, origin):
+        with self._lock:
+            rules = self._cached(origin)
+            if rules is not None:
+                return rules
+            fetch_lock = self._fetch_locks.setdefault(origin, threading.Lock())
+
+        with fetch_lock:
+            with self._lock:
+                rules = self._cached(origin)
+                if rules is not None:
+                    return rules
+            rules, ttl = self._fetch(origin)
+            with self._lock:
+                self._entries[origin] = (rules, time.monotonic() + ttl)
+                self._entries.move_to_end(origin)
+                while len(self._entries) > self.max_hosts:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._fetch_locks.pop(evicted, None)
+        return rules
+
+    def _fetch(self, origin):
+        with self._lock:
+            self.fetches += 1
+        try:
+            with self.session.get(origin + '/robots.txt', stream=True) as response:
+                if 400 <= response.status_code < 500:
+                    return ALLOW_ALL, self.ttl
+                if response.status_code >= 500:
+                    rules, ttl = _unreachable(origin, f"HTTP {response.status_code}")
+                    return rules, min(self.ttl, ttl)
+                try:
+                    body = read_body(response, MAX_ROBOTS_BYTES)
+                except (BodyTooLarge, UnsupportedContentType) as e:
+                    logging.warning(f"Ignoring robots.txt for {origin}: {e}")
+                    return ALLOW_ALL, self.ttl
+        except requests.RequestException as e:
+            rules, ttl = _unreachable(origin, e)
+            return rules, min(self.ttl, ttl)
+        return parse_robots(body.decode('utf-8', errors='replace'), self.user_agent), self.ttl
+
+    def _lookup(self, url):
+        origin, path = _origin_and_path(url)
+        rules = self._rules(origin)
+        allowed = rules.allowed(path)
+        if not allowed:
+            with self._lock:
+                self.blocked += 1
+        return allowed, rules
+
+    def allowed(self, url):
+        """True if robots.txt lets the configured user agent fetch url"""
+        return self._lookup(url)[0]
+
+    def check(self, url):
+        """Raise RobotsDisallowed unless url may be fetched; the message
+        names the fetch error when robots.txt could not be read"""
+        allowed, rules = self._lookup(url)
+        if not allowed:
+            detail = f" ({rules.reason})" if rules.reason else ""
+            raise RobotsDisallowed(f"Disallowed by robots.txt: {url}{detail}")
+
+    def crawl_delay(self, url):
+        """Crawl-delay in seconds for the URL's host, or None"""
+        delay = self._rules(_origin_and_path(url)[0]).crawl_delay
+        return min(delay, self.max_crawl_delay) if delay is not None else None
+
+    def stats(self):
+        """Counters for the end-of-run summary"""
+        with self._lock:
+            return {
+                'hosts': len(self._entries),
+                'fetches': self.fetches,
+                'hits': self.hits,
+                'blocked': self.blocked,
+            }
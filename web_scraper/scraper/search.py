@@ -0,0 +1,165 @@
+"""
+Full-text search over scraped pages with an on-disk inverted index
+
+The index is an SQLite FTS5 table over each page's title and content:
+text is tokenized (Unicode word boundaries, case and diacritics folded,
+Porter stemming), postings lists live on disk in the index's b-trees and
+matches are ranked with BM25. A query only reads the postings of its terms,
+so it stays fast without loading the corpus into memory.
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+
+from scraper.incremental import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    digest TEXT NOT NULL,
+    scraped_at TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    title, content, tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+# BM25 weight of a match in the title relative to one in the content
+TITLE_WEIGHT = 5.0
+
+_TERMS = re.compile(r'\w+')
+
+
+def fts_query(query, match_all=True):
+    """Turn free text into an FTS5 query of quoted terms.
+
+    Quoting keeps words like AND, NOT or NEAR and characters like '-' or
+    '*' from being read as query syntax. Terms must all match, or with
+    match_all False any of them.
+    """
+    terms = ['"' + term + '"' for term in _TERMS.findall(query)]
+    return (' ' if match_all else ' OR ').join(terms)
+
+
+def read_results(path):
+    """Iterate over the records of a results file: a JSON list or single
+    result, or JSONL with optional .gz/.zst compression"""
+    if re.search(r'\.jsonl(\.gz|\.zst)?$', path):
+        from scraper.sinks import read_jsonl
+        yield from read_jsonl(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    yield from [results] if isinstance(results, dict) else results
+
+
+class SearchIndex:
+    """Persistent BM25 full-text index of scrape results keyed by URL.
+
+    add() indexes a result as it arrives. Adding a URL that is already
+    indexed replaces its earlier version, so a re-scraped page is updated
+    in place; when its title and content are unchanged, only its
+    scraped_at is. Results without content (errors, unchanged and duplicate
+    markers, change records) are skipped. Writes are committed every
+    commit_every documents and on flush() or close().
+    """
+
+    def __init__(self, path, commit_every=100):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def add(self, result):
+        """Index one scrape result; returns whether it was indexed"""
+        if 'error' in result or not result.get('content'):
+            return False
+        url, title = result['url'], result.get('title', '')
+        digest = fingerprint(title + '\n' + result['content'])
+        with self._lock:
+            row = self._db.execute("SELECT id, digest FROM docs WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                doc = self._db.execute("INSERT INTO docs (url, digest, scraped_at) VALUES (?, ?, ?)",
+                                       (url, digest, result.get('scraped_at'))).lastrowid
+            else:
+                doc = row[0]
+                self._db.execute("UPDATE docs SET digest = ?, scraped_at = ? WHERE id = ?",
+                                 (digest, result.get('scraped_at'), doc))
+                if row[1] != digest:
+                    self._db.execute("DELETE FROM pages WHERE rowid = ?", (doc,))
+            if row is None or row[1] != digest:
+                self._db.execute("INSERT INTO pages (rowid, title, content) VALUES (?, ?, ?)",
+                                 (doc, title, result['content']))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+        return True
+
+    def add_many(self, results):
+        """Index an iterable of results; returns how many were indexed"""
+        count = sum(1 for result in results if self.add(result))
+        self.flush()
+        return count
+
+    def remove(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT id FROM docs WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM pages WHERE rowid = ?", (row[0],))
+                self._db.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+                self._commit()
+            return row is not None
+
+    def _commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def search(self, query, limit=10, offset=0, match_all=True):
+        """Best-matching pages for a free-text query, best first.
+
+        Returns dicts with url, title, score (BM25, higher is better),
+        snippet (matches wrapped in [ ]) and scraped_at.
+        """
+        expression = fts_query(query, match_all)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.url, p.title, -bm25(pages, ?, 1.0) AS score,"
+                " snippet(pages, 1, '[', ']', '...', 16), d.scraped_at"
+                " FROM pages p JOIN docs d ON d.id = p.rowid"
+                " WHERE pages MATCH ? ORDER BY bm25(pages, ?, 1.0) LIMIT ? OFFSET ?",
+                (TITLE_WEIGHT, expression, TITLE_WEIGHT, limit, offset)
+            ).fetchall()
+        return [{'url': url, 'title': title, 'score': round(score, 4), 'snippet': snippet,
+                 'scraped_at': scraped_at}
+                for url, title, score, snippet, scraped_at in rows]
+
+    def optimize(self):
+        """Merge the index's segments into one, for the fastest queries"""
+        with self._lock:
+            self._db.execute("INSERT INTO pages (pages) VALUES ('optimize')")
+            self._commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._db.close()
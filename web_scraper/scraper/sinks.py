@@ -0,0 +1,254 @@
+"""
+Streaming output sinks that write each scrape result as it completes
+"""
+
+import os
+import io
+import csv
+import gzip
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from scraper.metrics import METRICS
+
+# Columns of the CSV summary written next to every results file
+SUMMARY_FIELDS = ['url', 'title', 'content_preview', 'scraped_at', 'error',
+                  'links_count', 'images_count']
+
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def summarize(result):
+    """Flatten a result dict into one row of the CSV summary"""
+    return {
+        'url': result.get('url', ''),
+        'title': result.get('title', ''),
+        'content_preview': result.get('content', '')[:200] + '...' if result.get('content') else '',
+        'scraped_at': result.get('scraped_at', ''),
+        'error': result.get('error', ''),
+        'links_count': len(result.get('links', [])),
+        'images_count': len(result.get('images', []))
+    }
+
+
+def summary_writer(f):
+    """csv.DictWriter for the summary columns, with the repo's CSV dialect"""
+    return csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, lineterminator='\n')
+
+
+class _AppendFile:
+    """A text file opened for appending, optionally through a compressor"""
+
+    def __init__(self, path, compression):
+        self.path = path
+        self.is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.raw = open(path, 'ab')
+        if compression == 'gzip':
+            stream = gzip.GzipFile(fileobj=self.raw, mode='ab')
+        elif compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                self.raw.close()
+                raise ImportError("zstd compression requires the 'zstandard' package")
+            stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        elif compression is None:
+            stream = self.raw
+        else:
+            self.raw.close()
+            raise ValueError(f"Unknown compression '{compression}'")
+        self.text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    def sync(self):
+        # Flushing the wrapper also flushes a compressor block so everything
+        # written so far can be decompressed after a crash
+        self.text.flush()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+
+    def close(self):
+        self.text.close()
+        if not self.raw.closed:
+            self.raw.flush()
+            os.fsync(self.raw.fileno())
+            self.raw.close()
+
+
+class ResultSink:
+    """Append scrape results to a JSONL file and a CSV summary.
+
+    Records are written as soon as they arrive, so memory use does not grow
+    with the crawl and a crashed run keeps everything written before the
+    crash. Files are flushed and fsynced every `flush_every` records or
+    `flush_interval` seconds, whichever comes first. compression may be
+    None, 'gzip' or 'zstd' (requires the zstandard package).
+    """
+
+    def __init__(self, path, compression=None, flush_every=100, flush_interval=5.0):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}'")
+        suffix = COMPRESSION_SUFFIXES[compression]
+        base = path[:-len('.jsonl')] if path.endswith('.jsonl') else path
+        if os.path.dirname(base):
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+
+        self.path = base + '.jsonl' + suffix
+        self.csv_path = base + '.csv' + suffix
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        self._jsonl = _AppendFile(self.path, compression)
+        self._csv = _AppendFile(self.csv_path, compression)
+        self._csv_writer = summary_writer(self._csv.text)
+        if self._csv.is_new:
+            self._csv_writer.writeheader()
+
+    def write(self, result):
+        """Append one result dict to both outputs"""
+        with METRICS.stage('serialize'):
+            line = json.dumps(result, ensure_ascii=False)
+            row = summarize(result)
+        with self._lock:
+            self._jsonl.text.write(line + '\n')
+            self._csv_writer.writerow(row)
+            self.count += 1
+            if 'error' in result:
+                self.errors += 1
+            self._pending += 1
+            if (self._pending >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self):
+        self._jsonl.sync()
+        self._csv.sync()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Flush and fsync everything written so far"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._jsonl.close()
+            self._csv.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ParquetSink:
+    """Write scrape results to a columnar Parquet file.
+
+    Scalar fields become string columns (plus a `host` column derived from
+    the URL), a change record's `version` an integer column, links/images
+    nested list<struct> columns and the entity fields and changed text
+    blocks list<string> columns. Rows are
+    buffered and written as a row group every `row_group_size` results, so
+    memory is bounded by one batch. The file footer is written on close().
+    Requires the pyarrow package.
+    """
+
+    SCALAR_FIELDS = ['url', 'host', 'title', 'content', 'scraped_at', 'error', 'status', 'duplicate_of',
+                     'previous_title']
+    INTEGER_FIELDS = ['version']
+    # Entity fields added by scraper.entities and the text blocks of change
+    # records (scraper.changes); null when not produced
+    LIST_FIELDS = ['emails', 'phones', 'added_blocks', 'removed_blocks']
+    LINK_FIELDS = ['links', 'added_links', 'removed_links']
+    IMAGE_FIELDS = ['images', 'added_images', 'removed_images']
+
+    def __init__(self, path, row_group_size=1000, compression='zstd'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires the 'pyarrow' package")
+
+        self._pa = pa
+        self.path = path if path.endswith('.parquet') else path + '.parquet'
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.row_group_size = row_group_size
+        self.count = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        fields = [pa.field(name, pa.string()) for name in self.SCALAR_FIELDS]
+        fields.extend(pa.field(name, pa.int64()) for name in self.INTEGER_FIELDS)
+        link_type = pa.list_(pa.struct([('text', pa.string()), ('url', pa.string())]))
+        image_type = pa.list_(pa.struct([('alt', pa.string()), ('src', pa.string())]))
+        fields.extend(pa.field(name, link_type) for name in self.LINK_FIELDS)
+        fields.extend(pa.field(name, image_type) for name in self.IMAGE_FIELDS)
+        fields.extend(pa.field(name, pa.list_(pa.string())) for name in self.LIST_FIELDS)
+        self.schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression=compression,
+                                        use_dictionary=True)
+        self._columns = {name: [] for name in self.schema.names}
+
+    def write(self, result):
+        """Buffer one result dict, writing a row group when the batch is full"""
+        with self._lock:
+            for name in self.SCALAR_FIELDS:
+                self._columns[name].append(result.get(name))
+            self._columns['host'][-1] = urlparse(result.get('url', '')).netloc or None
+            for name in self.INTEGER_FIELDS + self.LINK_FIELDS + self.IMAGE_FIELDS + self.LIST_FIELDS:
+                self._columns[name].append(result.get(name))
+            self.count += 1
+            if 'error' in result:
+                self.errors += 1
+            if len(self._columns['url']) >= self.row_group_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._columns['url']:
+            return
+        with METRICS.stage('serialize'):
+            table = self._pa.Table.from_pydict(self._columns, schema=self.schema)
+            self._writer.write_table(table)
+        self._columns = {name: [] for name in self.schema.names}
+
+    def flush(self):
+        """Write any buffered rows as a row group"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path):
+    """Iterate over the records of a (possibly compressed) JSONL results file"""
+    if path.endswith('.gz'):
+        f = gzip.open(path, 'rt', encoding='utf-8')
+    elif path.endswith('.zst'):
+        import zstandard
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(path, 'rb'), read_across_frames=True, closefd=True)
+        f = io.TextIOWrapper(reader, encoding='utf-8')
+    else:
+        f = open(path, 'r', encoding='utf-8')
+    with f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
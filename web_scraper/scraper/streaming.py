@@ -0,0 +1,209 @@
+"""
+Single-pass streaming extractor built on the standard library tokenizer
+
+StreamExtractor collects the title, cleaned text, links and images from
+parser events as the document is fed in, without building a tree. It
+mirrors how BeautifulSoup's html.parser builder resolves the document, so
+its output matches the 'html.parser' backend.
+"""
+
+import codecs
+import html
+from html.entities import html5
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from scraper.metrics import METRICS
+
+# Tags that never get an end tag, as in BeautifulSoup's HTML tree builder
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed',
+    'frame', 'hr', 'image', 'img', 'input', 'isindex', 'keygen', 'link',
+    'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+])
+
+# Elements whose text BeautifulSoup leaves out of get_text()
+HIDDEN_TEXT_ELEMENTS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+CHUNK_SIZE = 64 * 1024
+
+
+class TextCleaner:
+    """Incremental version of the scraper's line/phrase whitespace cleanup.
+
+    Text can arrive in arbitrary pieces; only complete lines are cleaned, so
+    the result equals cleaning the whole concatenated text at once.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+        self._pending = ''
+
+    def _add_line(self, line):
+        line = line.strip()
+        for phrase in line.split("  "):
+            phrase = phrase.strip()
+            if phrase:
+                self.length += len(phrase) + (1 if self.chunks else 0)
+                self.chunks.append(phrase)
+
+    def feed(self, text):
+        self._pending += text
+        lines = self._pending.splitlines(True)
+        # A trailing piece without a line break may continue in the next feed
+        if lines and lines[-1].splitlines() == [lines[-1]]:
+            self._pending = lines.pop()
+        else:
+            self._pending = ''
+        for line in lines:
+            self._add_line(line)
+
+    def close(self):
+        if self._pending:
+            self._add_line(self._pending)
+            self._pending = ''
+        return ' '.join(self.chunks)
+
+
+class StreamExtractor(HTMLParser):
+    """Extract page fields from HTML fed incrementally with feed()"""
+
+    def __init__(self, url):
+        super().__init__(convert_charrefs=False)
+        self.url = url
+        self.title = None
+        self.links = []
+        self.images = []
+        self._text = TextCleaner()
+        self._stack = []
+        self._hidden = 0
+        self._title_parts = None
+        # (stack depth, link dict, text parts) for every open <a href>
+        self._open_links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: '' if value is None else value for name, value in attrs}
+
+        if tag == 'img' and 'src' in attrs:
+            self.images.append({
+                'alt': attrs.get('alt', ''),
+                'src': urljoin(self.url, attrs['src'])
+            })
+        if tag in VOID_ELEMENTS:
+            return
+
+        self._stack.append(tag)
+        if tag in HIDDEN_TEXT_ELEMENTS:
+            self._hidden += 1
+        if tag == 'title' and self.title is None and self._title_parts is None:
+            self._title_parts = (len(self._stack), [])
+        if tag == 'a' and 'href' in attrs:
+            link = {'text': '', 'url': urljoin(self.url, attrs['href'])}
+            self.links.append(link)
+            self._open_links.append((len(self._stack), link, []))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, close everything up to the most recent open
+        # tag of this name and ignore end tags that match nothing
+        if tag not in self._stack:
+            return
+        while self._stack:
+            depth = len(self._stack)
+            name = self._stack.pop()
+            self._close_element(name, depth)
+            if name == tag:
+                break
+
+    def _close_element(self, name, depth):
+        if name in HIDDEN_TEXT_ELEMENTS:
+            self._hidden -= 1
+        if self._title_parts is not None and self._title_parts[0] == depth:
+            self.title = ''.join(self._title_parts[1])
+            self._title_parts = None
+        while self._open_links and self._open_links[-1][0] >= depth:
+            _, link, parts = self._open_links.pop()
+            link['text'] = ''.join(parts).strip()
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts[1].append(data)
+        if self._hidden:
+            return
+        self._text.feed(data)
+        for _, _, parts in self._open_links:
+            parts.append(data)
+
+    def handle_entityref(self, name):
+        if name + ';' in html5:
+            self.handle_data(html5[name + ';'])
+        else:
+            self.handle_data('&' + name)
+
+    def handle_charref(self, name):
+        self.handle_data(html.unescape(f'&#{name};'))
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+
+    @property
+    def text_length(self):
+        """Length of the cleaned text collected from complete lines so far"""
+        return self._text.length
+
+    def close(self):
+        """Finish parsing and return the title/content/links/images dict"""
+        super().close()
+        while self._stack:
+            depth = len(self._stack)
+            self._close_element(self._stack.pop(), depth)
+        title = self.title.strip() if self.title is not None else "No Title"
+        return {
+            'title': title,
+            'content': self._text.close(),
+            'links': self.links,
+            'images': self.images
+        }
+
+
+def extract_stream(html_text, url):
+    """Extract page fields from a complete HTML string in a single pass"""
+    with METRICS.stage('parse'):
+        extractor = StreamExtractor(url)
+        extractor.feed(html_text)
+        return extractor.close()
+
+
+def extract_chunks(chunks, encoding, url, max_chars=None):
+    """Extract page fields from an iterable of raw body chunks.
+
+    Chunks are decoded incrementally, so a response can be consumed from
+    iter_content() without holding the whole body in memory. With
+    max_chars, consumption stops once that much cleaned text has been
+    collected; links and images then only cover the part that was read.
+    Download and parsing interleave here, so they are timed together as
+    the 'stream' stage.
+    """
+    with METRICS.stage('stream'):
+        return _extract_chunks(chunks, encoding, url, max_chars)
+
+
+def _extract_chunks(chunks, encoding, url, max_chars):
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    extractor = StreamExtractor(url)
+    for chunk in chunks:
+        if chunk:
+            extractor.feed(decoder.decode(chunk))
+        if max_chars is not None and extractor.text_length >= max_chars:
+            break
+    extractor.feed(decoder.decode(b'', final=True))
+    return extractor.close()
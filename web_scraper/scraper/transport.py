@@ -0,0 +1,226 @@
+"""
+Shared HTTP transport: pooled keep-alive sessions with retries and metrics
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import Retry, make_headers
+
+from scraper.metrics import METRICS
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Non-text/* media types that still carry scrapeable text
+TEXT_MEDIA_TYPES = frozenset([
+    'application/xhtml+xml', 'application/xml', 'application/json',
+    'application/ld+json', 'application/rss+xml', 'application/atom+xml'
+])
+
+
+class BodyTooLarge(Exception):
+    """Raised when a response body exceeds the configured size limit"""
+
+
+class UnsupportedContentType(Exception):
+    """Raised when a response is not a text document worth downloading"""
+
+
+def _timed_connection(connection_cls):
+    class TimedConnection(connection_cls):
+        def connect(self):
+            with METRICS.stage('connect'):
+                super().connect()
+    TimedConnection.__name__ = 'Timed' + connection_cls.__name__
+    return TimedConnection
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _timed_connection(HTTPConnection)
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _timed_connection(HTTPSConnection)
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections record their setup time (DNS
+    lookup, TCP connect and TLS handshake) as the 'connect' stage"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class TransportSession(requests.Session):
+    """requests.Session with a default timeout and transport metrics.
+
+    Time to first byte is taken from response.elapsed (request sent until
+    headers parsed). Connection reuse is derived from the urllib3 pools of
+    the mounted adapters. Every response is also recorded in the
+    ttfb_seconds histogram of scraper.metrics, by host and status code.
+    """
+
+    def __init__(self, timeout=10):
+        super().__init__()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._ttfb_total = 0.0
+        self._ttfb_max = 0.0
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        response = super().request(method, url, **kwargs)
+        ttfb = response.elapsed.total_seconds()
+        METRICS.observe('ttfb_seconds', ttfb, host=METRICS.host(urlsplit(url).hostname or ''),
+                        status=str(response.status_code))
+        with self._lock:
+            self._requests += 1
+            self._ttfb_total += ttfb
+            self._ttfb_max = max(self._ttfb_max, ttfb)
+        return response
+
+    def _pool_counts(self):
+        connections = requests_sent = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+        return connections, requests_sent
+
+    def stats(self):
+        """Connection reuse and time-to-first-byte counters"""
+        connections, requests_sent = self._pool_counts()
+        with self._lock:
+            count = self._requests
+            ttfb_avg = self._ttfb_total / count if count else 0.0
+            ttfb_max = self._ttfb_max
+        return {
+            'requests': count,
+            'new_connections': connections,
+            'reuse_rate': 1 - connections / requests_sent if requests_sent else 0.0,
+            'ttfb_avg_ms': ttfb_avg * 1000,
+            'ttfb_max_ms': ttfb_max * 1000,
+        }
+
+
+def create_session(settings=None):
+    """Build a pooled session from scraper_settings-style options.
+
+    Recognised keys: timeout, max_retries, backoff_factor, pool_connections
+    (number of hosts to keep pools for), pool_maxsize (keep-alive
+    connections per host) and user_agent.
+    """
+    settings = settings or {}
+    retries = Retry(
+        total=settings.get('max_retries', 3),
+        backoff_factor=settings.get('backoff_factor', 0.5),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = TimedAdapter(
+        pool_connections=settings.get('pool_connections', 100),
+        pool_maxsize=settings.get('pool_maxsize', 10),
+        max_retries=retries
+    )
+
+    session = TransportSession(timeout=settings.get('timeout', 10))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': settings.get('user_agent', DEFAULT_USER_AGENT),
+        # Advertises br/zstd only when urllib3 can decode them
+        'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def check_response(response, max_bytes=DEFAULT_MAX_BODY_BYTES):
+    """Reject a response from its headers alone, before any body is read"""
+    content_type = response.headers.get('Content-Type', '')
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type and not (media_type.startswith('text/') or media_type in TEXT_MEDIA_TYPES
+                           or media_type.endswith('+xml') or media_type.endswith('+json')):
+        raise UnsupportedContentType(f"Unsupported content type: {media_type}")
+
+    length = response.headers.get('Content-Length')
+    if max_bytes is not None and length and length.isdigit() and int(length) > max_bytes:
+        raise BodyTooLarge(f"Body of {int(length)} bytes exceeds limit of {max_bytes} bytes")
+
+
+def iter_body(response, max_bytes=DEFAULT_MAX_BODY_BYTES, chunk_size=BODY_CHUNK_SIZE):
+    """Yield the decoded body of a stream=True response in chunks.
+
+    Each chunk is a memoryview over one reusable buffer, so it is only valid
+    until the next chunk is requested. Reading stops with BodyTooLarge as
+    soon as more than max_bytes have been decoded, even when the server sent
+    no Content-Length or the body was compressed.
+    """
+    check_response(response, max_bytes)
+    raw = response.raw
+    raw.decode_content = True
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+    while True:
+        count = raw.readinto(buffer)
+        if not count:
+            break
+        total += count
+        if max_bytes is not None and total > max_bytes:
+            response.close()
+            raise BodyTooLarge(f"Body exceeds limit of {max_bytes} bytes")
+        yield view[:count]
+
+
+def read_body(response, max_bytes=DEFAULT_MAX_BODY_BYTES, chunk_size=BODY_CHUNK_SIZE):
+    """Read a whole stream=True response body, enforcing max_bytes"""
+    body = bytearray()
+    with METRICS.stage('download'):
+        for chunk in iter_body(response, max_bytes, chunk_size):
+            body += chunk
+    METRICS.inc('downloaded_bytes_total', len(body))
+    return bytes(body)
+
+
+def body_encoding(response, body):
+    """Text encoding of a streamed body, falling back to detection like
+    Response.apparent_encoding (which would need response.content)"""
+    if response.encoding:
+        return response.encoding
+    if chardet is not None and body:
+        return chardet.detect(body)['encoding']
+    return None
+
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session for callers without their own WebScraper"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
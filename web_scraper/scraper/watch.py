@@ -0,0 +1,260 @@
+"""
+Watch mode: re-scrape URLs on adaptive intervals from a persistent schedule
+"""
+
+import os
+import time
+import heapq
+import random
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from scraper.fetch import HostThrottle
+from scraper.frontier import normalize_url
+from scraper.incremental import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watch (
+    url TEXT PRIMARY KEY,
+    interval REAL NOT NULL,
+    next_due REAL NOT NULL,
+    content_hash TEXT,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_checked REAL,
+    last_changed REAL
+);
+"""
+
+# Interval multipliers after a check that found a change / no change
+TIGHTEN = 0.5
+BACK_OFF = 1.5
+
+# Random spread applied to every new interval, so URLs added together drift apart
+JITTER = 0.1
+
+
+class WatchSchedule:
+    """Persistent per-URL polling schedule ordered by a heap of due times.
+
+    Each URL has its own interval. After every check it is halved if the
+    page content changed and grown by half if it did not, within
+    [min_interval, max_interval]. Stable pages are polled less and less,
+    while volatile ones are polled close to how often they change. Every
+    interval is jittered by +/-10%. The schedule lives in SQLite and is
+    reloaded on open. URLs that fell due while nothing was running are
+    spread over the next catch_up_window seconds instead of all being
+    fetched at once.
+    """
+
+    def __init__(self, path, min_interval=60, max_interval=86400, initial_interval=3600,
+                 catch_up_window=300):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = min(max(initial_interval, min_interval), max_interval)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._heap = []
+        self._due = {}
+        now = time.time()
+        for url, next_due, interval in self._db.execute("SELECT url, next_due, interval FROM watch"):
+            if next_due < now:
+                next_due = now + self._catch_up_offset(url, min(interval, catch_up_window))
+            self._push(url, next_due)
+
+    @staticmethod
+    def _catch_up_offset(url, window):
+        # Stable per URL, so repeated restarts do not reshuffle the order
+        fraction = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=4).digest(), 'big')
+        return window * fraction / 2 ** 32
+
+    def _push(self, url, next_due):
+        self._due[url] = next_due
+        heapq.heappush(self._heap, (next_due, url))
+
+    def add(self, urls, now=None):
+        """Start watching URLs, the new ones due immediately; returns how many were new"""
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for url in urls:
+                url = normalize_url(url)
+                if url in self._due:
+                    continue
+                self._db.execute("INSERT INTO watch (url, interval, next_due) VALUES (?, ?, ?)",
+                                 (url, self.initial_interval, now))
+                self._push(url, now)
+                added += 1
+            self._db.commit()
+        return added
+
+    def remove(self, url):
+        url = normalize_url(url)
+        with self._lock:
+            self._due.pop(url, None)
+            self._db.execute("DELETE FROM watch WHERE url = ?", (url,))
+            self._db.commit()
+
+    def next_due(self):
+        """Time the earliest URL falls due, or None when nothing is watched"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        # Entries are superseded rather than updated in place
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def pop_due(self, limit=None, now=None):
+        """Take the URLs that are due, earliest first.
+
+        A taken URL is out of the heap until record() reschedules it; its
+        stored due time is left alone, so it is checked again after a crash.
+        """
+        now = time.time() if now is None else now
+        urls = []
+        with self._lock:
+            while self._heap and (limit is None or len(urls) < limit):
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, url = heapq.heappop(self._heap)
+                del self._due[url]
+                urls.append(url)
+        return urls
+
+    def record(self, url, content_hash=None, error=None, now=None):
+        """Store the outcome of a check and reschedule the URL.
+
+        Returns 'new', 'changed', 'unchanged' or 'error'. A failed check
+        keeps the URL's interval.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute("SELECT interval, content_hash FROM watch WHERE url = ?",
+                                   (url,)).fetchone()
+            if row is None:
+                return None
+            interval, previous = row
+            if error is not None:
+                status = 'error'
+            elif previous is None:
+                status = 'new'
+            elif previous == content_hash:
+                status = 'unchanged'
+                interval = min(interval * BACK_OFF, self.max_interval)
+            else:
+                status = 'changed'
+                interval = max(interval * TIGHTEN, self.min_interval)
+            next_due = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
+            self._db.execute(
+                "UPDATE watch SET interval = ?, next_due = ?, last_checked = ?, checks = checks + 1,"
+                " content_hash = COALESCE(?, content_hash),"
+                " changes = changes + ?, errors = errors + ?,"
+                " last_changed = CASE WHEN ? THEN ? ELSE last_changed END WHERE url = ?",
+                (interval, next_due, now, None if error is not None else content_hash,
+                 int(status == 'changed'), int(status == 'error'),
+                 status in ('new', 'changed'), now, url))
+            self._db.commit()
+            self._push(url, next_due)
+            return status
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM watch").fetchone()[0]
+
+    def intervals(self):
+        """Current interval in seconds of every watched URL"""
+        with self._lock:
+            return dict(self._db.execute("SELECT url, interval FROM watch"))
+
+    def stats(self):
+        with self._lock:
+            urls, checks, changes, errors = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(checks), 0), COALESCE(SUM(changes), 0),"
+                " COALESCE(SUM(errors), 0) FROM watch").fetchone()
+        return {'urls': urls, 'checks': checks, 'changes': changes, 'errors': errors}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+async def watch(schedule, scrape, concurrency=10, delay=1, on_change=None, throttle=None,
+                stop=None, poll_interval=1.0):
+    """Re-scrape watched URLs as they fall due until stop (a threading.Event) is set.
+
+    scrape(url) returns a result dict; a page counts as changed when the
+    fingerprint of its 'content' differs from the previous check. New and
+    changed results get a 'status' field and are passed to on_change.
+    throttle (a HostThrottle) keeps per-host rate limits across calls.
+    Up to 4 x concurrency URLs are taken from the schedule at once (waiting
+    for their host or in flight), and more are taken as soon as any check
+    finishes, so one slow page does not hold up the rest.
+    """
+    concurrency = max(1, int(concurrency))
+    max_tasks = concurrency * 4
+    throttle = throttle or HostThrottle(delay)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    def handle(result):
+        url = result['url']
+        if 'error' in result:
+            schedule.record(url, error=result['error'])
+            return
+        status = schedule.record(url, fingerprint(result.get('content', '')))
+        if status in ('new', 'changed'):
+            logging.info(f"{status.capitalize()}: {url}")
+            if on_change is not None:
+                result['status'] = status
+                on_change(result)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def check(url):
+            host = urlparse(url).netloc
+            # Same scheduling as fetch_all: the host delay counts from the
+            # real start of the previous request
+            async with throttle.lock(host):
+                await throttle.wait(host, url)
+                await semaphore.acquire()
+                throttle.mark(host)
+            try:
+                logging.info(f"Scraping: {url}")
+                result = await loop.run_in_executor(executor, scrape, url)
+            finally:
+                semaphore.release()
+            handle(result)
+
+        pending = set()
+        while stop is None or not stop.is_set():
+            for url in schedule.pop_due(max_tasks - len(pending)):
+                pending.add(asyncio.ensure_future(check(url)))
+            next_due = schedule.next_due()
+            if len(pending) >= max_tasks or next_due is None:
+                wait = poll_interval
+            else:
+                wait = min(max(next_due - time.time(), 0), poll_interval)
+            if not pending:
+                await asyncio.sleep(wait)
+                continue
+            done, pending = await asyncio.wait(pending, timeout=wait,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        # URLs already taken are checked before stopping
+        if pending:
+            await asyncio.gather(*pending)
@@ -0,0 +1,38 @@
+"""
+Tests for the benchmark harness
+"""
+
+import requests
+
+from benchmark import FixtureServer, load_corpus, percentile, run_scenario
+
+
+def test_corpus_has_a_large_page():
+    corpus = load_corpus(large_scale=5)
+    assert {'article', 'link_heavy', 'minimal', 'large'} <= set(corpus)
+    assert len(corpus['large']) > 4 * len(corpus['article'])
+
+
+def test_fixture_server_injects_errors_reproducibly():
+    statuses = []
+    for _ in range(2):
+        with FixtureServer({'page': b'<title>x</title>'}, error_rate=0.5, seed=1) as server:
+            statuses.append([requests.get(url).status_code for url in server.urls(20)])
+    assert statuses[0] == statuses[1]
+    assert {200, 503} == set(statuses[0])
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_scrape_url_scenario_reports_metrics(tmp_path):
+    with FixtureServer(load_corpus(2), error_rate=0.25, seed=3) as server:
+        result = run_scenario('scrape_url', server.urls(12), {'parser': None, 'retries': 0, 'workdir': str(tmp_path)})
+    assert result['pages'] == 12
+    assert 0 < result['errors'] < 12
+    assert result['pages_per_sec'] > 0
+    assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
@@ -0,0 +1,128 @@
+"""
+Tests for the on-disk HTTP cache
+"""
+
+import time
+
+import requests
+
+from scraper.cache import HttpCache
+
+PAGE = '<html><title>Cached</title><body>Hello</body></html>'
+
+
+def _etag_route(body, etag='"v1"'):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'}, body
+    return route
+
+
+def test_revalidated_response_is_a_hit(local_site, tmp_path):
+    local_site.routes['/page'] = _etag_route(PAGE)
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    session = requests.Session()
+    url = local_site.url('/page')
+
+    body, encoding, page = cache.fetch(session, url, 'html.parser')
+    assert body.decode(encoding) == PAGE and page is None
+    cache.store_page(url, 'html.parser', {'title': 'Cached'})
+
+    body, encoding, page = cache.fetch(session, url, 'html.parser')
+    assert body.decode(encoding) == PAGE
+    assert page == {'title': 'Cached'}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'bytes_saved': len(PAGE)}
+
+    # Fields extracted by another parser are not reused
+    assert cache.fetch(session, url, 'lxml')[2] is None
+    cache.close()
+
+
+def test_last_modified_revalidation_persists_across_instances(local_site, tmp_path):
+    stamp = 'Sat, 29 Nov 2025 10:00:00 GMT'
+
+    def route(handler):
+        if handler.headers.get('If-Modified-Since') == stamp:
+            return 304, {}, b''
+        return 200, {'Last-Modified': stamp}, PAGE
+
+    local_site.routes['/page'] = route
+    path = str(tmp_path / 'cache.sqlite3')
+    HttpCache(path).fetch(requests.Session(), local_site.url('/page'))
+
+    cache = HttpCache(path)
+    cache.fetch(requests.Session(), local_site.url('/page'))
+    assert cache.hits == 1 and cache.misses == 0
+
+
+def test_revalidation_keeps_an_entry_fresh_past_max_age(local_site, tmp_path):
+    sent = []
+
+    def route(handler):
+        sent.append(handler.headers.get('If-None-Match'))
+        if sent[-1] in ('"v1"', '"v2"'):
+            # The 304 carries a new validator for the same content
+            return 304, {'ETag': '"v2"'}, b''
+        return 200, {'ETag': '"v1"', 'Content-Type': 'text/html; charset=utf-8'}, PAGE
+
+    local_site.routes['/page'] = route
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), max_age=0.5)
+    session = requests.Session()
+    for _ in range(4):
+        cache.fetch(session, local_site.url('/page'))
+        time.sleep(0.3)
+
+    assert sent == [None, '"v1"', '"v2"', '"v2"']
+    assert cache.stats()['hits'] == 3
+    cache.close()
+
+
+def test_changed_page_replaces_entry(local_site, tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    session = requests.Session()
+    url = local_site.url('/page')
+
+    local_site.routes['/page'] = _etag_route('old', '"v1"')
+    cache.fetch(session, url)
+    local_site.routes['/page'] = _etag_route('new', '"v2"')
+    body, _, _ = cache.fetch(session, url)
+
+    assert body == b'new'
+    assert cache.misses == 2
+
+
+def test_responses_without_validators_are_not_stored(local_site, tmp_path):
+    local_site.routes['/plain'] = PAGE
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    cache.fetch(requests.Session(), local_site.url('/plain'))
+    cache.fetch(requests.Session(), local_site.url('/plain'))
+    assert cache.misses == 2 and cache._size == 0
+
+
+def test_size_and_age_eviction(local_site, tmp_path):
+    for i in range(5):
+        local_site.routes[f'/p/{i}'] = _etag_route('x' * 100, f'"{i}"')
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), max_bytes=250)
+    session = requests.Session()
+    for i in range(5):
+        cache.fetch(session, local_site.url(f'/p/{i}'))
+
+    assert cache._size <= 250
+    urls = [row[0] for row in cache._db.execute("SELECT url FROM responses")]
+    assert sorted(urls) == [local_site.url('/p/3'), local_site.url('/p/4')]
+
+    cache.max_age = -1
+    assert cache._lookup(local_site.url('/p/4')) is None
+
+
+def test_scraper_cache_is_opt_in(tmp_path):
+    from main import WebScraper
+    scraper = WebScraper()
+    try:
+        assert scraper.cache is None
+        path = tmp_path / 'cache.sqlite3'
+        assert scraper.enable_cache(str(path)) is scraper.cache
+        assert path.exists()
+    finally:
+        scraper.close()
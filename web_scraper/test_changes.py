@@ -0,0 +1,95 @@
+"""
+Tests for structured change records and the snapshot-plus-delta store
+"""
+
+import random
+
+from scraper.changes import ChangeStore, apply_delta, diff_states, page_state, split_blocks
+
+rng = random.Random(11)
+VOCABULARY = [f"word{i}" for i in range(2000)]
+
+
+def sentences(count):
+    return [' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(5, 20))) + '.'
+            for _ in range(count)]
+
+
+def page(blocks, title='Title', links=(), images=()):
+    return {
+        'url': 'https://site.com/page',
+        'title': title,
+        'content': ' '.join(blocks),
+        'links': [{'text': url.rsplit('/', 1)[-1], 'url': url} for url in links],
+        'images': [{'alt': '', 'src': src} for src in images],
+    }
+
+
+def test_split_blocks_keeps_long_runs_aligned_after_an_insertion():
+    assert split_blocks('One. Two? Three!  Four') == ['One.', 'Two?', 'Three!', 'Four']
+    menu = ' '.join(rng.choice(VOCABULARY) for _ in range(300))
+    before = split_blocks(menu)
+    after = split_blocks('Extra ' + menu)
+    assert all(len(block.split()) < 300 for block in before)
+    # Only the first block differs
+    assert before[1:] == after[1:]
+
+
+def test_delta_round_trips_and_describes_the_change(tmp_path):
+    blocks = sentences(50)
+    old = page(blocks, links=['https://a.com/1', 'https://a.com/2'], images=['https://a.com/x.png'])
+    edited = blocks[:10] + ['A new paragraph.'] + blocks[12:]
+    new = page(edited, title='New title', links=['https://a.com/2', 'https://a.com/3'],
+               images=['https://a.com/x.png'])
+
+    delta = diff_states(page_state(old), page_state(new))
+    assert apply_delta(page_state(old), delta) == page_state(new)
+    assert 'images_added' not in delta and 'images_removed' not in delta
+
+    store = ChangeStore(str(tmp_path / 'changes.sqlite3'))
+    assert store.record(old) == ('new', None)
+    assert store.record(old) == ('unchanged', None)
+    status, change = store.record(new)
+    assert status == 'changed'
+    assert change['version'] == 2
+    assert change['title'] == 'New title' and change['previous_title'] == 'Title'
+    assert change['added_blocks'] == ['A new paragraph.']
+    assert change['removed_blocks'] == blocks[10:12]
+    assert change['added_links'] == [{'text': '3', 'url': 'https://a.com/3'}]
+    assert change['removed_links'] == [{'text': '1', 'url': 'https://a.com/1'}]
+    assert 'added_images' not in change and 'content' not in change
+    assert store.counts == {'new': 1, 'changed': 1, 'unchanged': 1}
+
+
+def test_store_grows_with_the_change_not_the_page(tmp_path):
+    path = str(tmp_path / 'changes.sqlite3')
+    store = ChangeStore(path, max_deltas=50)
+    blocks = sentences(2000)
+    store.record(page(blocks))
+
+    for version in range(20):
+        blocks[rng.randrange(len(blocks))] = f"Edit number {version}."
+        store.record(page(blocks))
+    store.close()
+
+    reopened = ChangeStore(path, max_deltas=50)
+    assert reopened.current('https://site.com/page') == page_state(page(blocks))
+    snapshot = reopened._db.execute("SELECT length(snapshot) FROM pages").fetchone()[0]
+    deltas, total = reopened._db.execute("SELECT COUNT(*), SUM(length(delta)) FROM deltas").fetchone()
+    # 20 one-sentence edits of a ~100 KB page, stored as ~50 byte deltas
+    assert deltas == 20
+    assert total < 20 * 100 < snapshot
+
+
+def test_long_delta_chains_are_folded_into_a_new_snapshot(tmp_path):
+    store = ChangeStore(str(tmp_path / 'changes.sqlite3'), max_deltas=3)
+    blocks = sentences(100)
+    store.record(page(blocks))
+    for version in range(7):
+        blocks.append(f"Update {version}.")
+        status, change = store.record(page(blocks))
+        assert change['added_blocks'] == [f"Update {version}."] and change['version'] == version + 2
+
+    chain = store._db.execute("SELECT COUNT(*) FROM deltas").fetchone()[0]
+    assert chain <= 3
+    assert store.current('https://site.com/page') == page_state(page(blocks))
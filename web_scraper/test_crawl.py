@@ -0,0 +1,106 @@
+"""
+Tests for the link-following crawl mode
+"""
+
+import asyncio
+import time
+
+import requests
+
+from scraper.crawl import CrawlQueue, CrawlScope, crawl
+from scraper.extract import extract_result
+from scraper.frontier import Frontier
+
+
+def page(*links):
+    anchors = ''.join(f'<a href="{link}">{link}</a>' for link in links)
+    return f'<html><title>t</title><body>{anchors}</body></html>'
+
+
+def scrape(url):
+    return extract_result(requests.get(url, timeout=5).content, 'utf-8', url)
+
+
+def run_crawl(seeds, frontier=None, scope=None, **kwargs):
+    frontier = frontier or Frontier(':memory:')
+    scope = scope or CrawlScope(seeds)
+    results = []
+    asyncio.run(crawl(seeds, scrape, frontier, scope, delay=0, on_result=results.append, **kwargs))
+    return results, frontier
+
+
+def test_scope_rules():
+    scope = CrawlScope(['http://www.a.com/'], include=[r'/docs/'], exclude=[r'\.pdf$'])
+    assert scope.allows('http://a.com/docs/x')
+    assert scope.allows('https://www.a.com/docs/y')
+    assert not scope.allows('http://a.com/blog/x')
+    assert not scope.allows('http://a.com/docs/x.pdf')
+    assert not scope.allows('http://b.com/docs/x')
+    assert not scope.allows('mailto:me@a.com')
+    assert CrawlScope(['http://a.com/'], same_domain=False).allows('http://b.com/')
+
+
+def test_queue_is_host_fair_and_breadth_first():
+    queue = CrawlQueue()
+    for i in range(100):
+        queue.push(f'http://big.com/{i}', 1)
+    queue.push('http://big.com/root', 0)
+    queue.push('http://small.com/a', 2)
+    queue.push('http://small.com/b', 1)
+
+    first = [queue.pop() for _ in range(4)]
+    assert first == [('http://big.com/root', 0), ('http://small.com/b', 1),
+                     ('http://big.com/0', 1), ('http://small.com/a', 2)]
+    assert len(queue) == 99
+
+
+def test_queue_throughput_with_a_large_frontier():
+    queue = CrawlQueue()
+    start = time.perf_counter()
+    for i in range(200000):
+        queue.push(f'http://host{i % 500}.com/{i}', i % 4)
+    while queue:
+        queue.pop()
+    assert time.perf_counter() - start < 5
+
+
+def test_crawl_follows_links_to_max_depth(local_site):
+    local_site.routes['/'] = page('/a', '/b#section', 'http://other.example/x', 'mailto:x@y.z')
+    local_site.routes['/a'] = page('/a/deep', '/b')
+    local_site.routes['/b'] = page('/?')
+    local_site.routes['/a/deep'] = page('/a/deeper')
+
+    results, frontier = run_crawl([local_site.url('/')], max_depth=2)
+
+    scraped = sorted(result['url'] for result in results)
+    assert scraped == sorted(local_site.url(path) for path in ['/', '/a', '/b', '/a/deep'])
+    assert frontier.counts()['done'] == 4
+    assert not frontier.seen(local_site.url('/a/deeper'))
+
+
+def test_crawl_respects_max_pages_and_canonicalizes(local_site):
+    local_site.routes['/'] = page(*[f'/p?b=2&a={i}#frag' for i in range(20)], '/p?a=0&b=2')
+    for i in range(20):
+        local_site.routes[f'/p?a={i}&b=2'] = page()
+
+    results, frontier = run_crawl([local_site.url('/')], max_pages=5)
+
+    assert len(results) == 5
+    assert frontier.counts()['pending'] == 16
+    assert len({result['url'] for result in results}) == 5
+
+
+def test_crawl_resumes_from_a_persistent_frontier(local_site, tmp_path):
+    local_site.routes['/'] = page('/1', '/2', '/3')
+    for i in (1, 2, 3):
+        local_site.routes[f'/{i}'] = page()
+    path = str(tmp_path / 'crawl.sqlite3')
+    seeds = [local_site.url('/')]
+
+    first, frontier = run_crawl(seeds, Frontier(path), max_pages=2)
+    frontier.close()
+    second, frontier = run_crawl(seeds, Frontier(path), max_pages=10)
+
+    assert len(first) == 2 and len(second) == 2
+    assert {r['url'] for r in first}.isdisjoint(r['url'] for r in second)
+    assert frontier.counts()['done'] == 4
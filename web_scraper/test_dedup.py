@@ -0,0 +1,83 @@
+"""
+Tests for SimHash near-duplicate detection
+"""
+
+import random
+
+import pytest
+
+from scraper.dedup import NearDuplicateIndex, hamming, simhash
+
+random.seed(7)
+VOCABULARY = [f"word{i}" for i in range(2000)]
+
+
+def article(length=400):
+    return ' '.join(random.choice(VOCABULARY) for _ in range(length))
+
+
+def test_simhash_is_close_for_near_duplicates():
+    text = article()
+    syndicated = 'Republished from the original source. ' + text.replace('word1 ', 'word2 ', 3) + ' Share this.'
+    assert simhash(text) == simhash(text)
+    assert hamming(simhash(text), simhash(syndicated)) <= 3
+    assert hamming(simhash(text), simhash(article())) > 10
+
+
+def test_first_copy_is_kept_and_later_copies_point_to_it(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'dedup.sqlite3'))
+    text = article()
+
+    assert index.check('https://site.com/story', text) is None
+    assert index.check('https://site.com/story?amp=1', text + ' AMP') == 'https://site.com/story'
+    assert index.check('https://other.com/piece', article()) is None
+    assert index.check('https://site.com/story', text) is None
+    assert index.counts == {'checked': 4, 'duplicates': 1}
+    assert len(index) == 2
+
+
+def test_index_persists_between_runs(tmp_path):
+    path = str(tmp_path / 'dedup.sqlite3')
+    text = article()
+    first = NearDuplicateIndex(path)
+    first.check('https://a.com/', text)
+    first.close()
+
+    second = NearDuplicateIndex(path)
+    assert second.check('https://mirror.com/', text) == 'https://a.com/'
+    second.close()
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, max_distance=5)
+
+
+def test_exact_matching_handles_hashes_with_the_top_bit_set(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'dedup.sqlite3'), max_distance=0)
+    rng = random.Random(5)
+    texts = [' '.join(rng.choice(VOCABULARY) for _ in range(100)) for _ in range(8)]
+    high = [text for text in texts if simhash(text) >= 1 << 63]
+    assert high
+
+    for i, text in enumerate(texts):
+        assert index.check(f'https://a.com/{i}', text) is None
+    assert index.check('https://mirror.com/', high[0]) == f'https://a.com/{texts.index(high[0])}'
+    assert index.check('https://b.com/', high[0] + ' Share this.') is None
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(str(tmp_path / 'other.sqlite3'), max_distance=64)
+
+
+def test_short_pages_are_not_checked(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'dedup.sqlite3'))
+    assert index.check('https://a.com/404', 'Page not found') is None
+    assert index.check('https://b.com/404', 'Page not found') is None
+    assert index.counts['checked'] == 0
+
+
+def test_copies_are_found_without_false_positives_in_a_large_index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'dedup.sqlite3'))
+    texts = [article(60) for _ in range(3000)]
+    for i, text in enumerate(texts):
+        index.check(f'https://site.com/{i}', text)
+
+    assert sum(index.check(f'https://copy.com/{i}', text) is not None
+               for i, text in enumerate(texts[:100])) == 100
+    assert index.counts['duplicates'] == 100
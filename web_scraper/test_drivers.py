@@ -0,0 +1,142 @@
+"""
+Tests for the Selenium driver pool, using fake drivers instead of Chrome
+"""
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from scraper.drivers import DriverPool, driver_memory_mb
+
+
+class FakeDriver:
+    def __init__(self, heap_mb=10):
+        self.heap_mb = heap_mb
+        self.crashed = False
+        self.quit_called = False
+        self.pages = []
+
+    def get(self, url):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        self.pages.append(url)
+
+    def execute_script(self, script):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        if 'usedJSHeapSize' in script:
+            return self.heap_mb * 1024 * 1024
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.created = []
+
+    def __call__(self):
+        driver = FakeDriver(**self.kwargs)
+        self.created.append(driver)
+        return driver
+
+
+def test_concurrent_leases_never_exceed_pool_size():
+    factory = FakeFactory()
+    pool = DriverPool(factory, size=3)
+    in_use = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def render(i):
+        with pool.lease() as driver:
+            with lock:
+                in_use.append(driver)
+                peak[0] = max(peak[0], len(in_use))
+            driver.get(f'https://example.com/{i}')
+            time.sleep(0.01)
+            with lock:
+                in_use.remove(driver)
+
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 3
+    assert len(factory.created) == 3
+    assert sum(len(d.pages) for d in factory.created) == 12
+    pool.close()
+    assert all(d.quit_called for d in factory.created)
+
+
+def test_driver_is_recycled_after_max_pages():
+    factory = FakeFactory()
+    pool = DriverPool(factory, size=1, max_pages=2)
+    for i in range(5):
+        with pool.lease() as driver:
+            driver.get(f'https://example.com/{i}')
+
+    assert [len(d.pages) for d in factory.created] == [2, 2, 1]
+    assert factory.created[0].quit_called and pool.recycled == 2
+
+
+def test_driver_is_recycled_when_memory_grows():
+    factory = FakeFactory(heap_mb=600)
+    pool = DriverPool(factory, size=1, max_memory_mb=512)
+    with pool.lease():
+        pass
+    with pool.lease():
+        pass
+    assert len(factory.created) == 2 and pool.recycled == 2
+
+
+def test_memory_covers_the_browser_process_tree():
+    psutil = pytest.importorskip('psutil')
+    driver = FakeDriver(heap_mb=1)
+    # Stand in for chromedriver with this process, which uses far more than 1 MB
+    driver.service = SimpleNamespace(process=SimpleNamespace(pid=os.getpid()))
+
+    memory = driver_memory_mb(driver)
+
+    assert memory == pytest.approx(psutil.Process().memory_info().rss / (1024 * 1024), rel=0.2)
+    assert memory > 1
+
+
+def test_crashed_driver_is_replaced():
+    factory = FakeFactory()
+    pool = DriverPool(factory, size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.lease() as driver:
+            driver.crashed = True
+            driver.get('https://example.com/')
+
+    with pool.lease() as driver:
+        driver.get('https://example.com/')
+    assert len(factory.created) == 2 and pool.replaced == 1
+
+
+def test_idle_driver_that_died_is_replaced_on_lease():
+    factory = FakeFactory()
+    pool = DriverPool(factory, size=1)
+    pool.start(1)
+    factory.created[0].crashed = True
+
+    with pool.lease() as driver:
+        assert driver is factory.created[1]
+    assert pool.replaced == 1
+
+
+def test_lease_times_out_when_pool_is_exhausted():
+    pool = DriverPool(FakeFactory(), size=1)
+    with pool.lease():
+        with pytest.raises(TimeoutError):
+            with pool.lease(timeout=0.05):
+                pass
@@ -0,0 +1,55 @@
+"""
+Tests for email/phone entity extraction
+"""
+
+import pytest
+
+from scraper.entities import EntityExtractor, extract_batch
+from utils.helpers import extract_emails, extract_phone_numbers
+
+TEXT = ("Contact John.Doe@Example.com or john.doe@example.com. Call (555) 123-4567, "
+        "+1 555-123-4567 or 555.123.4567. Order 12345551234567 ships to 5551234567@x.org.")
+
+
+def test_matches_are_normalized_and_deduplicated():
+    found = EntityExtractor(['emails', 'phones']).extract(TEXT)
+    assert found == {
+        'emails': ['john.doe@example.com', '5551234567@x.org'],
+        'phones': ['5551234567', '+15551234567'],
+    }
+
+
+def test_only_enabled_extractors_run():
+    assert EntityExtractor(['phones']).extract(TEXT).keys() == {'phones'}
+    assert EntityExtractor([]).extract(TEXT) == {}
+    with pytest.raises(ValueError):
+        EntityExtractor(['addresses'])
+
+
+def test_apply_skips_errors():
+    extractor = EntityExtractor(['emails'])
+    assert extractor.apply({'url': 'u', 'error': 'boom'}) == {'url': 'u', 'error': 'boom'}
+    assert extractor.apply({'url': 'u', 'content': 'a@b.io'})['emails'] == ['a@b.io']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_matches_single_page_extraction(workers):
+    results = [{'url': f'u{i}', 'content': f'user{i}@site.com {TEXT}'} for i in range(10)]
+    results.insert(3, {'url': 'bad', 'error': 'timeout'})
+
+    extract_batch(results, ['emails', 'phones'], workers=workers, chunk_size=3)
+
+    extractor = EntityExtractor(['emails', 'phones'])
+    for result in results:
+        if 'error' in result:
+            assert 'emails' not in result
+        else:
+            assert result['emails'] == extractor.extract(result['content'])['emails']
+            assert result['emails'][0] == result['url'].replace('u', 'user') + '@site.com'
+
+
+def test_helpers_return_whole_matches():
+    assert extract_emails(TEXT)[0] == 'John.Doe@Example.com'
+    # Scanned on its own, the phone pattern also finds the email's local part
+    assert extract_phone_numbers(TEXT) == ['(555) 123-4567', '+1 555-123-4567', '555.123.4567',
+                                           '5551234567']
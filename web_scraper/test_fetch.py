@@ -0,0 +1,87 @@
+"""
+Tests for the concurrent fetch engine
+"""
+
+import asyncio
+import time
+
+import requests
+
+from scraper.fetch import fetch_all
+
+
+def _fetcher():
+    session = requests.Session()
+
+    def fetch(url):
+        return session.get(url, timeout=5).text
+
+    return fetch
+
+
+def test_results_keep_input_order(local_site):
+    for i in range(8):
+        local_site.routes[f'/page/{i}'] = f'page {i}'
+    urls = [local_site.url(f'/page/{i}') for i in reversed(range(8))]
+
+    results = asyncio.run(fetch_all(urls, _fetcher(), concurrency=4, delay=0))
+
+    assert results == [f'page {i}' for i in reversed(range(8))]
+
+
+def test_urls_are_read_as_tasks_finish():
+    read = []
+
+    def urls():
+        for i in range(1000):
+            read.append(i)
+            yield f'https://host{i % 7}.example/{i}'
+
+    seen_when_first_done = []
+
+    def on_result(result):
+        if not seen_when_first_done:
+            seen_when_first_done.append(len(read))
+
+    asyncio.run(fetch_all(urls(), lambda url: url, concurrency=2, delay=0, on_result=on_result,
+                          max_tasks=10))
+
+    assert len(read) == 1000
+    assert seen_when_first_done[0] <= 11
+
+
+def test_throughput_scales_with_concurrency(local_site):
+    local_site.latency = 0.1
+    for i in range(10):
+        local_site.routes[f'/slow/{i}'] = 'ok'
+    urls = [local_site.url(f'/slow/{i}') for i in range(10)]
+    fetch = _fetcher()
+
+    start = time.monotonic()
+    asyncio.run(fetch_all(urls, fetch, concurrency=1, delay=0))
+    serial = time.monotonic() - start
+
+    start = time.monotonic()
+    asyncio.run(fetch_all(urls, fetch, concurrency=10, delay=0))
+    parallel = time.monotonic() - start
+
+    assert serial / parallel > 4
+
+
+def test_delay_is_enforced_per_host(local_site):
+    for i in range(3):
+        local_site.routes[f'/a/{i}'] = 'a'
+        local_site.routes[f'/b/{i}'] = 'b'
+    urls = [local_site.url(f'/a/{i}') for i in range(3)]
+    urls += [local_site.url(f'/b/{i}', host='localhost') for i in range(3)]
+
+    start = time.monotonic()
+    asyncio.run(fetch_all(urls, _fetcher(), concurrency=6, delay=0.2))
+    elapsed = time.monotonic() - start
+
+    # Three requests per host need two delays; the hosts overlap
+    assert 0.4 <= elapsed < 0.9
+    for prefix in ('/a/', '/b/'):
+        starts = [t for path, t in local_site.requests if path.startswith(prefix)]
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert all(gap >= 0.19 for gap in gaps)
@@ -0,0 +1,69 @@
+"""
+Tests for the persistent crawl frontier
+"""
+
+from scraper.frontier import BloomFilter, Frontier, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url('HTTP://Example.COM:80') == 'http://example.com/'
+    assert normalize_url('https://a.com:443/x?b=2&a=1#top') == 'https://a.com/x?a=1&b=2'
+    assert normalize_url('http://a.com:8080/p') == 'http://a.com:8080/p'
+    assert normalize_url('http://a.com/Path') != normalize_url('http://a.com/path')
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f'http://site/{i}')
+
+    assert all(f'http://site/{i}' in bloom for i in range(10000))
+    false_positives = sum(f'http://other/{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_add_deduplicates_normalized_urls(tmp_path):
+    frontier = Frontier(str(tmp_path / 'job.sqlite3'))
+    assert frontier.add(['http://a.com/x#one', 'http://A.com/x#two', 'http://a.com/y']) == 2
+    assert frontier.add(['http://a.com:80/y']) == 0
+    assert frontier.seen('http://a.com/x')
+    assert not frontier.seen('http://a.com/z')
+    assert frontier.counts()['pending'] == 2
+
+
+def test_claim_complete_and_fail(tmp_path):
+    frontier = Frontier(str(tmp_path / 'job.sqlite3'))
+    frontier.add([f'http://a.com/{i}' for i in range(5)])
+
+    batch = frontier.claim(3)
+    assert batch == ['http://a.com/0', 'http://a.com/1', 'http://a.com/2']
+    frontier.complete(batch[0])
+    frontier.fail(batch[1], 'timeout')
+
+    assert frontier.counts() == {'pending': 2, 'in_flight': 1, 'done': 1, 'failed': 1}
+    assert frontier.claim(10) == ['http://a.com/3', 'http://a.com/4']
+
+
+def test_reopened_job_requeues_in_flight_urls(tmp_path):
+    path = str(tmp_path / 'job.sqlite3')
+    frontier = Frontier(path)
+    frontier.set_meta('query', 'python')
+    frontier.add(['http://a.com/1', 'http://a.com/2', 'http://a.com/3'])
+    frontier.complete(frontier.claim(1)[0])
+    frontier.claim(1)
+    frontier.close()
+
+    resumed = Frontier(path)
+    assert resumed.requeued == 1
+    assert resumed.get_meta('query') == 'python'
+    assert resumed.counts() == {'pending': 2, 'in_flight': 0, 'done': 1, 'failed': 0}
+    assert resumed.add(['http://a.com/1']) == 0
+    assert resumed.claim(5) == ['http://a.com/2', 'http://a.com/3']
+
+
+def test_bloom_filter_grows_with_the_frontier(tmp_path):
+    frontier = Frontier(str(tmp_path / 'job.sqlite3'), bloom_capacity=100)
+    frontier.add([f'http://a.com/{i}' for i in range(1000)])
+
+    assert frontier.add([f'http://a.com/{i}' for i in range(1000)]) == 0
+    assert frontier.counts()['pending'] == 1000
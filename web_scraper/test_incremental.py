@@ -0,0 +1,55 @@
+"""
+Tests for incremental re-scraping fingerprints
+"""
+
+from scraper.incremental import FingerprintStore, fingerprint, unchanged_result
+
+
+def test_statuses_across_runs(tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    url = 'https://example.com/'
+
+    first = FingerprintStore(path)
+    assert not first.body_unchanged(url, fingerprint(b'<p>a</p>'))
+    assert first.update(url, fingerprint(b'<p>a</p>'), fingerprint('a')) == 'new'
+    first.save()
+
+    second = FingerprintStore(path)
+    assert second.body_unchanged(url, fingerprint(b'<p>a</p>'))
+    # Different markup around the same text is not a content change
+    assert second.update(url, fingerprint(b'<p> a </p>'), fingerprint('a')) == 'unchanged'
+    assert second.update(url, fingerprint(b'<p>b</p>'), fingerprint('b')) == 'changed'
+    assert second.counts == {'new': 0, 'changed': 1, 'unchanged': 2}
+
+
+def test_fingerprint_accepts_text_and_bytes():
+    assert fingerprint('café') == fingerprint('café'.encode('utf-8'))
+    assert fingerprint('a') != fingerprint('b')
+
+
+def _incremental_crawl(site, path):
+    from main import WebScraper
+    scraper = WebScraper()
+    scraper.delay = 0
+    scraper.enable_incremental(path)
+    try:
+        return scraper.crawl([site.url('/')], max_depth=2, max_pages=10)
+    finally:
+        scraper.fingerprints.save()
+        scraper.close()
+
+
+def test_incremental_crawl_follows_links_of_unchanged_pages(local_site, tmp_path):
+    local_site.routes['/'] = '<title>Home</title><p>Start here.</p><a href="/a">A</a>'
+    local_site.routes['/a'] = '<title>A</title><p>Page a.</p><a href="/b">B</a>'
+    local_site.routes['/b'] = '<title>B</title><p>Page b.</p>'
+    path = str(tmp_path / 'fingerprints.json')
+
+    first = _incremental_crawl(local_site, path)
+    assert sorted(result['title'] for result in first) == ['A', 'B', 'Home']
+    assert {result['status'] for result in first} == {'new'}
+
+    second = _incremental_crawl(local_site, path)
+    assert sorted(result['url'] for result in second) == sorted(local_site.url(p) for p in ('/', '/a', '/b'))
+    assert all(set(result) == set(unchanged_result(result['url'])) and result['status'] == 'unchanged'
+               for result in second)
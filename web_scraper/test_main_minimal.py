@@ -0,0 +1,75 @@
+"""
+Tests for the main_minimal batch mode
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from main_minimal import read_urls, run_batch, scrape_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PAGE = '<title>Page {i}</title><p>Hello {i}</p><a href="/next">Next</a><img src="/i.png" alt="i">'
+
+
+def serve_pages(site, count):
+    for i in range(count):
+        site.routes[f'/p/{i}'] = PAGE.format(i=i)
+    return [site.url(f'/p/{i}') for i in range(count)]
+
+
+def test_batch_keeps_the_single_url_schema(local_site):
+    urls = serve_pages(local_site, 3) + [local_site.url('/missing')]
+
+    results = {result['url']: result for result in scrape_batch(urls, workers=2)}
+
+    assert set(results) == set(urls)
+    page = results[urls[1]]
+    assert set(page) == {'url', 'title', 'text_content', 'links', 'images', 'status_code'}
+    assert page['title'] == 'Page 1' and page['status_code'] == 200
+    assert results[local_site.url('/missing')]['status_code'] is None
+    assert '404' in results[local_site.url('/missing')]['error']
+
+
+def test_workers_run_in_parallel_on_a_shared_pool(local_site):
+    local_site.latency = 0.1
+    urls = serve_pages(local_site, 16)
+
+    start = time.monotonic()
+    total, errors = run_batch(urls, os.devnull, workers=8)
+
+    assert (total, errors) == (16, 0)
+    assert time.monotonic() - start < 0.1 * 16 / 3
+
+
+def test_read_urls_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / 'urls.txt'
+    path.write_text('# seeds\nhttp://a.com/\n\n  http://b.com/  \n')
+    assert list(read_urls(str(path))) == ['http://a.com/', 'http://b.com/']
+
+
+def test_cli_streams_jsonl_from_stdin(local_site):
+    urls = serve_pages(local_site, 4)
+    process = subprocess.run([sys.executable, 'main_minimal.py', '--input', '-', '--workers', '3'],
+                             input='\n'.join(urls), cwd=BASE_DIR, capture_output=True, text=True,
+                             check=True)
+
+    records = [json.loads(line) for line in process.stdout.splitlines()]
+    assert sorted(record['url'] for record in records) == sorted(urls)
+    assert 'Scraped 4 URLs (0 errors)' in process.stderr
+
+
+def test_cli_stream_parser_reads_the_raw_body(local_site, tmp_path):
+    local_site.routes['/utf8'] = (200, {'Content-Type': 'text/html; charset=utf-8'},
+                                  '<title>Caf\u00e9</title><p>cr\u00e8me</p><a href="/x">X</a>'.encode('utf-8'))
+    output = tmp_path / 'output.json'
+    subprocess.run([sys.executable, 'main_minimal.py', '--parser', 'stream', local_site.url('/utf8'),
+                    '--output', str(output)], cwd=BASE_DIR, capture_output=True, check=True)
+
+    record = json.loads(output.read_text(encoding='utf-8'))
+    assert 'error' not in record
+    assert record['title'] == 'Caf\u00e9' and 'cr\u00e8me' in record['text_content']
+    assert record['links'] == [{'url': local_site.url('/x'), 'text': 'X'}]
@@ -0,0 +1,100 @@
+"""
+Tests for per-stage metrics and their Prometheus/JSON export
+"""
+
+import time
+
+import pytest
+import requests
+
+from scraper.metrics import METRICS, OTHER_HOST, Metrics
+from scraper.parsers import extract_page
+from scraper.transport import create_session, read_body
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_stage_histogram_and_quantiles():
+    metrics = Metrics()
+    for ms in range(1, 101):
+        metrics.observe('stage_seconds', ms / 1000, stage='parse')
+
+    stats = metrics.summary()['stages']['parse']
+    assert stats['count'] == 100
+    assert stats['max_ms'] == pytest.approx(100)
+    assert 25 <= stats['p50_ms'] <= 50
+    assert 50 <= stats['p95_ms'] <= 100
+
+
+def test_prometheus_text_format():
+    metrics = Metrics()
+    metrics.inc('pages_total', outcome='ok')
+    metrics.inc('pages_total', outcome='ok')
+    metrics.observe('ttfb_seconds', 0.002, host='a.com', status='200')
+    metrics.observe('ttfb_seconds', 60, host='a.com', status='200')
+
+    text = metrics.prometheus()
+    assert '# TYPE web_scraper_pages_total counter' in text
+    assert 'web_scraper_pages_total{outcome="ok"} 2' in text
+    assert 'web_scraper_ttfb_seconds_bucket{host="a.com",status="200",le="0.0025"} 1' in text
+    assert 'web_scraper_ttfb_seconds_bucket{host="a.com",status="200",le="+Inf"} 2' in text
+    assert 'web_scraper_ttfb_seconds_count{host="a.com",status="200"} 2' in text
+
+
+def test_host_labels_are_capped():
+    metrics = Metrics(max_hosts=2)
+    assert [metrics.host(h) for h in ('a', 'b', 'c', 'a')] == ['a', 'b', OTHER_HOST, 'a']
+
+
+def test_transport_records_connect_ttfb_and_download(local_site, metrics):
+    local_site.routes['/page'] = '<title>x</title>'
+    session = create_session({'max_retries': 0})
+    for path in ('/page', '/page', '/missing'):
+        with session.get(local_site.url(path), stream=True) as response:
+            if response.ok:
+                read_body(response)
+
+    summary = metrics.summary()
+    assert summary['stages']['connect']['count'] == 1
+    assert summary['stages']['download']['count'] == 2
+    assert summary['status_codes']['200']['count'] == 2
+    assert summary['status_codes']['404']['count'] == 1
+
+
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml', 'stream'])
+def test_parsers_record_stages(metrics, parser):
+    extract_page('<title>t</title><p>text</p><a href="/x">x</a>', 'http://a.com/', parser)
+    assert 'parse' in metrics.summary()['stages']
+
+
+def test_metrics_endpoint(metrics):
+    metrics.inc('pages_total', outcome='ok')
+    server = metrics.serve(0)
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert 'web_scraper_pages_total{outcome="ok"} 1' in response.text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.stage('parse'):
+        metrics.inc('pages_total')
+    assert metrics.prometheus() == '\n'
+
+
+def test_stage_timer_overhead_is_small():
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(20000):
+        with metrics.stage('parse'):
+            pass
+    assert (time.perf_counter() - start) / 20000 < 20e-6
@@ -0,0 +1,69 @@
+"""
+Parity tests for the HTML parser backends
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+from scraper.parsers import DEFAULT_PARSER, PARSERS, extract_page, parser_available
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(BASE_DIR, 'data', 'pages')
+PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, '*.html')))
+BASE_URL = 'https://example.com/blog/post/'
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_fixture_pages_exist():
+    assert PAGES
+
+
+@pytest.mark.parametrize('parser', [name for name in PARSERS if name != 'html.parser'])
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_backend_matches_html_parser(parser, path):
+    if not parser_available(parser):
+        pytest.skip(f"{parser} is not installed")
+    html = _read(path)
+
+    expected = extract_page(html, BASE_URL, 'html.parser')
+    result = extract_page(html, BASE_URL, parser)
+
+    for field in ('title', 'content', 'links', 'images'):
+        assert result[field] == expected[field], field
+
+
+@pytest.mark.parametrize('parser', list(PARSERS))
+def test_backend_extracts_expected_fields(parser):
+    if not parser_available(parser):
+        pytest.skip(f"{parser} is not installed")
+
+    page = extract_page(_read(os.path.join(PAGES_DIR, 'article.html')), BASE_URL, parser)
+
+    assert page['title'] == 'Release Notes & Changes'
+    assert 'console.log' not in page['content']
+    assert 'font-family' not in page['content']
+    assert 'Café support — finally' in page['content']
+    assert {'text': 'upgrade guide', 'url': 'https://example.com/blog/docs/upgrade.html'} in page['links']
+    assert page['images'] == [
+        {'alt': 'Release banner', 'src': 'https://example.com/images/banner.png'},
+        {'alt': '', 'src': 'https://example.com/blog/post/chart.svg'},
+    ]
+
+
+def test_missing_title_uses_placeholder():
+    page = extract_page(_read(os.path.join(PAGES_DIR, 'minimal.html')), BASE_URL)
+    assert page['title'] == 'No Title'
+
+
+def test_shipped_config_uses_the_reference_parser():
+    # The other backends repair malformed markup differently from html.parser
+    with open(os.path.join(BASE_DIR, 'config', 'config.json'), 'r', encoding='utf-8') as f:
+        settings = json.load(f)['scraper_settings']
+    assert settings['parser'] == DEFAULT_PARSER == 'html.parser'
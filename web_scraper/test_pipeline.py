@@ -0,0 +1,102 @@
+"""
+Tests for the fetch/extract process-pool pipeline
+"""
+
+import requests
+
+from scraper.extract import extract_result
+from scraper.incremental import unchanged_result
+from scraper.metrics import Metrics
+from scraper.pipeline import scrape_pipeline
+
+PAGE = """<html><head><title> Page {i} </title><style>p {{}}</style></head>
+<body><script>var x = 1;</script><p>Hello  world {i}</p>
+<a href="/next/{i}">Next</a><img src="img/{i}.png" alt="pic"></body></html>"""
+
+
+def _fetcher():
+    session = requests.Session()
+
+    def fetch(url):
+        response = session.get(url, timeout=5)
+        return response.content, response.encoding or response.apparent_encoding
+
+    return fetch
+
+
+def _without_timestamp(result):
+    return {k: v for k, v in result.items() if k != 'scraped_at'}
+
+
+def test_pipeline_matches_inline_extraction(local_site):
+    for i in range(6):
+        local_site.routes[f'/p/{i}'] = PAGE.format(i=i)
+    urls = [local_site.url(f'/p/{i}') for i in range(6)]
+    fetch = _fetcher()
+
+    results = scrape_pipeline(urls, fetch, workers=2, concurrency=3, delay=0, max_pending=2)
+    expected = [extract_result(*fetch(url), url) for url in urls]
+
+    assert [_without_timestamp(r) for r in results] == [_without_timestamp(r) for r in expected]
+    assert results[3]['title'] == 'Page 3'
+    assert results[3]['content'] == 'Page 3 Hello world 3 Next'
+    assert results[3]['images'] == [{'alt': 'pic', 'src': local_site.url('/p/img/3.png')}]
+
+
+def test_pipeline_accepts_a_generator_of_urls(local_site):
+    for i in range(3):
+        local_site.routes[f'/p/{i}'] = PAGE.format(i=i)
+
+    results = scrape_pipeline((local_site.url(f'/p/{i}') for i in range(3)), _fetcher(),
+                              workers=1, delay=0)
+
+    assert [r['title'] for r in results] == ['Page 0', 'Page 1', 'Page 2']
+
+
+def test_pipeline_reports_fetch_errors_in_place(local_site):
+    local_site.routes['/ok'] = PAGE.format(i=0)
+    urls = [local_site.url('/ok'), 'http://127.0.0.1:1/unreachable', local_site.url('/ok')]
+
+    results = scrape_pipeline(urls, _fetcher(), workers=1, concurrency=2, delay=0)
+
+    assert [r['url'] for r in results] == urls
+    assert 'error' in results[1]
+    assert results[0]['title'] == results[2]['title'] == 'Page 0'
+
+
+def test_pipeline_runs_entity_extractors_in_workers(local_site):
+    local_site.routes['/contact'] = '<p>Write to Sales@Example.com or call (555) 123-4567</p>'
+    results = scrape_pipeline([local_site.url('/contact')], _fetcher(), workers=1, delay=0,
+                              entities=('emails', 'phones'))
+
+    assert results[0]['emails'] == ['sales@example.com']
+    assert results[0]['phones'] == ['5551234567']
+
+
+def _incremental_pipeline(site, path):
+    from main import WebScraper
+    scraper = WebScraper()
+    scraper.delay = 0
+    scraper.metrics = Metrics()
+    scraper.enable_incremental(path)
+    try:
+        results = scraper.scrape_pipeline([site.url('/p/0'), site.url('/p/1')], workers=1)
+        return results, scraper.metrics.prometheus()
+    finally:
+        scraper.fingerprints.save()
+        scraper.close()
+
+
+def test_scraper_pipeline_honours_incremental_mode_and_counts_pages(local_site, tmp_path):
+    for i in range(2):
+        local_site.routes[f'/p/{i}'] = PAGE.format(i=i)
+    path = str(tmp_path / 'fingerprints.json')
+
+    first, text = _incremental_pipeline(local_site, path)
+    assert [(r['title'], r['status']) for r in first] == [('Page 0', 'new'), ('Page 1', 'new')]
+    assert 'web_scraper_pages_total{outcome="ok"} 2' in text
+
+    local_site.routes['/p/1'] = PAGE.format(i=9)
+    second, _ = _incremental_pipeline(local_site, path)
+    assert set(second[0]) == set(unchanged_result(second[0]['url'])) and second[0]['status'] == 'unchanged'
+    assert (second[1]['title'], second[1]['status']) == ('Page 9', 'changed')
@@ -0,0 +1,93 @@
+"""
+Tests for the browser-rendering heuristics
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from scraper.render import RenderPolicy, js_render_reason
+
+ARTICLE = '<html><body><script src="a.js"></script><p>{}</p></body></html>'.format('Plain text. ' * 40)
+
+
+@pytest.mark.parametrize('html', [
+    '<html><body><div id="root"></div><script src="/bundle.js"></script></body></html>',
+    '<html><body><div class="x" id="__next">  </div></body></html>',
+    '<body><noscript>You need to enable JavaScript to run this app.</noscript>' + 'x' * 300 + '</body>',
+    '<html><body><script>render()</script><p>Loading...</p></body></html>',
+])
+def test_pages_needing_javascript(html):
+    assert js_render_reason(html) is not None
+
+
+@pytest.mark.parametrize('html', [
+    ARTICLE,
+    '<html><body><p>Short static page without scripts</p></body></html>',
+    '<html><body><div id="root"><h1>Server rendered</h1></div></body></html>',
+    '<body><noscript><img src="pixel.gif"></noscript>' + '<p>text</p>' * 50 + '</body>',
+])
+def test_static_pages_are_not_escalated(html):
+    assert js_render_reason(html) is None
+
+
+def test_policy_remembers_first_decision_per_domain():
+    policy = RenderPolicy()
+    assert policy.decision('spa.example') is None
+
+    policy.record('spa.example', True)
+    policy.record('spa.example', False)
+    policy.record('static.example', False)
+    policy.count_escalation()
+
+    assert policy.decision('spa.example') is True
+    assert policy.decision('static.example') is False
+    assert policy.stats() == {'probed': 3, 'escalated': 1, 'browser_domains': 1}
+
+
+class FakeDriver:
+    page_source = '<html><body><p>Rendered in the browser</p></body></html>'
+
+    def __init__(self):
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def find_element(self, by, value):
+        return object()
+
+
+class FakeDriverPool:
+    size = 1
+
+    def __init__(self):
+        self.driver = FakeDriver()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        yield self.driver
+
+    def close(self):
+        pass
+
+
+def test_auto_mode_escalates_once_then_sends_the_domain_to_the_browser(local_site):
+    from main import WebScraper
+    local_site.routes['/app'] = '<html><body><div id="root"></div><script src="/bundle.js"></script></body></html>'
+    local_site.routes['/about'] = ARTICLE
+    scraper = WebScraper(use_selenium='auto')
+    scraper.driver_pool = pool = FakeDriverPool()
+    try:
+        body, _ = scraper.fetch_raw(local_site.url('/app'))
+        assert b'Rendered in the browser' in body
+        assert pool.driver.visited == [local_site.url('/app')]
+
+        body, _ = scraper.fetch_raw(local_site.url('/about'))
+        assert b'Rendered in the browser' in body
+        assert pool.driver.visited == [local_site.url('/app'), local_site.url('/about')]
+        # Only the first page was probed with requests
+        assert [path for path, _ in local_site.requests] == ['/app']
+        assert scraper.render_policy.stats() == {'probed': 1, 'escalated': 2, 'browser_domains': 1}
+    finally:
+        scraper.close()
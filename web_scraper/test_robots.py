@@ -0,0 +1,130 @@
+"""
+Tests for the robots.txt cache
+"""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+from scraper.fetch import HostThrottle, fetch_all
+from scraper.robots import RobotsCache, RobotsDisallowed, parse_robots
+from scraper.transport import create_session
+
+ROBOTS = """
+User-agent: BadBot
+Disallow: /
+
+User-agent: *
+Disallow: /private/
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search?
+Crawl-delay: 0.3
+"""
+
+
+def robots_route(text, status=200):
+    return status, {'Content-Type': 'text/plain'}, text
+
+
+def robots_fetches(site):
+    return sum(1 for path, _ in site.requests if path == '/robots.txt')
+
+
+def test_longest_match_and_wildcards():
+    rules = parse_robots(ROBOTS, 'WebScraper/1.0')
+    assert rules.allowed('/')
+    assert not rules.allowed('/private/data')
+    assert rules.allowed('/private/public/page')
+    assert not rules.allowed('/files/report.pdf')
+    assert rules.allowed('/files/report.pdf?download=1')
+    assert not rules.allowed('/search?q=x')
+    assert rules.allowed('/search')
+    assert rules.crawl_delay == 0.3
+
+
+def test_user_agent_group_selection():
+    assert not parse_robots(ROBOTS, 'BadBot/2.1').allowed('/anything')
+    assert parse_robots(ROBOTS, 'GoodBot/1.0').allowed('/anything')
+    assert parse_robots('Disallow: /\n', 'GoodBot').allowed('/x')
+
+
+def test_robots_txt_is_fetched_once_per_host(local_site):
+    local_site.routes['/robots.txt'] = robots_route(ROBOTS)
+    robots = RobotsCache(create_session())
+
+    for _ in range(50):
+        assert robots.allowed(local_site.url('/page'))
+        assert not robots.allowed(local_site.url('/private/x'))
+    assert robots.crawl_delay(local_site.url('/')) == 0.3
+
+    assert robots_fetches(local_site) == 1
+    assert robots.stats() == {'hosts': 1, 'fetches': 1, 'hits': 100, 'blocked': 50}
+
+
+def test_checks_take_microseconds(local_site):
+    local_site.routes['/robots.txt'] = robots_route(ROBOTS)
+    robots = RobotsCache(create_session())
+    robots.allowed(local_site.url('/'))
+
+    start = time.perf_counter()
+    for i in range(10000):
+        robots.allowed(local_site.url(f'/articles/{i}'))
+    assert (time.perf_counter() - start) / 10000 < 50e-6
+
+
+def test_ttl_expiry_and_lru_eviction(local_site):
+    local_site.routes['/robots.txt'] = robots_route(ROBOTS)
+    robots = RobotsCache(create_session(), ttl=0.2, max_hosts=1)
+
+    robots.allowed(local_site.url('/'))
+    robots.allowed(local_site.url('/', host='localhost'))
+    robots.allowed(local_site.url('/'))
+    assert robots_fetches(local_site) == 3
+    assert robots.stats()['hosts'] == 1
+
+    robots.allowed(local_site.url('/'))
+    assert robots_fetches(local_site) == 3
+    time.sleep(0.25)
+    robots.allowed(local_site.url('/'))
+    assert robots_fetches(local_site) == 4
+
+
+def test_missing_robots_allows_and_server_error_disallows(local_site):
+    session = create_session({'max_retries': 0})
+    assert RobotsCache(session).allowed(local_site.url('/page'))
+
+    local_site.routes['/robots.txt'] = robots_route('oops', status=503)
+    assert not RobotsCache(session).allowed(local_site.url('/page'))
+
+
+def test_unreachable_robots_reports_the_fetch_error(local_site):
+    session = create_session({'max_retries': 0, 'timeout': 2})
+    local_site.routes['/robots.txt'] = robots_route('oops', status=503)
+    with pytest.raises(RobotsDisallowed, match=r'robots\.txt unreachable: HTTP 503'):
+        RobotsCache(session).check(local_site.url('/page'))
+
+    # Nothing listens on a port that was just released
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(RobotsDisallowed, match=r'robots\.txt unreachable: .*Connection'):
+        RobotsCache(session).check(f'http://127.0.0.1:{port}/page')
+
+
+def test_crawl_delay_spaces_requests_per_host(local_site):
+    local_site.routes['/robots.txt'] = robots_route(ROBOTS)
+    for i in range(3):
+        local_site.routes[f'/p/{i}'] = 'ok'
+    session = create_session()
+    robots = RobotsCache(session)
+    throttle = HostThrottle(0, robots.crawl_delay)
+    urls = [local_site.url(f'/p/{i}') for i in range(3)]
+
+    asyncio.run(fetch_all(urls, lambda url: session.get(url).text, 3, 0, throttle=throttle))
+
+    starts = [t for path, t in local_site.requests if path.startswith('/p/')]
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert min(gaps) >= 0.25
@@ -0,0 +1,86 @@
+"""
+Tests for the full-text search index
+"""
+
+import json
+import random
+import time
+
+from scraper.search import SearchIndex, fts_query, read_results
+from scraper.sinks import ResultSink
+
+
+def page(url, title, content):
+    return {'url': url, 'title': title, 'content': content, 'scraped_at': '2026-01-01 00:00:00'}
+
+
+def test_bm25_ranks_title_and_dense_matches_first(tmp_path):
+    index = SearchIndex(str(tmp_path / 'index.sqlite3'))
+    index.add_many([
+        page('https://a.com/', 'Python tutorial', 'Learn to program step by step.'),
+        page('https://b.com/', 'Cooking', 'A recipe that mentions python once among many other words '
+                                          'about onions, garlic, butter and slow cooking.'),
+        page('https://c.com/', 'Snakes', 'The python is a large snake. Pythons are constrictors.'),
+        {'url': 'https://d.com/', 'error': 'timeout'},
+        {'url': 'https://e.com/', 'status': 'unchanged'},
+    ])
+    index.add_many(page(f'https://other.com/{i}', 'Other', 'Nothing relevant here.') for i in range(5))
+
+    assert len(index) == 8
+    hits = index.search('python')
+    assert [hit['url'] for hit in hits] == ['https://a.com/', 'https://c.com/', 'https://b.com/']
+    assert hits[0]['score'] > hits[1]['score'] > hits[2]['score']
+    assert '[python]' in hits[1]['snippet'].lower()
+    # Stemming matches other word forms, and every term must match by default
+    assert [hit['url'] for hit in index.search('programming')] == ['https://a.com/']
+    assert [hit['url'] for hit in index.search('python garlic')] == ['https://b.com/']
+    assert len(index.search('python garlic', match_all=False)) == 3
+    assert len(index.search('relevant', limit=2, offset=4)) == 1
+    assert index.search('   ') == [] and index.search('zebra') == []
+
+
+def test_query_syntax_is_treated_as_plain_words():
+    assert fts_query('NOT "a" OR b-c*') == '"NOT" "a" "OR" "b" "c"'
+    assert fts_query('x y', match_all=False) == '"x" OR "y"'
+
+
+def test_rescraped_urls_replace_their_earlier_version(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    index = SearchIndex(path)
+    index.add(page('https://a.com/', 'News', 'The old headline about elections.'))
+    index.add(page('https://a.com/', 'News', 'The new headline about weather.'))
+    index.close()
+
+    index = SearchIndex(path)
+    assert len(index) == 1
+    assert index.search('elections') == []
+    assert index.search('weather')[0]['url'] == 'https://a.com/'
+    assert index.remove('https://a.com/') and not index.remove('https://a.com/')
+    assert index.search('weather') == [] and len(index) == 0
+
+
+def test_results_files_are_read_from_json_and_jsonl(tmp_path):
+    json_path = tmp_path / 'results.json'
+    json_path.write_text(json.dumps([page('https://a.com/', 'A', 'alpha')]))
+    single_path = tmp_path / 'single.json'
+    single_path.write_text(json.dumps(page('https://b.com/', 'B', 'beta')))
+    with ResultSink(str(tmp_path / 'results.jsonl'), compression='gzip') as sink:
+        sink.write(page('https://c.com/', 'C', 'gamma'))
+
+    urls = [result['url'] for path in (json_path, single_path, sink.path)
+            for result in read_results(str(path))]
+    assert urls == ['https://a.com/', 'https://b.com/', 'https://c.com/']
+
+
+def test_queries_take_milliseconds_on_a_large_index(tmp_path):
+    rng = random.Random(3)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    index = SearchIndex(str(tmp_path / 'index.sqlite3'), commit_every=1000)
+    index.add_many(page(f'https://site.com/{i}', ' '.join(rng.choices(vocabulary, k=5)),
+                        ' '.join(rng.choices(vocabulary, k=200)))
+                   for i in range(5000))
+
+    start = time.perf_counter()
+    for i in range(50):
+        index.search(f'term{i} term{i + 1}')
+    assert (time.perf_counter() - start) / 50 < 0.02
@@ -0,0 +1,100 @@
+"""
+Tests for the streaming JSONL/CSV result sink
+"""
+
+import csv
+import gzip
+import importlib.util
+
+import pytest
+
+from scraper.sinks import ParquetSink, ResultSink, read_jsonl
+
+RESULTS = [
+    {'url': 'https://a.example/', 'title': 'A', 'content': 'x' * 300,
+     'links': [{'text': 'l', 'url': 'https://a.example/l'}], 'images': [], 'scraped_at': 't'},
+    {'url': 'https://b.example/', 'error': 'timeout', 'scraped_at': 't'},
+]
+
+
+def test_writes_jsonl_and_csv_summary(tmp_path):
+    with ResultSink(str(tmp_path / 'run.jsonl')) as sink:
+        for result in RESULTS:
+            sink.write(result)
+
+    assert list(read_jsonl(sink.path)) == RESULTS
+    with open(sink.csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['content_preview'] == 'x' * 200 + '...'
+    assert rows[0]['links_count'] == '1'
+    assert rows[1]['error'] == 'timeout'
+    assert (sink.count, sink.errors) == (2, 1)
+
+
+def test_records_are_on_disk_before_close(tmp_path):
+    sink = ResultSink(str(tmp_path / 'run'), compression='gzip', flush_every=1)
+    sink.write(RESULTS[0])
+
+    # Simulates a crash: read without closing the sink
+    with gzip.open(sink.path, 'rt', encoding='utf-8') as f:
+        assert f.readline().startswith('{"url": "https://a.example/"')
+    sink.close()
+
+
+def test_appending_keeps_a_single_csv_header(tmp_path):
+    for result in RESULTS:
+        with ResultSink(str(tmp_path / 'run.jsonl'), compression='gzip') as sink:
+            sink.write(result)
+
+    assert len(list(read_jsonl(sink.path))) == 2
+    with gzip.open(sink.csv_path, 'rt', encoding='utf-8') as f:
+        assert f.read().count('url,title') == 1
+
+
+@pytest.mark.skipif(importlib.util.find_spec('zstandard') is None, reason="zstandard not installed")
+def test_zstd_round_trip(tmp_path):
+    with ResultSink(str(tmp_path / 'run.jsonl'), compression='zstd', flush_every=1) as sink:
+        for result in RESULTS:
+            sink.write(result)
+    assert sink.path.endswith('.jsonl.zst')
+    assert list(read_jsonl(sink.path)) == RESULTS
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResultSink(str(tmp_path / 'run.jsonl'), compression='bz2')
+
+
+def test_parquet_columns_and_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    results = [dict(RESULTS[0], url=f'https://a.example/{i}') for i in range(5)] + [RESULTS[1]]
+
+    with ParquetSink(str(tmp_path / 'run'), row_group_size=2) as sink:
+        for result in results:
+            sink.write(result)
+
+    parquet = pq.ParquetFile(sink.path)
+    assert parquet.metadata.num_row_groups == 3
+    table = pq.read_table(sink.path, columns=['url', 'host', 'links', 'error'])
+    rows = table.to_pylist()
+    assert rows[0] == {'url': 'https://a.example/0', 'host': 'a.example',
+                       'links': [{'text': 'l', 'url': 'https://a.example/l'}], 'error': None}
+    assert rows[5]['error'] == 'timeout' and rows[5]['links'] is None
+    assert (sink.count, sink.errors) == (6, 1)
+
+
+def test_parquet_keeps_every_field_of_a_change_record(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from scraper.changes import ChangeStore
+    store = ChangeStore(str(tmp_path / 'changes.sqlite3'))
+    old = dict(RESULTS[0], content='First. Second.')
+    store.record(old)
+    _, change = store.record(dict(old, title='B', content='First. Third.',
+                                  links=[{'text': 'm', 'url': 'https://a.example/m'}]))
+
+    with ParquetSink(str(tmp_path / 'changes')) as sink:
+        sink.write(change)
+
+    [row] = pq.read_table(sink.path).to_pylist()
+    assert {key: row[key] for key in change} == change
+    assert row['version'] == 2
@@ -0,0 +1,58 @@
+"""
+Import-time budget for the entry points
+
+Each check imports a module in a fresh interpreter with -X importtime, so
+a heavy dependency creeping back into an import path fails here instead of
+slowing every run of the scraper and its executable.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time in ms. Importing main took ~450 ms with selenium
+# and bs4 loaded up front; requests and asyncio alone take ~150 ms.
+BUDGETS_MS = {
+    'main': 350,
+    'main_minimal': 250,
+    'utils.helpers': 100,
+}
+
+# Backends that must only load once a page actually needs them
+LAZY_MODULES = ('selenium', 'webdriver_manager', 'pandas', 'bs4', 'lxml', 'pyarrow', 'http.server')
+
+
+def import_times(module):
+    """Run `import module` in a new interpreter and return {name: cumulative us}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS_MS))
+def test_heavy_backends_are_not_imported(module):
+    loaded = import_times(module)
+    assert [name for name in LAZY_MODULES if name in loaded] == []
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS_MS))
+def test_import_time_budget(module):
+    import_times(module)  # warm the bytecode cache
+    elapsed_ms = statistics.median(import_times(module)[module] for _ in range(3)) / 1000
+    assert elapsed_ms < BUDGETS_MS[module], f"import {module} took {elapsed_ms:.0f} ms"
+
+
+def test_importing_main_opens_no_log_file():
+    code = "import logging, main; assert not logging.getLogger().handlers"
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True)
@@ -0,0 +1,45 @@
+"""
+Tests for the single-pass streaming extractor
+"""
+
+import pytest
+
+from scraper.parsers import clean_text, extract_page
+from scraper.streaming import TextCleaner, extract_chunks
+
+BASE_URL = 'https://example.com/dir/'
+
+TRICKY_PAGES = [
+    '<a href="1">one<a href="2">two</a>three</a>after',
+    '<div><a href="1">open<span>in</div>out',
+    '<title>T<b>x</b></title><title>second</title>body',
+    '<a href>empty</a><img src><img src="a" alt><a href="x"/>tail',
+    '<img src="a.png"></img><img src="b.png">text</img>more',
+    '<p>a<template>hidden</template><ruby>R<rt>rt</rt></ruby> &copy &foo; &#65;</p>',
+    '<TITLE>Upper</TITLE><A HREF="/U">Up</A><IMG SRC="/i.png" ALT="I">',
+    '<a href="x">unterminated <script>var a = "<a href=y>";</script>',
+]
+
+
+@pytest.mark.parametrize('html', TRICKY_PAGES)
+def test_matches_html_parser_on_malformed_markup(html):
+    assert extract_page(html, BASE_URL, 'stream') == extract_page(html, BASE_URL, 'html.parser')
+
+
+@pytest.mark.parametrize('size', [1, 5, 64])
+def test_chunked_input_matches_whole_document(size):
+    html = ('<html><head><title>Café</title></head><body>'
+            '<p>café — résumé\r\nsecond  line</p>'
+            '<a href="/x">link &amp; text</a></body></html>')
+    data = html.encode('utf-8')
+    chunks = [data[i:i + size] for i in range(0, len(data), size)]
+
+    assert extract_chunks(chunks, 'utf-8', BASE_URL) == extract_page(html, BASE_URL, 'html.parser')
+
+
+def test_text_cleaner_matches_clean_text_for_split_input():
+    text = ' first line \r\n\r\n second   line  with  gaps \n\x0clast'
+    cleaner = TextCleaner()
+    for i in range(0, len(text), 3):
+        cleaner.feed(text[i:i + 3])
+    assert cleaner.close() == clean_text(text)
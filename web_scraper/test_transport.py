@@ -0,0 +1,135 @@
+"""
+Tests for the shared HTTP transport
+"""
+
+import gzip
+import tracemalloc
+
+import pytest
+import requests
+
+from main_minimal import MAX_TEXT_LENGTH, scrape_url
+from scraper.transport import (BodyTooLarge, UnsupportedContentType, create_session,
+                               iter_body, read_body)
+
+
+def test_keep_alive_connections_are_reused(local_site):
+    local_site.routes['/'] = 'ok'
+    session = create_session()
+    for _ in range(5):
+        assert session.get(local_site.url('/')).text == 'ok'
+
+    stats = session.stats()
+    assert stats['requests'] == 5
+    assert stats['new_connections'] == 1
+    assert stats['reuse_rate'] == pytest.approx(0.8)
+
+
+def test_retries_server_errors_with_backoff(local_site):
+    attempts = []
+
+    def flaky(handler):
+        attempts.append(handler.path)
+        if len(attempts) < 3:
+            return 503, {}, 'busy'
+        return 200, {}, 'recovered'
+
+    local_site.routes['/flaky'] = flaky
+    session = create_session({'max_retries': 3, 'backoff_factor': 0.01})
+
+    assert session.get(local_site.url('/flaky')).text == 'recovered'
+    assert len(attempts) == 3
+
+
+def test_gives_up_after_max_retries_and_returns_last_response(local_site):
+    local_site.routes['/down'] = (503, {}, 'down')
+    session = create_session({'max_retries': 1, 'backoff_factor': 0})
+
+    response = session.get(local_site.url('/down'))
+    assert response.status_code == 503
+    assert len(local_site.requests) == 2
+
+
+def test_configured_timeout_is_applied(local_site):
+    local_site.latency = 0.5
+    local_site.routes['/slow'] = 'slow'
+    session = create_session({'timeout': 0.1, 'max_retries': 0})
+
+    with pytest.raises(requests.exceptions.RequestException):
+        session.get(local_site.url('/slow'))
+
+
+def test_headers_and_ttfb(local_site):
+    seen = {}
+
+    def echo(handler):
+        seen.update(handler.headers)
+        return 200, {}, 'ok'
+
+    local_site.routes['/echo'] = echo
+    local_site.latency = 0.05
+    session = create_session({'user_agent': 'TestAgent/1.0'})
+    session.get(local_site.url('/echo'))
+
+    assert seen['User-Agent'] == 'TestAgent/1.0'
+    assert 'gzip' in seen['Accept-Encoding']
+    assert session.stats()['ttfb_avg_ms'] >= 50
+
+
+def test_read_body_returns_decoded_body(local_site):
+    local_site.routes['/gz'] = (200, {'Content-Encoding': 'gzip'}, gzip.compress(b'hello ' * 1000))
+    session = create_session()
+    with session.get(local_site.url('/gz'), stream=True) as response:
+        assert read_body(response, max_bytes=10000) == b'hello ' * 1000
+
+
+def test_declared_length_over_limit_is_rejected_before_reading(local_site):
+    local_site.routes['/big'] = 'x' * 5000
+    session = create_session()
+    with session.get(local_site.url('/big'), stream=True) as response:
+        with pytest.raises(BodyTooLarge):
+            next(iter_body(response, max_bytes=1000))
+        assert response.raw.tell() == 0
+
+
+def test_decoded_size_is_enforced_while_reading(local_site):
+    # Compresses far below the limit but inflates past it
+    local_site.routes['/bomb'] = (200, {'Content-Encoding': 'gzip'}, gzip.compress(b'0' * 1000000))
+    session = create_session()
+    with session.get(local_site.url('/bomb'), stream=True) as response:
+        with pytest.raises(BodyTooLarge):
+            read_body(response, max_bytes=100000, chunk_size=4096)
+
+
+@pytest.mark.parametrize('content_type', ['image/png', 'application/pdf', 'application/octet-stream'])
+def test_binary_content_types_are_rejected(local_site, content_type):
+    local_site.routes['/file'] = (200, {'Content-Type': content_type}, b'\x89PNG')
+    session = create_session()
+    with session.get(local_site.url('/file'), stream=True) as response:
+        with pytest.raises(UnsupportedContentType):
+            read_body(response)
+
+
+def test_minimal_scraper_stops_early_with_bounded_memory(local_site):
+    paragraph = '<p>' + 'word ' * 40 + '</p>\n'
+    local_site.routes['/long'] = ('<html><title>Long</title><body>' + paragraph * 40000).encode()
+    session = create_session()
+
+    tracemalloc.start()
+    try:
+        result = scrape_url(local_site.url('/long'), session=session, stop_early=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result['title'] == 'Long'
+    assert len(result['text_content']) == MAX_TEXT_LENGTH
+    # The page is ~8 MB; only a few chunks should ever be held
+    assert peak < 2 * 1024 * 1024
+
+
+def test_minimal_scraper_reports_oversized_pages(local_site):
+    local_site.routes['/big'] = '<p>' + 'x' * 5000 + '</p>'
+    result = scrape_url(local_site.url('/big'), session=create_session(), max_body_bytes=1000)
+    assert result['status_code'] is None
+    assert 'exceeds limit' in result['error']
@@ -0,0 +1,125 @@
+"""
+Tests for the adaptive watch schedule and the watch loop
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from scraper.extract import extract_result
+from scraper.watch import WatchSchedule, watch
+
+
+def scrape(url):
+    return extract_result(requests.get(url, timeout=5).content, 'utf-8', url)
+
+
+def test_interval_backs_off_when_stable_and_tightens_on_change(tmp_path):
+    schedule = WatchSchedule(str(tmp_path / 'watch.sqlite3'), min_interval=10, max_interval=100,
+                             initial_interval=40)
+    schedule.add(['http://a.com/'], now=0)
+    url = 'http://a.com/'
+
+    assert schedule.record(url, 'h1', now=0) == 'new'
+    assert schedule.intervals()[url] == 40
+    assert schedule.record(url, 'h1', now=1) == 'unchanged'
+    assert schedule.intervals()[url] == 60
+    for now in range(2, 6):
+        schedule.record(url, 'h1', now=now)
+    assert schedule.intervals()[url] == 100
+
+    assert schedule.record(url, 'h2', now=10) == 'changed'
+    assert schedule.intervals()[url] == 50
+    for now, digest in enumerate(['h3', 'h4', 'h5'], 11):
+        schedule.record(url, digest, now=now)
+    assert schedule.intervals()[url] == 10
+
+    assert schedule.record(url, error='timeout', now=20) == 'error'
+    assert schedule.intervals()[url] == 10
+    assert schedule.stats() == {'urls': 1, 'checks': 11, 'changes': 4, 'errors': 1}
+
+
+def test_pop_due_returns_due_urls_earliest_first(tmp_path):
+    schedule = WatchSchedule(str(tmp_path / 'watch.sqlite3'), initial_interval=100)
+    schedule.add(['http://a.com/1'], now=5)
+    schedule.add(['http://a.com/2', 'http://b.com/#top', 'http://a.com/1'], now=1)
+    assert len(schedule) == 3
+
+    assert schedule.pop_due(now=0) == []
+    assert schedule.pop_due(limit=1, now=10) == ['http://a.com/2']
+    assert schedule.pop_due(now=10) == ['http://b.com/', 'http://a.com/1']
+    assert schedule.next_due() is None
+
+    schedule.record('http://b.com/', 'h', now=10)
+    assert 90 <= schedule.next_due() - 10 <= 110
+    schedule.remove('http://b.com/')
+    assert schedule.next_due() is None and len(schedule) == 2
+
+
+def test_restart_spreads_overdue_urls_over_the_catch_up_window(tmp_path):
+    path = str(tmp_path / 'watch.sqlite3')
+    schedule = WatchSchedule(path, initial_interval=3600)
+    urls = [f'http://site{i}.com/' for i in range(200)]
+    schedule.add(urls, now=time.time() - 7200)
+    schedule.close()
+
+    start = time.time()
+    reopened = WatchSchedule(path, initial_interval=3600, catch_up_window=300)
+    due = dict(reopened._due)
+    assert set(due) == set(urls)
+    assert all(start <= due[url] <= start + 301 for url in urls)
+    # Roughly uniform: no more than a small share at once
+    assert len(reopened.pop_due(now=start + 30)) < 50
+
+    again = WatchSchedule(path, initial_interval=3600, catch_up_window=300)
+    assert again._due == pytest.approx(due, abs=1)
+
+
+def test_watch_reports_new_and_changed_pages_only(local_site, tmp_path):
+    version = {'n': 1}
+    local_site.routes['/page'] = lambda handler: f"<html><title>v{version['n']}</title><p>version {version['n']}</p></html>"
+    local_site.routes['/static'] = "<html><title>static</title><p>never changes</p></html>"
+    schedule = WatchSchedule(str(tmp_path / 'watch.sqlite3'), min_interval=0.1, max_interval=0.2,
+                             initial_interval=0.1)
+    schedule.add([local_site.url('/page'), local_site.url('/static')])
+
+    changes = []
+    stop = threading.Event()
+
+    def on_change(result):
+        changes.append((result['status'], result['title']))
+        if len(changes) == 2:
+            version['n'] = 2
+        elif len(changes) == 3:
+            stop.set()
+
+    timeout = threading.Timer(5, stop.set)
+    timeout.start()
+    asyncio.run(watch(schedule, scrape, concurrency=2, delay=0, on_change=on_change, stop=stop,
+                      poll_interval=0.05))
+    timeout.cancel()
+
+    assert sorted(changes[:2]) == [('new', 'static'), ('new', 'v1')]
+    assert changes[2] == ('changed', 'v2')
+    stats = schedule.stats()
+    assert stats['changes'] == 1 and stats['checks'] >= 3
+
+
+def test_slow_page_does_not_hold_up_other_checks(local_site, tmp_path):
+    local_site.routes['/slow'] = lambda handler: time.sleep(1) or "<html><title>slow</title></html>"
+    local_site.routes['/fast'] = "<html><title>fast</title></html>"
+    schedule = WatchSchedule(str(tmp_path / 'watch.sqlite3'), min_interval=0.1, max_interval=0.1,
+                             initial_interval=0.1)
+    schedule.add([local_site.url('/slow'), local_site.url('/fast')])
+
+    stop = threading.Event()
+    timer = threading.Timer(0.8, stop.set)
+    timer.start()
+    asyncio.run(watch(schedule, scrape, concurrency=2, delay=0, stop=stop, poll_interval=0.05))
+
+    paths = [path for path, _ in local_site.requests]
+    assert paths.count('/slow') == 1
+    assert paths.count('/fast') >= 4
@@ -3,11 +3,12 @@ Utility functions for the web scraper
 """
 
 import re
+import json
 import time
-import requests
 from urllib.parse import urljoin, urlparse
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+
+from scraper.drivers import create_chrome_driver
+from scraper.entities import EMAIL_RE, PHONE_RE
 
 
 def validate_url(url):
@@ -22,16 +23,26 @@ def validate_url(url):
     return url is not None and regex.search(url) is not None
 
 
+def load_config(path):
+    """Load a JSON config file, returning an empty dict if it is missing"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
 def get_domain(url):
     """Extract domain from URL"""
     parsed = urlparse(url)
     return parsed.netloc
 
 
-def check_url_reachable(url, timeout=10):
+def check_url_reachable(url, timeout=10, session=None):
     """Check if a URL is reachable"""
+    from scraper.transport import get_session
     try:
-        response = requests.head(url, timeout=timeout, allow_redirects=True)
+        response = (session or get_session()).head(url, timeout=timeout, allow_redirects=True)
         return response.status_code < 400
     except:
         return False
@@ -51,29 +62,19 @@ def wait_random(min_time=1, max_time=3):
 
 def setup_chrome_driver(headless=True):
     """Setup Chrome WebDriver with recommended options"""
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-plugins-discovery")
-    chrome_options.add_argument("--disable-web-security")
-    chrome_options.add_argument("--allow-running-insecure-content")
-    
-    return webdriver.Chrome(options=chrome_options)
+    return create_chrome_driver(headless, extra_arguments=[
+        "--disable-extensions",
+        "--disable-plugins-discovery",
+        "--disable-web-security",
+        "--allow-running-insecure-content",
+    ])
 
 
 def extract_emails(text):
     """Extract email addresses from text"""
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    return re.findall(email_pattern, text)
+    return EMAIL_RE.findall(text)
 
 
 def extract_phone_numbers(text):
     """Extract phone numbers from text"""
-    phone_pattern = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-    return re.findall(phone_pattern, text)
\ No newline at end of file
+    return PHONE_RE.findall(text)
\ No newline at end of file